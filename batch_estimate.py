@@ -0,0 +1,221 @@
+# batch_estimate.py
+"""
+Headless batch estimator for saved project files.
+
+Re-prices saved projects (the JSON files written by File > Save) without opening
+the GUI, e.g. after the rate cards change:
+
+    python batch_estimate.py saved/ 2025026_CASSI.json 2025054_BAOBINH.json --jobs 4
+
+Every project is loaded through ProjectModel.from_dict and priced by the cost
+engine in a process pool. Results are written to the output directory:
+
+    totals.csv  one line per project with its total cost, row count and status
+    rows.csv    the flat cost rows of every project that was priced
+
+A summary with the wall time and the failed projects is printed at the end; the
+exit code is 1 when any project failed.
+"""
+
+import os
+import sys
+import time
+import json
+import glob
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# No QApplication is created, but keep Qt away from the display on headless machines
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+
+from models.project_model import ProjectModel
+from models.cost_engine import COST_ROW_COLUMNS
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TOTALS_COLUMNS = [
+    "file", "internal_job", "project_name", "project_type", "provinces",
+    "rows", "total_cost", "seconds", "status", "error"
+]
+
+def setup_logging(verbose=False):
+    """Set up logging configuration."""
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+def find_project_files(paths):
+    """
+    Expand the command line paths into project files.
+
+    Args:
+        paths (list): Project files, directories (all *.json inside) or glob patterns
+
+    Returns:
+        list: Absolute paths of the project files, without duplicates
+    """
+    files = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, "*.json")))
+        else:
+            matches = sorted(glob.glob(path)) or [path]
+
+        for match in matches:
+            match = os.path.abspath(match)
+
+            if match not in files:
+                files.append(match)
+
+    return files
+
+def estimate_project(file_path, vectorized=False):
+    """
+    Load and price one saved project.
+
+    Runs in a worker process, so failures are returned instead of raised.
+
+    Args:
+        file_path (str): Path of the project JSON file
+        vectorized (bool): Use the vectorized cost engine
+
+    Returns:
+        dict: Project information, its flat cost rows and the status ("ok" or "failed")
+    """
+    start = time.perf_counter()
+
+    result = {
+        "file": file_path,
+        "internal_job": "",
+        "project_name": "",
+        "project_type": "",
+        "provinces": 0,
+        "rows": [],
+        "total_cost": 0,
+        "status": "ok",
+        "error": ""
+    }
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+
+        project_model = ProjectModel()
+        project_model.from_dict(data)
+
+        result["internal_job"] = project_model.general.get("internal_job", "")
+        result["project_name"] = project_model.general.get("project_name", "")
+        result["project_type"] = project_model.general.get("project_type", "")
+        result["provinces"] = len(project_model.samples)
+
+        rows = project_model.flatten_cost_hierarchy(vectorized=vectorized)
+
+        result["rows"] = rows
+        result["total_cost"] = sum(row[8] for row in rows)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start
+
+    return result
+
+def run_batch(files, jobs=1, vectorized=False):
+    """
+    Price the projects, in a process pool when more than one job is requested.
+
+    Args:
+        files (list): Project files
+        jobs (int): Number of worker processes
+        vectorized (bool): Use the vectorized cost engine
+
+    Returns:
+        list: estimate_project() results in the order of files
+    """
+    if jobs <= 1 or len(files) <= 1:
+        return [estimate_project(file_path, vectorized) for file_path in files]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        return list(executor.map(estimate_project, files, [vectorized] * len(files)))
+
+def write_results(results, output_dir):
+    """
+    Write totals.csv and rows.csv.
+
+    Args:
+        results (list): estimate_project() results
+        output_dir (str): Directory for the CSV files, created if needed
+
+    Returns:
+        tuple: (totals path, rows path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    totals = pd.DataFrame(
+        [[result[column] if column != "rows" else len(result["rows"]) for column in TOTALS_COLUMNS] for result in results],
+        columns=TOTALS_COLUMNS
+    )
+
+    rows = pd.DataFrame(
+        [[result["file"]] + list(row) for result in results for row in result["rows"]],
+        columns=["file"] + list(COST_ROW_COLUMNS)
+    )
+
+    totals_path = os.path.join(output_dir, "totals.csv")
+    rows_path = os.path.join(output_dir, "rows.csv")
+
+    # utf-8-sig so that Excel shows the Vietnamese descriptions correctly
+    totals.to_csv(totals_path, index=False, encoding="utf-8-sig")
+    rows.to_csv(rows_path, index=False, encoding="utf-8-sig")
+
+    return totals_path, rows_path
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-price saved project files without the GUI.")
+    parser.add_argument("paths", nargs="+", help="Project JSON files, directories or glob patterns")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--output", "-o", default="batch_output", help="Output directory for totals.csv and rows.csv")
+    parser.add_argument("--vectorized", action="store_true", help="Use the vectorized cost engine")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show info logging")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.verbose)
+
+    files = find_project_files(args.paths)
+    output_dir = os.path.abspath(args.output)
+
+    if not files:
+        print("No project files found.")
+        return 1
+
+    # The cost hierarchies are loaded relative to the working directory
+    os.chdir(APP_DIR)
+
+    start = time.perf_counter()
+    results = run_batch(files, jobs=args.jobs, vectorized=args.vectorized)
+    wall_time = time.perf_counter() - start
+
+    totals_path, rows_path = write_results(results, output_dir)
+
+    failures = [result for result in results if result["status"] != "ok"]
+
+    print(f"Projects: {len(results)}  priced: {len(results) - len(failures)}  failed: {len(failures)}")
+    print(f"Wall time: {wall_time:.2f}s with {max(1, min(args.jobs, len(files)))} job(s), "
+          f"{sum(result['seconds'] for result in results):.2f}s of pricing")
+    print(f"Totals: {totals_path}")
+    print(f"Rows: {rows_path}")
+
+    for result in failures:
+        print(f"FAILED {result['file']}: {result['error']}")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
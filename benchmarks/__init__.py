@@ -0,0 +1,20 @@
+# benchmarks/__init__.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the estimation pipeline.
+
+Times each stage of the pipeline (loading a project, rebuilding the samples,
+the cost calculation, the results dialog, the Excel export and the element costs
+database) on the bundled projects and on synthetic projects scaled to N provinces
+x M audiences, and reports median/p95 times and peak memory as JSON:
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --compare bench.json      # compare with a previous run
+
+The dialog stages run on Qt's offscreen platform, so no display is needed.
+"""
+
+import os
+
+# Must be set before the first QApplication is created
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
@@ -0,0 +1,191 @@
+# benchmarks/cases.py
+# -*- coding: utf-8 -*-
+"""
+Inputs of the benchmarks: the bundled projects, synthetic projects scaled to
+N provinces x M audiences, and synthetic element cost tables.
+"""
+
+import copy
+import json
+import os
+
+import pandas as pd
+
+from config.predefined_values import VIETNAM_PROVINCES
+from formulars.pricing_formulas import calculate_daily_sup_target
+from models.project_model import ProjectModel
+
+BUNDLED_PROJECTS = {
+    "pepsi": "2025001_pepsi.json",
+    "cassi": "2025026_CASSI.json",
+    "chizu": "database/2025029_CHIZU.json"
+}
+
+# Project whose audiences are used as templates for the scaled projects
+SCALED_BASE_PROJECT = "cassi"
+
+# (provinces, audiences)
+DEFAULT_SCALES = ((10, 2), (63, 4))
+
+ELEMENT_COST_LEVELS = ("L1", "L2", "L3")
+ELEMENT_COST_LENGTHS = ("< 15 min", "15-30 min", "31-45 min", "46-60 min")
+
+DEFAULT_ELEMENT_COUNTS = (300,)
+
+class ProjectCase:
+    """A saved project to run the project stages on."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def __repr__(self):
+        return f"ProjectCase({self.name})"
+
+class ElementCostsCase:
+    """An element cost table to run the database stages on."""
+
+    def __init__(self, name, project_type, data):
+        self.name = name
+        self.project_type = project_type
+        self.data = data
+
+    def __repr__(self):
+        return f"ElementCostsCase({self.name})"
+
+def load_project(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def bundled_project_cases(names=None):
+    """
+    Cases for the projects shipped with the repository.
+
+    Args:
+        names (list, optional): Keys of BUNDLED_PROJECTS, all by default
+
+    Returns:
+        list: ProjectCase per project file that exists
+    """
+    cases = []
+
+    for name in names or BUNDLED_PROJECTS.keys():
+        path = BUNDLED_PROJECTS[name]
+
+        if os.path.exists(path):
+            cases.append(ProjectCase(name, load_project(path)))
+
+    return cases
+
+def build_scaled_project(base_data, provinces, audiences):
+    """
+    Scale a project to a number of provinces and target audiences.
+
+    The audiences are Main copies of the base project's first audience, priced
+    through ProjectModel.get_audience so they carry a complete rate card entry.
+
+    Args:
+        base_data (dict): Saved project used as template
+        provinces (int): Number of provinces, at most len(VIETNAM_PROVINCES)
+        audiences (int): Number of target audiences per province
+
+    Returns:
+        dict: The scaled project data
+    """
+    data = copy.deepcopy(base_data)
+
+    project_model = ProjectModel()
+    project_model.from_dict(copy.deepcopy(base_data))
+
+    template = data["general"]["target_audiences"][0]
+    target_audiences = []
+
+    for index in range(audiences):
+        audience = dict(template)
+        audience["target_audience_name"] = f"{template.get('target_audience_name', 'Audience')} {index + 1}"
+        audience["sample_type"] = "Main"
+
+        audience = project_model.get_audience(audience)
+        audience["target"]["daily_sup_target"] = calculate_daily_sup_target(
+            audience["sample_size"],
+            audience["target"].get("target_for_interviewer", 0),
+            audience["target"].get("interviewers_per_supervisor", 0)
+        )
+
+        target_audiences.append(audience)
+
+    province_names = VIETNAM_PROVINCES[:provinces]
+
+    data["general"]["provinces"] = list(province_names)
+    data["general"]["target_audiences"] = target_audiences
+    data["samples"] = {
+        province: {
+            f"{audience['sample_type']} - {audience['target_audience_name']}": copy.deepcopy(audience)
+            for audience in target_audiences
+        }
+        for province in province_names
+    }
+    data["travel"] = {province: {} for province in province_names} if data.get("travel") else {}
+
+    return data
+
+def scaled_project_cases(scales=DEFAULT_SCALES):
+    """
+    Cases for synthetic projects of the given sizes.
+
+    Args:
+        scales (list): (provinces, audiences) tuples
+
+    Returns:
+        list: ProjectCase named "<provinces>x<audiences>"
+    """
+    base_data = load_project(BUNDLED_PROJECTS[SCALED_BASE_PROJECT])
+
+    return [
+        ProjectCase(f"{provinces}x{audiences}", build_scaled_project(base_data, provinces, audiences))
+        for provinces, audiences in scales
+    ]
+
+def build_element_costs(elements, project_type="CLT"):
+    """
+    Synthetic element cost table in the layout produced by the CSV importer.
+
+    Args:
+        elements (int): Number of element rows
+        project_type (str): Project type written in the "Project Type" column
+
+    Returns:
+        DataFrame: Costs with "<level> (<length>)" columns, as accepted by
+            DatabaseManager.save_element_costs without metadata
+    """
+    rows = []
+
+    for index in range(elements):
+        row = {
+            "Project Type": project_type,
+            "Subtitle 1": f"Group {index // 100 + 1}",
+            "Subtitle 2": f"Section {index // 20 + 1}",
+            "Subtitle 3": f"Item {index // 5 + 1}",
+            "Subtitle 4": "",
+            "Subtitle 5": f"Element {index + 1}",
+            "Subtitle Code": f"E{index + 1:05d}",
+            "Unit": "Phiếu",
+            "row_order": index
+        }
+
+        for level_index, level in enumerate(ELEMENT_COST_LEVELS):
+            for length_index, length in enumerate(ELEMENT_COST_LENGTHS):
+                row[f"{level} ({length})"] = float(1000 * (index % 50 + 1) + 500 * level_index + 250 * length_index)
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+def element_costs_cases(counts=DEFAULT_ELEMENT_COUNTS):
+    """Cases for synthetic element cost tables named "<count> elements"."""
+    cases = []
+
+    for count in counts:
+        cases.append(ElementCostsCase(f"{count} elements", "CLT", build_element_costs(count)))
+
+    return cases
@@ -0,0 +1,297 @@
+# benchmarks/runner.py
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmark stages over the cases and reports the results.
+
+Each (stage, case) pair is run `warmup` times untimed, `repeat` times timed with
+time.perf_counter around the stage's run() only, and once more under tracemalloc
+for the peak Python memory allocated by the stage.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bumped when the layout of the JSON report changes
+REPORT_VERSION = 1
+
+# Relative change of the median reported as a regression / improvement by --compare
+DEFAULT_THRESHOLD = 0.10
+
+def summarize(timings):
+    """
+    Statistics of a list of durations.
+
+    Args:
+        timings (list): Durations in seconds
+
+    Returns:
+        dict: median_ms, p95_ms, min_ms, max_ms and mean_ms
+    """
+    values = np.array(timings, dtype=float) * 1000
+
+    return {
+        "median_ms": float(np.median(values)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "min_ms": float(values.min()),
+        "max_ms": float(values.max()),
+        "mean_ms": float(values.mean())
+    }
+
+def measure(stage, case, context, repeat=5, warmup=1, memory=True):
+    """
+    Time one stage on one case.
+
+    Args:
+        stage (Stage): The stage
+        case (ProjectCase | ElementCostsCase): Its input
+        context (BenchmarkContext): Shared resources
+        repeat (int): Number of timed runs
+        warmup (int): Number of untimed runs before the timed ones
+        memory (bool): Measure the peak memory with tracemalloc
+
+    Returns:
+        dict: stage, case, repeat, the summarize() statistics, peak_memory_kb and
+            error (empty unless the stage raised)
+    """
+    result = {"stage": stage.name, "case": case.name, "repeat": repeat, "error": ""}
+    timings = []
+
+    try:
+        if stage.needs_qt:
+            context.ensure_qt()
+
+        for i in range(warmup + repeat):
+            state = stage.setup(case, context)
+
+            start = time.perf_counter()
+            output = stage.run(state)
+            elapsed = time.perf_counter() - start
+
+            if stage.teardown:
+                stage.teardown(state, output)
+            context.process_deferred_deletes()
+
+            if i >= warmup:
+                timings.append(elapsed)
+
+        result.update(summarize(timings))
+
+        if memory:
+            state = stage.setup(case, context)
+
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            output = stage.run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            if stage.teardown:
+                stage.teardown(state, output)
+            context.process_deferred_deletes()
+
+            result["peak_memory_kb"] = round((peak - baseline) / 1024, 1)
+        else:
+            result["peak_memory_kb"] = None
+
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    return result
+
+def git_commit():
+    """Commit of the working tree, or "" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def run_benchmarks(stages, project_cases, element_costs_cases, repeat=5, warmup=1, memory=True, progress=None):
+    """
+    Run every stage on the cases of its kind.
+
+    Args:
+        stages (list): Stage objects
+        project_cases (list): ProjectCase objects for the project stages
+        element_costs_cases (list): ElementCostsCase objects for the database stages
+        repeat (int): Timed runs per measurement
+        warmup (int): Untimed runs per measurement
+        memory (bool): Measure peak memory
+        progress (callable, optional): Called with each result as it completes
+
+    Returns:
+        dict: The report, see REPORT_VERSION
+    """
+    from benchmarks.stages import BenchmarkContext, PROJECT_STAGE
+
+    context = BenchmarkContext()
+    results = []
+
+    try:
+        for stage in stages:
+            cases = project_cases if stage.kind == PROJECT_STAGE else element_costs_cases
+
+            for case in cases:
+                result = measure(stage, case, context, repeat=repeat, warmup=warmup, memory=memory)
+                results.append(result)
+
+                if progress:
+                    progress(result)
+    finally:
+        context.close()
+
+    return {
+        "version": REPORT_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "warmup": warmup
+        },
+        "results": results
+    }
+
+def compare_reports(current, previous, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the medians of two reports.
+
+    Args:
+        current (dict): Report of this run
+        previous (dict): Report to compare with
+        threshold (float): Relative change treated as significant
+
+    Returns:
+        list: (stage, case, previous median, current median, ratio, verdict) where the
+            verdict is "regression", "faster", "same" or "missing"
+    """
+    previous_results = {(result["stage"], result["case"]): result for result in previous.get("results", [])}
+    comparison = []
+
+    for result in current.get("results", []):
+        old = previous_results.get((result["stage"], result["case"]))
+
+        if old is None or old.get("error") or result.get("error"):
+            comparison.append((result["stage"], result["case"], None, result.get("median_ms"), None, "missing"))
+            continue
+
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+
+        if ratio > 1 + threshold:
+            verdict = "regression"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+
+        comparison.append((result["stage"], result["case"], old["median_ms"], result["median_ms"], ratio, verdict))
+
+    return comparison
+
+def format_result(result):
+    if result["error"]:
+        return f"{result['stage']:<34} {result['case']:<16} ERROR {result['error']}"
+
+    memory = "" if result.get("peak_memory_kb") is None else f"{result['peak_memory_kb']:>10.1f} KB"
+    return (f"{result['stage']:<34} {result['case']:<16} "
+            f"median {result['median_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms{memory}")
+
+def parse_scales(text):
+    """Parse "10x2,63x4" into [(10, 2), (63, 4)]."""
+    scales = []
+
+    for part in text.split(","):
+        part = part.strip()
+
+        if part:
+            provinces, _, audiences = part.lower().partition("x")
+            scales.append((int(provinces), int(audiences or 1)))
+
+    return scales
+
+def parse_args(argv=None):
+    from benchmarks.stages import STAGE_NAMES
+    from benchmarks.cases import BUNDLED_PROJECTS
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the estimation pipeline.")
+    parser.add_argument("--stages", default="", help=f"Comma separated stages (default: all): {', '.join(STAGE_NAMES)}")
+    parser.add_argument("--projects", default=",".join(BUNDLED_PROJECTS), help="Comma separated bundled projects, empty for none")
+    parser.add_argument("--scale", default="10x2,63x4", help="Synthetic projects as <provinces>x<audiences>, comma separated")
+    parser.add_argument("--elements", default="300", help="Element counts of the synthetic element cost tables, comma separated")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before the timed ones")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--output", "-o", default="", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", default="", help="Previous JSON report to compare the medians with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change reported by --compare")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+
+    args = parse_args(argv)
+
+    # Config files and bundled projects are loaded relative to the repository
+    os.chdir(REPO_DIR)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+    from benchmarks.stages import get_stages
+    from benchmarks.cases import bundled_project_cases, scaled_project_cases, element_costs_cases
+
+    stages = get_stages([name.strip() for name in args.stages.split(",") if name.strip()])
+
+    project_names = [name.strip() for name in args.projects.split(",") if name.strip()]
+    project_cases = (bundled_project_cases(project_names) if project_names else []) + scaled_project_cases(parse_scales(args.scale))
+    cost_cases = element_costs_cases([int(count) for count in args.elements.split(",") if count.strip()])
+
+    report = run_benchmarks(
+        stages, project_cases, cost_cases,
+        repeat=args.repeat, warmup=args.warmup, memory=not args.no_memory,
+        progress=lambda result: print(format_result(result), file=sys.stderr)
+    )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            previous = json.load(file)
+
+        regressions = 0
+        print(f"\nCompared with {previous.get('meta', {}).get('commit') or args.compare}:", file=sys.stderr)
+
+        for stage, case, old, new, ratio, verdict in compare_reports(report, previous, args.threshold):
+            if verdict == "missing":
+                print(f"{stage:<34} {case:<16} not comparable", file=sys.stderr)
+                continue
+
+            regressions += verdict == "regression"
+            print(f"{stage:<34} {case:<16} {old:>9.2f} -> {new:>9.2f} ms  x{ratio:.2f}  {verdict}", file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
@@ -0,0 +1,248 @@
+# benchmarks/stages.py
+# -*- coding: utf-8 -*-
+"""
+Pipeline stages timed by the benchmarks.
+
+Every stage has an untimed setup building its input from a case, the timed run,
+and an optional untimed teardown. Project stages run on ProjectCase inputs,
+database stages on ElementCostsCase inputs.
+"""
+
+import copy
+import io
+import os
+import re
+import shutil
+import tempfile
+
+import openpyxl
+
+from models.project_model import ProjectModel
+from models.vector_cost_engine import verify_rows
+from database.db_manager import DatabaseManager
+
+PROJECT_STAGE = "project"
+ELEMENT_COSTS_STAGE = "element_costs"
+
+# Every n-th element row gets new cost values before each timed save_element_costs
+SAVE_CHANGED_ROW_STEP = 4
+
+class Stage:
+    """A timed step of the pipeline."""
+
+    def __init__(self, name, kind, run, setup=None, teardown=None, needs_qt=False):
+        """
+        Args:
+            name (str): Stage name used in the report
+            kind (str): PROJECT_STAGE or ELEMENT_COSTS_STAGE
+            run (callable): run(state) -> result, the timed part
+            setup (callable, optional): setup(case, context) -> state, untimed
+            teardown (callable, optional): teardown(state, result), untimed
+            needs_qt (bool): The stage creates widgets and needs a QApplication
+        """
+        self.name = name
+        self.kind = kind
+        self.run = run
+        self.setup = setup or (lambda case, context: case)
+        self.teardown = teardown
+        self.needs_qt = needs_qt
+
+    def __repr__(self):
+        return f"Stage({self.name})"
+
+class BenchmarkContext:
+    """Resources shared by the stages of one benchmark run."""
+
+    def __init__(self):
+        self.app = None
+        self.temp_dir = None
+        self._databases = {}
+        self._save_revisions = {}
+
+    def ensure_qt(self):
+        """Create the QApplication on first use (offscreen, see benchmarks/__init__.py)."""
+        if self.app is None:
+            from PySide6.QtWidgets import QApplication
+            self.app = QApplication.instance() or QApplication([])
+        return self.app
+
+    def process_deferred_deletes(self):
+        if self.app is not None:
+            from PySide6.QtCore import QCoreApplication, QEvent
+            QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    def database(self, case):
+        """
+        Temporary database holding the element costs of a case.
+
+        Args:
+            case (ElementCostsCase): The case
+
+        Returns:
+            DatabaseManager: Manager of a database file in the run's temp directory
+        """
+        if case.name not in self._databases:
+            if self.temp_dir is None:
+                self.temp_dir = tempfile.mkdtemp(prefix="estimate_bench_")
+
+            file_name = re.sub(r"[^A-Za-z0-9]+", "_", case.name) + ".db"
+            db_manager = DatabaseManager(db_path=os.path.join(self.temp_dir, file_name))
+            db_manager.save_element_costs(case.project_type, case.data)
+
+            self._databases[case.name] = db_manager
+
+        return self._databases[case.name]
+
+    def next_save_revision(self, case):
+        """Number of the next save of a case, so every save writes different values."""
+        revision = self._save_revisions.get(case.name, 0) + 1
+        self._save_revisions[case.name] = revision
+        return revision
+
+    def close(self):
+        for db_manager in self._databases.values():
+            db_manager.close()
+        self._databases.clear()
+
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+def load_model(case, context=None):
+    project_model = ProjectModel()
+    project_model.from_dict(copy.deepcopy(case.data))
+    return project_model
+
+def _setup_vectorized(case, context):
+    """The loaded model, once the vectorized rows are checked against the row-by-row ones."""
+    project_model = load_model(case)
+
+    mismatches = verify_rows(project_model)
+    if mismatches:
+        index, expected, actual = mismatches[0]
+        raise ValueError(
+            f"[Benchmark Error] Vectorized rows of {case.name} differ in {len(mismatches)} rows, "
+            f"first at row {index}: {expected} != {actual}"
+        )
+
+    return project_model
+
+def _setup_dialog(case, context):
+    from ui.dialogs.hierarchical_cost_results_dialog import HierarchicalCostResultsDialog
+
+    context.ensure_qt()
+    project_model = load_model(case)
+    rows = project_model.flatten_cost_hierarchy()
+
+    return project_model, rows, HierarchicalCostResultsDialog
+
+def _run_dialog(state):
+    project_model, rows, dialog_class = state
+    return dialog_class(rows)
+
+def _setup_excel_export(case, context):
+    project_model, rows, dialog_class = _setup_dialog(case, context)
+    return project_model, dialog_class(rows)
+
+def _run_excel_export(state):
+    project_model, dialog = state
+
+    wb = openpyxl.Workbook()
+    dialog.create_estimate_cost_sheet(wb, project_model=project_model)
+
+    if "Sheet" in wb.sheetnames:
+        wb.remove(wb["Sheet"])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    return buffer.tell()
+
+def _setup_save_element_costs(case, context):
+    """
+    Costs differing from the stored ones in a share of the rows.
+
+    The database already holds the case's costs and save_element_costs only writes
+    the rows that differ, so every run changes the values of every
+    SAVE_CHANGED_ROW_STEP-th row again.
+    """
+    db_manager = context.database(case)
+    revision = context.next_save_revision(case)
+
+    df = case.data.copy()
+    cost_columns = [column for column in df.columns if column.startswith("L") and " (" in column]
+    changed = df.index[::SAVE_CHANGED_ROW_STEP]
+    df.loc[changed, cost_columns] = df.loc[changed, cost_columns] + revision
+
+    return db_manager, case.project_type, df
+
+def _delete_widget(widget):
+    widget.deleteLater()
+
+STAGES = [
+    Stage(
+        "from_dict", PROJECT_STAGE,
+        setup=lambda case, context: copy.deepcopy(case.data),
+        run=lambda data: ProjectModel().from_dict(data)
+    ),
+    Stage(
+        "update_samples_structure", PROJECT_STAGE,
+        setup=load_model,
+        run=lambda project_model: project_model.update_samples_structure()
+    ),
+    Stage(
+        "flatten_cost_hierarchy", PROJECT_STAGE,
+        setup=load_model,
+        run=lambda project_model: project_model.flatten_cost_hierarchy()
+    ),
+    Stage(
+        "flatten_cost_hierarchy_vectorized", PROJECT_STAGE,
+        setup=_setup_vectorized,
+        run=lambda project_model: project_model.flatten_cost_hierarchy(vectorized=True)
+    ),
+    Stage(
+        "results_dialog", PROJECT_STAGE,
+        setup=_setup_dialog,
+        run=_run_dialog,
+        teardown=lambda state, dialog: _delete_widget(dialog),
+        needs_qt=True
+    ),
+    Stage(
+        "excel_export", PROJECT_STAGE,
+        setup=_setup_excel_export,
+        run=_run_excel_export,
+        teardown=lambda state, size: _delete_widget(state[1]),
+        needs_qt=True
+    ),
+    Stage(
+        "get_element_costs", ELEMENT_COSTS_STAGE,
+        setup=lambda case, context: (context.database(case), case.project_type),
+        run=lambda state: state[0].get_element_costs(state[1])
+    ),
+    Stage(
+        "save_element_costs", ELEMENT_COSTS_STAGE,
+        setup=_setup_save_element_costs,
+        run=lambda state: state[0].save_element_costs(state[1], state[2])
+    ),
+]
+
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+def get_stages(names=None):
+    """
+    Stages by name, in pipeline order.
+
+    Args:
+        names (list, optional): Stage names, all stages by default
+
+    Returns:
+        list: The Stage objects
+    """
+    if not names:
+        return list(STAGES)
+
+    unknown = [name for name in names if name not in STAGE_NAMES]
+    if unknown:
+        raise ValueError(f"[Benchmark Error] Unknown stages: {', '.join(unknown)}")
+
+    return [stage for stage in STAGES if stage.name in names]
@@ -13,6 +13,27 @@ DEFAULT_SAVE_DIR = "projects"
 # Currency symbol (for display only)
 CURRENCY_SYMBOL = "VND"
 
+# SQLite connection settings of DatabaseManager
+DATABASE_SETTINGS = {
+    "cache_size_kb": 16384,      # Page cache per connection (PRAGMA cache_size)
+    "cached_statements": 256,    # Prepared statements kept per connection
+    "busy_timeout_s": 5.0,       # Wait for a lock held by another connection
+    "read_threads": 2,           # Background threads running read jobs (DbWorker)
+    "backup_pages": 256          # Pages copied per step of an online backup/restore
+}
+
+# Source of the cost hierarchies that projects are priced with
+COST_HIERARCHY_SETTINGS = {
+    # Project types whose hierarchy is compiled from the element cost database (cached
+    # in "hierarchy_cache" next to the database file) instead of its config JSON file,
+    # which remains the fallback while the project type has no costs. CLT keeps its
+    # file: the database stores five subtitle levels and its travel branch uses six.
+    "from_database": {
+        "F2F/D2D": True,
+        "CLT": False
+    }
+}
+
 # Default values for new projects
 DEFAULT_VALUES = {
     "interview_length": 30,
@@ -2,24 +2,73 @@
 # -*- coding: utf-8 -*-
 import sqlite3
 import pandas as pd
+import numpy as np
 import os
 import logging
 import sys
 import json
+import weakref
+import datetime
+import threading
 from pathlib import Path
 
+from config.settings import DATABASE_SETTINGS
+from database.db_migrator import migrate, backup_database, CONTENT_VERSION_TOKEN
+from utils.profiler import profile_methods
+
+# Every DatabaseManager, so close_all_connections() can close them at shutdown
+_MANAGERS = weakref.WeakSet()
+
+def close_all_connections():
+    """Close the connections of every DatabaseManager, e.g. before the application quits."""
+    for manager in list(_MANAGERS):
+        manager.close()
+
+class _ThreadConnection:
+    """The connection of one thread, held in its thread-local storage."""
+    
+    __slots__ = ("conn", "generation", "depth", "__weakref__")
+    
+    def __init__(self, conn, generation):
+        self.conn = conn
+        self.generation = generation
+        self.depth = 0
+
+def _discard_connection(manager_ref, conn):
+    """Close the connection of a thread that ended; run when its _ThreadConnection is freed."""
+    manager = manager_ref()
+    if manager is not None:
+        manager._forget_connection(conn)
+    
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+@profile_methods("db")
 class DatabaseManager:
     """Manages database connections and operations for element costs storage."""
     
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, cache_size_kb=None):
         """Initialize the database manager.
         
         Args:
             db_path (str, optional): Path to the SQLite database file.
                 If None, a default path will be used.
+            cache_size_kb (int, optional): SQLite page cache per connection.
+                If None, DATABASE_SETTINGS["cache_size_kb"] is used.
         """
         self.logger = logging.getLogger(__name__)
         
+        self.cache_size_kb = DATABASE_SETTINGS["cache_size_kb"] if cache_size_kb is None else cache_size_kb
+        
+        # One long-lived connection per thread, see _get_connection
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        _MANAGERS.add(self)
+        
         if db_path is None:
             # Determine if running as bundled executable
             if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
@@ -59,84 +108,329 @@ class DatabaseManager:
         self._init_database()
         
     def _init_database(self):
-        """Initialize the database structure with support for dynamic levels and lengths."""
+        """Create the database structure or upgrade it to the current schema version."""
         conn = None
         try:
             conn = self._get_connection()
-            cursor = conn.cursor()
             
-            # Create project_types table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS project_types (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-            ''')
-            
-            # Create base element_costs table without level/length columns
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS element_costs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_type_id INTEGER NOT NULL,
-                subtitle_code TEXT,
-                subtitle_1 TEXT,
-                subtitle_2 TEXT,
-                subtitle_3 TEXT,
-                subtitle_4 TEXT,
-                subtitle_5 TEXT,
-                row_order INTEGER,
-                unit TEXT,
-                FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
-            )
-            ''')
-            
-            # Create new table for level/length combinations
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS element_costs_values (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                element_cost_id INTEGER NOT NULL,
-                level TEXT NOT NULL,
-                length_min INTEGER NOT NULL,
-                length_max INTEGER NOT NULL,
-                cost_value REAL,
-                FOREIGN KEY (element_cost_id) REFERENCES element_costs (id) ON DELETE CASCADE
-            )
-            ''')
-            
-            # Create metadata table to store level and length information for each project type
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS project_metadata (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_type_id INTEGER NOT NULL,
-                levels TEXT NOT NULL,  -- JSON array of levels
-                lengths TEXT NOT NULL,  -- JSON array of length ranges
-                FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
-            )
-            ''')
-            
-            conn.commit()
-            self.logger.info("Database initialized successfully with dynamic level/length support")
+            # Versioned migrations, see database/db_migrator.py
+            version = migrate(conn, self.db_path)
+            self.logger.info(f"Database initialized successfully at schema version {version}")
             
         except sqlite3.Error as e:
             self.logger.error(f"Database initialization error: {e}")
-            if conn:
-                conn.rollback()
                 
         finally:
-            if conn:
-                conn.close()
-    
-    def _get_connection(self):
-        """Get a connection to the database.
+            self._release_connection(conn)
+        
+    def _open_connection(self):
+        """Open and configure a new connection to the database.
         
         Returns:
-            sqlite3.Connection: A connection to the SQLite database.
+            sqlite3.Connection: The connection, in WAL mode with foreign keys enabled.
         """
+        # Only the owning thread uses the connection; close() may run on another one
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DATABASE_SETTINGS["busy_timeout_s"],
+            cached_statements=DATABASE_SETTINGS["cached_statements"],
+            check_same_thread=False
+        )
+        
         # Enable foreign key support
-        conn = sqlite3.connect(self.db_path)
         conn.execute("PRAGMA foreign_keys = 1")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        
+        with self._connections_lock:
+            self._connections.append(conn)
+        
         return conn
     
+    def _get_connection(self):
+        """Get the connection of the current thread, opening it on first use.
+        
+        Every call must be paired with _release_connection. The connection is closed
+        when the thread ends and its thread-local storage is freed.
+        
+        Returns:
+            sqlite3.Connection: A connection to the SQLite database.
+        """
+        holder = getattr(self._local, "holder", None)
+        
+        if holder is None or holder.generation != self._generation:
+            holder = self._local.holder = _ThreadConnection(self._open_connection(), self._generation)
+            weakref.finalize(holder, _discard_connection, weakref.ref(self), holder.conn)
+        
+        holder.depth += 1
+        return holder.conn
+    
+    def _forget_connection(self, conn):
+        """Stop tracking the connection of a thread that ended."""
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+    
+    def _release_connection(self, conn):
+        """Release a connection obtained from _get_connection.
+        
+        When the outermost caller releases it, a transaction it left open is rolled
+        back, as closing the connection used to do.
+        
+        Args:
+            conn (sqlite3.Connection): The connection, or None if getting it failed.
+        """
+        if conn is None:
+            return
+        
+        holder = self._local.holder
+        holder.depth -= 1
+        
+        if holder.depth == 0 and conn.in_transaction:
+            conn.rollback()
+    
+    def checkpoint(self):
+        """Copy the write-ahead log into the database file, e.g. before copying the file.
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+            
+        except sqlite3.Error as e:
+            self.logger.error(f"Error checkpointing database: {e}")
+            return False
+            
+        finally:
+            self._release_connection(conn)
+    
+    def _backup_progress(self, progress):
+        """Adapt progress(done, total) to the progress(status, remaining, total) of Connection.backup."""
+        if progress is None:
+            return None
+        return lambda status, remaining, total: progress(total - remaining, total)
+    
+    def backup_to(self, file_path, progress=None):
+        """Copy the database to a file with the SQLite online-backup API.
+        
+        The copy is consistent while other connections keep writing, and is taken in
+        steps of DATABASE_SETTINGS["backup_pages"] pages.
+        
+        Args:
+            file_path (str): Destination file, replaced once the copy is complete
+            progress (callable, optional): progress(done_pages, total_pages) after each step;
+                an exception it raises aborts the backup and propagates
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            backup_database(
+                conn, file_path,
+                pages=DATABASE_SETTINGS["backup_pages"],
+                progress=self._backup_progress(progress)
+            )
+            self.logger.info(f"Backed up database to {file_path}")
+            return True
+            
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Error backing up database to {file_path}: {e}")
+            return False
+            
+        finally:
+            self._release_connection(conn)
+    
+    def restore_from(self, file_path, progress=None):
+        """Replace the contents of the database with a backup, without closing it.
+        
+        The backup is copied into the live database with the online-backup API, in one
+        write transaction, so other connections see either the old or the restored
+        data; an aborted restore leaves the database unchanged. A backup of an older
+        schema version is upgraded afterwards.
+        
+        The copy replaces element_costs_history too, so the history of the live database
+        is merged back in afterwards, see _merge_history, and the values the restore
+        changed are recorded at the time of the restore. The history of project types
+        that are not in the backup is dropped with them.
+        
+        Args:
+            file_path (str): Backup file, e.g. written by backup_to
+            progress (callable, optional): progress(done_pages, total_pages) after each step;
+                an exception it raises aborts the restore and propagates
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        source = None
+        conn = None
+        try:
+            source_uri = Path(os.path.abspath(file_path)).as_uri() + "?mode=ro"
+            source = sqlite3.connect(source_uri, uri=True)
+            
+            # Refuse files that are damaged or are not an element costs database
+            check = source.execute("PRAGMA quick_check").fetchone()[0]
+            tables = {row[0] for row in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if check != "ok" or not {"project_types", "element_costs"} <= tables:
+                self.logger.error(f"[Database Error] {file_path} is not a valid element costs database")
+                return False
+            
+            conn = self._get_connection()
+            
+            # Set the live history aside; the temp schema is not part of the copy
+            conn.execute("DROP TABLE IF EXISTS temp.live_history")
+            conn.execute(
+                """
+                CREATE TEMP TABLE live_history AS
+                SELECT p.name AS project_type, h.subtitle_code, h.occurrence, h.level,
+                       h.length_min, h.length_max, h.cost_value, h.effective_from
+                FROM element_costs_history h
+                JOIN project_types p ON p.id = h.project_type_id
+                ORDER BY h.id
+                """
+            )
+            
+            source.backup(
+                conn,
+                pages=DATABASE_SETTINGS["backup_pages"],
+                progress=self._backup_progress(progress)
+            )
+            
+            version = migrate(conn, backup=False)
+            
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            self._merge_history(cursor, self._history_now())
+            conn.commit()
+            
+            self.logger.info(f"Restored database from {file_path} at schema version {version}")
+            return True
+            
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Error restoring database from {file_path}: {e}")
+            if conn and conn.in_transaction:
+                conn.rollback()
+            return False
+            
+        finally:
+            if source is not None:
+                source.close()
+            if conn is not None:
+                try:
+                    conn.execute("DROP TABLE IF EXISTS temp.live_history")
+                except sqlite3.Error:
+                    pass
+            self._release_connection(conn)
+    
+    def _merge_history(self, cursor, effective_from):
+        """
+        Merge the history set aside by restore_from into the restored database.
+        
+        History records identify elements by project type name, subtitle code and
+        occurrence rather than by row ids, so the records of the live database apply to
+        the restored one. Records the backup already holds are skipped. Then every value
+        key whose latest record differs from the restored value gets a record at
+        effective_from, so a point-in-time query before the restore returns the values
+        of the live database and one after it the restored values.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+            effective_from (str): Timestamp of the restore, from _history_now
+        """
+        cursor.execute(
+            """
+            INSERT INTO element_costs_history
+            (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+            SELECT p.id, l.subtitle_code, l.occurrence, l.level, l.length_min, l.length_max, l.cost_value, l.effective_from
+            FROM temp.live_history l
+            JOIN project_types p ON p.name = l.project_type
+            WHERE NOT EXISTS (
+                SELECT 1 FROM element_costs_history h
+                WHERE h.project_type_id = p.id
+                    AND h.subtitle_code IS l.subtitle_code
+                    AND h.occurrence = l.occurrence
+                    AND h.level = l.level
+                    AND h.length_min = l.length_min
+                    AND h.length_max = l.length_max
+                    AND h.effective_from = l.effective_from
+                    AND h.cost_value IS l.cost_value
+            )
+            """
+        )
+        
+        # The latest record of a value key, now including the live history
+        latest_value = """
+            SELECT h.cost_value FROM element_costs_history h
+            WHERE h.project_type_id = {0}.project_type_id
+                AND h.subtitle_code IS {0}.subtitle_code
+                AND h.occurrence = {0}.occurrence
+                AND h.level = {0}.level
+                AND h.length_min = {0}.length_min
+                AND h.length_max = {0}.length_max
+            ORDER BY h.effective_from DESC, h.id DESC
+            LIMIT 1
+        """
+        
+        # Keys whose value the restore removed
+        cursor.execute(
+            f"""
+            INSERT INTO element_costs_history
+            (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+            SELECT k.project_type_id, k.subtitle_code, k.occurrence, k.level, k.length_min, k.length_max, NULL, ?
+            FROM (
+                SELECT DISTINCT project_type_id, subtitle_code, occurrence, level, length_min, length_max
+                FROM element_costs_history
+            ) k
+            WHERE ({latest_value.format("k")}) IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM element_costs e
+                    JOIN element_costs_values v ON v.element_cost_id = e.id
+                    WHERE e.project_type_id = k.project_type_id
+                        AND e.subtitle_code IS k.subtitle_code
+                        AND e.occurrence = k.occurrence
+                        AND v.level = k.level
+                        AND v.length_min = k.length_min
+                        AND v.length_max = k.length_max
+                )
+            """,
+            (effective_from,)
+        )
+        
+        # Keys whose value the restore added or changed
+        cursor.execute(
+            f"""
+            INSERT INTO element_costs_history
+            (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+            SELECT c.project_type_id, c.subtitle_code, c.occurrence, c.level, c.length_min, c.length_max, c.cost_value, ?
+            FROM (
+                SELECT e.project_type_id, e.subtitle_code, e.occurrence, v.level, v.length_min, v.length_max, v.cost_value
+                FROM element_costs e
+                JOIN element_costs_values v ON v.element_cost_id = e.id
+            ) c
+            WHERE c.cost_value IS NOT ({latest_value.format("c")})
+            """,
+            (effective_from,)
+        )
+    
+    def close(self):
+        """Close the connections of all threads. Threads reconnect on their next call."""
+        with self._connections_lock:
+            connections = self._connections
+            self._connections = []
+            self._generation += 1
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                self.logger.error(f"Error closing database connection: {e}")
+    
     def get_project_types(self):
         """Get all project types from the database.
         
@@ -158,8 +452,37 @@ class DatabaseManager:
             return []
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
+    
+    def get_project_type_manifest(self):
+        """Get every project type with the number of its element rows, in one query.
+        
+        Returns:
+            dict: {project_type: row_count} in the order of get_project_types.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            # Counted from an index on project_type_id, the element rows are not read
+            cursor.execute(
+                """
+                SELECT p.name, COUNT(e.id)
+                FROM project_types p
+                LEFT JOIN element_costs e ON e.project_type_id = p.id
+                GROUP BY p.id
+                ORDER BY p.id
+                """
+            )
+            return {name: row_count for name, row_count in cursor.fetchall()}
+            
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting project type manifest: {e}")
+            return {}
+            
+        finally:
+            self._release_connection(conn)
     
     def get_project_type_id(self, project_type):
         """Get the ID for a project type.
@@ -185,8 +508,7 @@ class DatabaseManager:
             return None
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
     
     def add_project_type(self, project_type):
         """Add a new project type to the database.
@@ -214,8 +536,7 @@ class DatabaseManager:
             return None
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
     
     def delete_project_type(self, project_type):
         """Delete a project type and all its element costs.
@@ -231,6 +552,18 @@ class DatabaseManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
+            cursor.execute("BEGIN")
+            cursor.execute(
+                """
+                DELETE FROM element_cost_imports
+                WHERE content_hash IN (
+                    SELECT i.content_hash FROM element_cost_imports i
+                    JOIN project_types p ON p.id = i.project_type_id
+                    WHERE p.name = ?
+                )
+                """,
+                (project_type,)
+            )
             cursor.execute("DELETE FROM project_types WHERE name = ?", (project_type,))
             conn.commit()
             
@@ -243,15 +576,20 @@ class DatabaseManager:
             return False
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
     
-    def get_element_costs(self, project_type):
+    def get_element_costs(self, project_type, as_of=None):
         """
         Get all element costs for a project type with dynamic level/length support.
         
         Args:
             project_type (str): The project type name
+            as_of (datetime | date | str, optional): Return the cost values in effect at
+                this time, from element_costs_history; a date means the end of that day.
+                The elements and the levels/lengths are the current ones: elements
+                removed since are missing and elements added since have no values.
+                The history of an element is found by its subtitle code and occurrence,
+                so an element removed and added again gets its earlier values back.
             
         Returns:
             tuple: (DataFrame of costs, metadata dict) or (None, None) if error
@@ -306,7 +644,7 @@ class DatabaseManager:
                 e.row_order
             FROM element_costs e
             WHERE e.project_type_id = ?
-            ORDER BY e.row_order
+            ORDER BY e.row_order, e.id
             """.format(project_type)
             
             base_df = pd.read_sql_query(base_query, conn, params=(project_type_id,))
@@ -334,30 +672,14 @@ class DatabaseManager:
             WHERE e.project_type_id = ?
             """
             
-            values_df = pd.read_sql_query(values_query, conn, params=(project_type_id,))
+            if as_of is None:
+                values_df = pd.read_sql_query(values_query, conn, params=(project_type_id,))
+            else:
+                values_df = self._read_values_as_of(conn, project_type_id, levels, length_ranges, as_of)
             
-            # Map each cost value to the appropriate column
-            for _, value_row in values_df.iterrows():
-                element_id = value_row['element_id']
-                level = value_row['level']
-                min_length = value_row['length_min']
-                max_length = value_row['length_max']
-                cost_value = value_row['cost_value']
-                
-                # Find the matching length range
-                matching_length = None
-                for length in lengths:
-                    range_min, range_max = length_ranges.get(length, (0, 60))
-                    if min_length == range_min and max_length == range_max:
-                        matching_length = length
-                        break
-                
-                if matching_length:
-                    col_name = f"{level} ({matching_length})"
-                    # Find the row index for this element_id
-                    row_idx = base_df[base_df['id'] == element_id].index
-                    if not row_idx.empty:
-                        base_df.at[row_idx[0], col_name] = cost_value
+            # Map each cost value to the appropriate column in one pass
+            if not values_df.empty:
+                base_df = self._fill_cost_columns(base_df, values_df, levels, lengths, length_ranges)
             
             # Remove the id column as it's not needed in the result
             if 'id' in base_df.columns:
@@ -374,9 +696,286 @@ class DatabaseManager:
             return None, None
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
 
+    # The value of every current element and value key at the given time: the latest
+    # history record of the key, found by a backward seek on idx_element_costs_history_key.
+    # Elements are matched by subtitle code and stored occurrence (see db_migrator.migrate_v3);
+    # {value_keys} is a VALUES list of the (level, length_min, length_max) keys. A NULL
+    # cost_value means the key had no value at that time
+    AS_OF_VALUES_QUERY = """
+    WITH value_keys (level, length_min, length_max) AS (VALUES {value_keys})
+    SELECT e.id as element_id, k.level, k.length_min, k.length_max, (
+        SELECT h.cost_value FROM element_costs_history h
+        WHERE h.project_type_id = e.project_type_id
+            AND h.subtitle_code = e.subtitle_code
+            AND h.occurrence = e.occurrence
+            AND h.level = k.level
+            AND h.length_min = k.length_min
+            AND h.length_max = k.length_max
+            AND h.effective_from <= ?
+        ORDER BY h.effective_from DESC, h.id DESC
+        LIMIT 1
+    ) AS cost_value
+    FROM element_costs e
+    CROSS JOIN value_keys k
+    WHERE e.project_type_id = ?
+    """
+    
+    def _read_values_as_of(self, conn, project_type_id, levels, length_ranges, as_of):
+        """
+        Read the cost values of a project type's current elements at a point in time.
+        
+        Args:
+            conn (sqlite3.Connection): The connection of the caller
+            project_type_id (int): The project type ID
+            levels (list): Current levels of the project type
+            length_ranges (dict): Current {length label: (min, max)} of the project type
+            as_of (datetime | date | str): The point in time, see get_element_costs
+            
+        Returns:
+            DataFrame: element_id, level, length_min, length_max, cost_value rows
+        """
+        # Only the keys of the current levels/lengths have a column to fill
+        value_keys = sorted({
+            (level, min_length, max_length)
+            for level in levels
+            for min_length, max_length in length_ranges.values()
+        })
+        if not value_keys:
+            return pd.DataFrame(columns=["element_id", "level", "length_min", "length_max", "cost_value"])
+        
+        query = self.AS_OF_VALUES_QUERY.format(value_keys=", ".join(["(?, ?, ?)"] * len(value_keys)))
+        params = [item for key in value_keys for item in key] + [self.history_timestamp(as_of), project_type_id]
+        
+        values_df = pd.read_sql_query(query, conn, params=params)
+        return values_df.dropna(subset=["cost_value"])
+    
+    def history_timestamp(self, as_of):
+        """
+        Convert an as_of argument to the text format of element_costs_history.effective_from.
+        
+        Args:
+            as_of (datetime | date | str): A point in time; a date or "YYYY-MM-DD"
+                string means the end of that day
+            
+        Returns:
+            str: "YYYY-MM-DD HH:MM:SS.SSS"
+        """
+        if isinstance(as_of, datetime.datetime):
+            return as_of.strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+        
+        if isinstance(as_of, datetime.date):
+            return f"{as_of.isoformat()} 23:59:59.999"
+        
+        as_of = str(as_of).strip().replace("T", " ")
+        if len(as_of) == 10:
+            return f"{as_of} 23:59:59.999"
+        return as_of
+    
+    def get_history_dates(self, project_type):
+        """
+        Get the times at which cost values of a project type changed.
+        
+        Args:
+            project_type (str): The project type name
+            
+        Returns:
+            list: effective_from strings, newest first
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                SELECT DISTINCT h.effective_from
+                FROM element_costs_history h
+                JOIN project_types p ON p.id = h.project_type_id
+                WHERE p.name = ?
+                ORDER BY h.effective_from DESC
+                """,
+                (project_type,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+            
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting cost history dates: {e}")
+            return []
+            
+        finally:
+            self._release_connection(conn)
+    
+    def get_content_version(self, project_type):
+        """
+        Get the content version of a project type's element costs.
+        
+        The version is a random token replaced by every transaction that changes the
+        elements, cost values or levels/lengths of the project type, so it can key
+        caches of anything built from them.
+        
+        Args:
+            project_type (str): The project type name
+            
+        Returns:
+            str: The version, or None if the project type is unknown
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                SELECT v.version
+                FROM element_cost_versions v
+                JOIN project_types p ON p.id = v.project_type_id
+                WHERE p.name = ?
+                """,
+                (project_type,)
+            )
+            result = cursor.fetchone()
+            
+            return result[0] if result else None
+            
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting content version: {e}")
+            return None
+            
+        finally:
+            self._release_connection(conn)
+    
+    def get_hierarchy_elements(self, project_type):
+        """
+        Get the elements of a project type for building its cost hierarchy.
+        
+        Each element comes with its base cost, the value of the first level of the
+        project type's metadata for its shortest length range.
+        
+        Args:
+            project_type (str): The project type name
+            
+        Returns:
+            tuple: (version, rows) where version is as returned by get_content_version
+                and rows are (subtitle_code, subtitle_1..5, unit, base_cost) tuples in
+                row order, base_cost being None when the value is missing; (None, None)
+                if the project type is unknown or on error
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            # Read before the elements: a write in between leaves the rows newer than
+            # the version, never older, so a cache keyed by it is not poisoned
+            cursor.execute(
+                """
+                SELECT p.id, v.version, m.levels, m.lengths
+                FROM project_types p
+                JOIN element_cost_versions v ON v.project_type_id = p.id
+                LEFT JOIN project_metadata m ON m.project_type_id = p.id
+                WHERE p.name = ?
+                """,
+                (project_type,)
+            )
+            result = cursor.fetchone()
+            if result is None:
+                return None, None
+                
+            project_type_id, version, levels_json, lengths_json = result
+            
+            levels = json.loads(levels_json) if levels_json else []
+            lengths = json.loads(lengths_json) if lengths_json else []
+            if levels and lengths:
+                base_key = (levels[0],) + min(tuple(self._parse_length_range(length)) for length in lengths)
+            else:
+                base_key = (None, None, None)
+                
+            cursor.execute(
+                """
+                SELECT e.subtitle_code, e.subtitle_1, e.subtitle_2, e.subtitle_3, e.subtitle_4,
+                       e.subtitle_5, e.unit, v.cost_value
+                FROM element_costs e
+                LEFT JOIN element_costs_values v
+                    ON v.element_cost_id = e.id AND v.level = ? AND v.length_min = ? AND v.length_max = ?
+                WHERE e.project_type_id = ?
+                ORDER BY e.row_order, e.id
+                """,
+                base_key + (project_type_id,)
+            )
+            
+            return version, cursor.fetchall()
+            
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.error(f"Error getting hierarchy elements: {e}")
+            return None, None
+            
+        finally:
+            self._release_connection(conn)
+    
+    def _fill_cost_columns(self, base_df, values_df, levels, lengths, length_ranges):
+        """
+        Pivot the level/length cost values onto the element rows.
+        
+        Args:
+            base_df (DataFrame): Element rows with an "id" column and the cost columns
+            values_df (DataFrame): element_id, level, length_min, length_max, cost_value rows
+            levels (list): Levels of the project type
+            lengths (list): Length labels of the project type
+            length_ranges (dict): {length label: (min, max)}
+            
+        Returns:
+            DataFrame: base_df with the cost values filled in
+        """
+        # (min, max) -> label, the first label wins when two labels parse to the same range
+        length_labels = {}
+        for length in lengths:
+            length_labels.setdefault(tuple(length_ranges.get(length, (0, 60))), length)
+        
+        labels = [
+            length_labels.get(length_range)
+            for length_range in zip(values_df['length_min'].tolist(), values_df['length_max'].tolist())
+        ]
+        columns = [
+            f"{level} ({label})" if label else None
+            for level, label in zip(values_df['level'].tolist(), labels)
+        ]
+        
+        # Column codes in order of first appearance, -1 for values matching no length
+        column_codes, column_names = pd.factorize(pd.Series(columns, dtype=object))
+        
+        values = pd.DataFrame({
+            "row": pd.Index(base_df['id']).get_indexer(values_df['element_id']),
+            "column": column_codes,
+            "cost_value": pd.to_numeric(values_df['cost_value'], errors='coerce').astype(float)
+        })
+        values = values[(values['row'] >= 0) & (values['column'] >= 0)]
+        
+        # The last value stored for an element and column wins
+        values = values.drop_duplicates(subset=["row", "column"], keep="last")
+        
+        rows = values['row'].to_numpy()
+        codes = values['column'].to_numpy()
+        cost_values = values['cost_value'].to_numpy()
+        
+        # Levels missing from the metadata still get a column, after the known ones
+        for code, column in enumerate(column_names):
+            mask = codes == code
+            
+            if not mask.any():
+                continue
+            
+            if column in base_df.columns:
+                column_values = base_df[column].to_numpy(dtype=float, copy=True)
+            else:
+                column_values = np.full(len(base_df), np.nan)
+            
+            column_values[rows[mask]] = cost_values[mask]
+            base_df[column] = column_values
+        
+        return base_df
+    
     def update_element_cost(self, project_type, subtitle_code, classification, interview_length, value):
         """
         Update a specific element cost with dynamic level/length support.
@@ -385,12 +984,36 @@ class DatabaseManager:
             project_type (str): The project type name
             subtitle_code (str): The subtitle code
             classification (str): The classification (L1, L2, L3, L4, etc.)
-            interview_length (str): The interview length category or minutes
+            interview_length (str): The interview length category
             value (float): The new cost value
             
         Returns:
             bool: True if successful, False otherwise
         """
+        return self.update_element_costs(project_type, [(subtitle_code, classification, interview_length, value)])
+    
+    def update_element_costs(self, project_type, edits):
+        """
+        Apply many cost edits of a project type in one transaction.
+        
+        The element ids are resolved with a single query and every edit is written
+        with an UPSERT on the (element_cost_id, level, length_min, length_max) key.
+        The batch is all or nothing: an unknown subtitle code rolls it back. A batch
+        that changes no value writes nothing, so the content version and the import
+        records are kept.
+        
+        Args:
+            project_type (str): The project type name
+            edits (iterable): (subtitle_code, classification, interview_length, value) tuples,
+                interview_length being a length category such as "15-30 min"
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        edits = list(edits)
+        if not edits:
+            return True
+        
         conn = None
         try:
             conn = self._get_connection()
@@ -401,62 +1024,85 @@ class DatabaseManager:
             if project_type_id is None:
                 return False
             
-            # Get the element cost ID
+            # Repeated subtitle codes resolve to their first row, as the single-cell lookup did
             cursor.execute(
-                "SELECT id FROM element_costs WHERE project_type_id = ? AND subtitle_code = ?",
-                (project_type_id, subtitle_code)
+                "SELECT subtitle_code, id FROM element_costs WHERE project_type_id = ? ORDER BY row_order, id",
+                (project_type_id,)
             )
-            result = cursor.fetchone()
-            if result is None:
-                return False
+            element_ids = {}
+            for subtitle_code, element_cost_id in cursor.fetchall():
+                element_ids.setdefault(str(subtitle_code), element_cost_id)
+            
+            length_ranges = {}
+            values = []
+            for subtitle_code, classification, interview_length, value in edits:
+                element_cost_id = element_ids.get(str(subtitle_code))
+                if element_cost_id is None:
+                    self.logger.warning(f"Element {subtitle_code} not found for {project_type}")
+                    return False
                 
-            element_cost_id = result[0]
+                if interview_length not in length_ranges:
+                    length_ranges[interview_length] = self._parse_length_range(interview_length)
+                min_length, max_length = length_ranges[interview_length]
+                
+                values.append((
+                    element_cost_id, classification, min_length, max_length,
+                    None if value is None else float(value)
+                ))
             
-            # Parse the interview length to get min and max values
-            min_length, max_length = self._parse_length_range(interview_length)
+            cursor.execute("BEGIN")
             
-            # Check if this level/length combination already exists
-            cursor.execute(
+            # Record the edits that change a value, before the UPSERT replaces it
+            effective_from = self._history_now()
+            cursor.executemany(
                 """
-                SELECT id FROM element_costs_values 
-                WHERE element_cost_id = ? AND level = ? AND length_min = ? AND length_max = ?
+                INSERT INTO element_costs_history
+                (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+                SELECT e.project_type_id, e.subtitle_code, e.occurrence, ?, ?, ?, ?, ?
+                FROM element_costs e
+                WHERE e.id = ? AND NOT EXISTS (
+                    SELECT 1 FROM element_costs_values v
+                    WHERE v.element_cost_id = e.id AND v.level = ? AND v.length_min = ? AND v.length_max = ?
+                        AND v.cost_value IS ?
+                )
                 """,
-                (element_cost_id, classification, min_length, max_length)
+                [
+                    (level, min_length, max_length, value, effective_from, element_cost_id,
+                     level, min_length, max_length, value)
+                    for element_cost_id, level, min_length, max_length, value in values
+                ]
             )
             
-            result = cursor.fetchone()
-            
-            if result:
-                # Update existing value
-                cursor.execute(
-                    """
-                    UPDATE element_costs_values SET cost_value = ?
-                    WHERE element_cost_id = ? AND level = ? AND length_min = ? AND length_max = ?
-                    """,
-                    (value, element_cost_id, classification, min_length, max_length)
-                )
-            else:
-                # Insert new value
-                cursor.execute(
+            # Edits setting every value to its current one leave the costs, their
+            # content version and the import records as they are
+            changed = cursor.rowcount
+            if changed > 0:
+                cursor.executemany(
                     """
                     INSERT INTO element_costs_values (element_cost_id, level, length_min, length_max, cost_value)
                     VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(element_cost_id, level, length_min, length_max)
+                    DO UPDATE SET cost_value = excluded.cost_value
                     """,
-                    (element_cost_id, classification, min_length, max_length, value)
+                    values
                 )
+                
+                # The costs no longer match the last imported file
+                self._clear_import_records(cursor, project_type_id)
+                self._bump_content_version(cursor, project_type_id)
             
             conn.commit()
+            self.logger.debug(f"Updated {changed} of {len(values)} element cost values for {project_type}")
             return True
             
         except sqlite3.Error as e:
-            self.logger.error(f"Error updating element cost: {e}")
+            self.logger.error(f"Error updating element costs: {e}")
             if conn:
                 conn.rollback()
             return False
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
     
     def save_element_costs(self, project_type, df, metadata=None):
         """
@@ -470,120 +1116,511 @@ class DatabaseManager:
         Returns:
             bool: True if successful, False otherwise
         """
-        if df is None or df.empty:
-            self.logger.warning(f"Cannot save empty element costs for {project_type}")
-            return False
+        return self._save_element_costs(project_type, df, metadata) is not None
+    
+    def import_element_costs(self, project_type, df, metadata, file_name, content_hash):
+        """
+        Save the element costs read from a CSV file and remember the file's content hash.
         
-        if metadata is None:
-            # Try to extract metadata from DataFrame columns
-            metadata = {
-                "levels": [],
-                "lengths": [],
-                "length_ranges": {}
-            }
+        Only the elements and values that differ from the stored ones are written, as
+        in save_element_costs; get_import_records finds the project type by the hash
+        until its costs are saved or edited otherwise.
+        
+        Args:
+            project_type (str): The project type name
+            df (pandas.DataFrame): DataFrame containing element costs
+            metadata (dict): Metadata about levels and lengths
+            file_name (str): Name of the imported file
+            content_hash (str): Hash of the file's content
             
-            for col in df.columns:
-                if " (" in col and col.startswith("L"):
-                    level, length = col.split(" (", 1)
-                    length = length.rstrip(")")
-                    if level not in metadata["levels"]:
-                        metadata["levels"].append(level)
-                    if length not in metadata["lengths"]:
-                        metadata["lengths"].append(length)
-                        metadata["length_ranges"][length] = self._parse_length_range(length)
+        Returns:
+            dict: "new" (the project type had no elements before) and the number of
+                "inserted", "updated" and "deleted" rows, or None on error
+        """
+        changes = self.import_element_cost_sheets([(project_type, df, metadata)], file_name, content_hash)
+        return None if changes is None else changes[0]
+    
+    def import_element_cost_sheets(self, sheets, file_name, content_hash):
+        """
+        Save the element costs of several project types read from one file, in one transaction.
         
+        Args:
+            sheets (list): (project_type, df, metadata) per project type
+            file_name (str): Name of the imported file
+            content_hash (str): Hash of the file's content
+            
+        Returns:
+            list: The changes of each project type as returned by import_element_costs,
+                or None on error, in which case nothing was saved
+        """
+        return self._save_element_costs_batch(
+            [(project_type, df, metadata, (file_name, content_hash)) for project_type, df, metadata in sheets]
+        )
+    
+    def get_import_records(self, content_hash):
+        """
+        Find the project types whose costs were last imported from a file with this content.
+        
+        The records of a file are removed together as soon as the costs of one of its
+        project types are saved, edited or deleted otherwise, so they are either all
+        present or all gone.
+        
+        Args:
+            content_hash (str): Hash of the file's content
+            
+        Returns:
+            list: Dicts with "project_type", "file_name", "metadata" and "imported_at"
+        """
         conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Get or create project type
-            project_type_id = self.get_project_type_id(project_type)
-            if project_type_id is None:
-                project_type_id = self.add_project_type(project_type)
-                if project_type_id is None:
-                    return False
-            
-            # Save metadata for this project type
             cursor.execute(
-                "DELETE FROM project_metadata WHERE project_type_id = ?",
-                (project_type_id,)
+                """
+                SELECT p.name, i.file_name, i.metadata, i.imported_at
+                FROM element_cost_imports i
+                JOIN project_types p ON p.id = i.project_type_id
+                WHERE i.content_hash = ?
+                ORDER BY i.imported_at, p.id
+                """,
+                (content_hash,)
             )
             
-            cursor.execute(
-                "INSERT INTO project_metadata (project_type_id, levels, lengths) VALUES (?, ?, ?)",
-                (project_type_id, json.dumps(metadata["levels"]), json.dumps(metadata["lengths"]))
-            )
+            records = []
+            for name, file_name, metadata_json, imported_at in cursor.fetchall():
+                metadata = json.loads(metadata_json)
+                metadata["length_ranges"] = {
+                    length: tuple(length_range) for length, length_range in metadata.get("length_ranges", {}).items()
+                }
+                records.append({
+                    "project_type": name, "file_name": file_name, "metadata": metadata, "imported_at": imported_at
+                })
             
-            # Delete existing costs for this project type
-            cursor.execute(
-                "DELETE FROM element_costs_values WHERE element_cost_id IN (SELECT id FROM element_costs WHERE project_type_id = ?)",
-                (project_type_id,)
-            )
-            cursor.execute(
-                "DELETE FROM element_costs WHERE project_type_id = ?",
-                (project_type_id,)
-            )
+            return records
             
-            # Insert new costs
-            for _, row in df.iterrows():
-                # Skip rows without subtitle code
-                if pd.isna(row.get("Subtitle Code")):
-                    continue
-                    
-                # Insert base element cost
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.error(f"Error getting import records: {e}")
+            return []
+            
+        finally:
+            self._release_connection(conn)
+    
+    def _clear_import_records(self, cursor, project_type_id):
+        """Forget the file a project type was imported from, with the other project types of that file."""
+        cursor.execute(
+            """
+            DELETE FROM element_cost_imports
+            WHERE content_hash IN (SELECT content_hash FROM element_cost_imports WHERE project_type_id = ?)
+            """,
+            (project_type_id,)
+        )
+    
+    def _bump_content_version(self, cursor, project_type_id):
+        """Give the costs of a project type a new content version, see get_content_version."""
+        cursor.execute(
+            f"""
+            INSERT OR REPLACE INTO element_cost_versions (project_type_id, version)
+            VALUES (?, {CONTENT_VERSION_TOKEN})
+            """,
+            (project_type_id,)
+        )
+    
+    def _history_now(self):
+        """effective_from of the history records of a transaction; one per transaction."""
+        return self.history_timestamp(datetime.datetime.now())
+    
+    def _write_history(self, cursor, records, effective_from):
+        """
+        Append cost value changes to element_costs_history.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+            records (list): (project_type_id, subtitle_code, occurrence, level, length_min,
+                length_max, cost_value) tuples; a None cost_value records a removed value
+            effective_from (str): Timestamp of the transaction, from _history_now
+        """
+        if not records:
+            return
+        
+        cursor.executemany(
+            """
+            INSERT INTO element_costs_history
+            (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [record + (effective_from,) for record in records]
+        )
+    
+    def _metadata_from_columns(self, df):
+        """Metadata of an element costs DataFrame derived from its "<level> (<length>)" columns."""
+        metadata = {
+            "levels": [],
+            "lengths": [],
+            "length_ranges": {}
+        }
+        
+        for col in df.columns:
+            if " (" in col and col.startswith("L"):
+                level, length = col.split(" (", 1)
+                length = length.rstrip(")")
+                if level not in metadata["levels"]:
+                    metadata["levels"].append(level)
+                if length not in metadata["lengths"]:
+                    metadata["lengths"].append(length)
+                    metadata["length_ranges"][length] = self._parse_length_range(length)
+        
+        return metadata
+    
+    def _save_element_costs(self, project_type, df, metadata=None, source=None):
+        """
+        Write the element costs of a project type, see save_element_costs.
+        
+        Args:
+            source (tuple, optional): (file_name, content_hash) of the imported file
+            
+        Returns:
+            dict: "new" and the inserted/updated/deleted row counts, or None on error
+        """
+        changes = self._save_element_costs_batch([(project_type, df, metadata, source)])
+        return None if changes is None else changes[0]
+    
+    def _save_element_costs_batch(self, items):
+        """
+        Write the element costs of several project types in one transaction.
+        
+        Args:
+            items (list): (project_type, df, metadata, source) per project type, source
+                being None or the (file_name, content_hash) of the imported file
+            
+        Returns:
+            list: "new" and the inserted/updated/deleted row counts per item, or None on error
+        """
+        prepared = []
+        for project_type, df, metadata, source in items:
+            if df is None or df.empty:
+                self.logger.warning(f"Cannot save empty element costs for {project_type}")
+                return None
+            
+            if metadata is None:
+                # Try to extract metadata from DataFrame columns
+                metadata = self._metadata_from_columns(df)
+            
+            elements, element_values = self._element_cost_rows(df, metadata)
+            prepared.append((project_type, metadata, source, elements, element_values))
+        
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("BEGIN")
+            effective_from = self._history_now()
+            
+            all_changes = []
+            for project_type, metadata, source, elements, element_values in prepared:
+                # Get or create project type
+                cursor.execute("INSERT OR IGNORE INTO project_types (name) VALUES (?)", (project_type,))
+                cursor.execute("SELECT id FROM project_types WHERE name = ?", (project_type,))
+                project_type_id = cursor.fetchone()[0]
+                
+                # Save metadata for this project type
                 cursor.execute(
-                    """
-                    INSERT INTO element_costs 
-                    (project_type_id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        project_type_id,
-                        str(row.get("Subtitle Code", "")),
-                        str(row.get("Subtitle 1", "")),
-                        str(row.get("Subtitle 2", "")),
-                        str(row.get("Subtitle 3", "")),
-                        str(row.get("Subtitle 4", "")),
-                        str(row.get("Subtitle 5", "")),
-                        int(row.get("row_order", 0) if "row_order" in row else 0),
-                        str(row.get("Unit", ""))
-                    )
+                    "SELECT levels, lengths FROM project_metadata WHERE project_type_id = ?",
+                    (project_type_id,)
                 )
+                metadata_row = (json.dumps(metadata["levels"]), json.dumps(metadata["lengths"]))
+                
+                metadata_changed = cursor.fetchall() != [metadata_row]
+                if metadata_changed:
+                    cursor.execute(
+                        "DELETE FROM project_metadata WHERE project_type_id = ?",
+                        (project_type_id,)
+                    )
+                    cursor.execute(
+                        "INSERT INTO project_metadata (project_type_id, levels, lengths) VALUES (?, ?, ?)",
+                        (project_type_id,) + metadata_row
+                    )
+                
+                cursor.execute("SELECT 1 FROM element_costs WHERE project_type_id = ? LIMIT 1", (project_type_id,))
+                is_new = cursor.fetchone() is None
                 
-                # Get the ID of the inserted element
-                element_cost_id = cursor.lastrowid
+                changes = self._sync_element_costs(cursor, project_type_id, elements, element_values, effective_from)
+                changes["new"] = is_new
                 
-                # Insert cost values for each level/length combination
-                for level in metadata["levels"]:
-                    for length in metadata["lengths"]:
-                        col_name = f"{level} ({length})"
-                        if col_name in row and not pd.isna(row[col_name]):
-                            cost_value = float(row[col_name])
-                            min_length, max_length = metadata["length_ranges"].get(length, (0, 60))
-                            
-                            cursor.execute(
-                                """
-                                INSERT INTO element_costs_values
-                                (element_cost_id, level, length_min, length_max, cost_value)
-                                VALUES (?, ?, ?, ?, ?)
-                                """,
-                                (element_cost_id, level, min_length, max_length, cost_value)
-                            )
+                if metadata_changed or changes["inserted"] or changes["updated"] or changes["deleted"]:
+                    self._bump_content_version(cursor, project_type_id)
+                
+                self._clear_import_records(cursor, project_type_id)
+                if source is not None:
+                    cursor.execute(
+                        """
+                        INSERT INTO element_cost_imports (project_type_id, file_name, content_hash, metadata, imported_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        """,
+                        (project_type_id, source[0], source[1], json.dumps(metadata), effective_from)
+                    )
+                
+                all_changes.append(changes)
             
             conn.commit()
-            self.logger.info(f"Saved {len(df)} element costs for {project_type} with {len(metadata['levels'])} levels and {len(metadata['lengths'])} length ranges")
-            return True
+            
+            for (project_type, metadata, _, elements, _), changes in zip(prepared, all_changes):
+                self.logger.info(
+                    f"Saved {len(elements)} element costs for {project_type} with {len(metadata['levels'])} levels "
+                    f"and {len(metadata['lengths'])} length ranges "
+                    f"({changes['inserted']} inserted, {changes['updated']} updated, {changes['deleted']} deleted rows)"
+                )
+            return all_changes
             
         except sqlite3.Error as e:
             self.logger.error(f"Error saving element costs: {e}")
             if conn:
                 conn.rollback()
-            return False
+            return None
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
+    
+    def _element_cost_rows(self, df, metadata):
+        """
+        Convert an element costs DataFrame into the rows stored by save_element_costs.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame containing element costs
+            metadata (dict): Metadata about levels and lengths
+            
+        Returns:
+            tuple: (elements, element_values) where elements are
+                (subtitle_code, subtitle_1..5, row_order, unit) tuples for the rows with a
+                subtitle code and element_values the matching {(level, length_min, length_max): cost}
+        """
+        # Rows without subtitle code are skipped
+        if "Subtitle Code" not in df.columns:
+            return [], []
+        
+        keep = df["Subtitle Code"].notna().to_numpy()
+        
+        def text_column(name):
+            if name not in df.columns:
+                return [""] * int(keep.sum())
+            return [str(value) for value in df[name].to_numpy()[keep]]
+        
+        if "row_order" in df.columns:
+            row_orders = [int(value) for value in df["row_order"].to_numpy()[keep]]
+        else:
+            row_orders = [0] * int(keep.sum())
+        
+        elements = list(zip(
+            text_column("Subtitle Code"),
+            text_column("Subtitle 1"),
+            text_column("Subtitle 2"),
+            text_column("Subtitle 3"),
+            text_column("Subtitle 4"),
+            text_column("Subtitle 5"),
+            row_orders,
+            text_column("Unit")
+        ))
+        element_values = [{} for _ in elements]
+        
+        for level in metadata["levels"]:
+            for length in metadata["lengths"]:
+                col_name = f"{level} ({length})"
+                if col_name not in df.columns:
+                    continue
+                
+                min_length, max_length = metadata["length_ranges"].get(length, (0, 60))
+                key = (level, min_length, max_length)
+                
+                column = df[col_name]
+                present = column.notna().to_numpy()[keep]
+                column_values = column.to_numpy()[keep]
+                
+                for index in present.nonzero()[0]:
+                    element_values[index][key] = float(column_values[index])
+        
+        return elements, element_values
+    
+    def _sync_element_costs(self, cursor, project_type_id, elements, element_values, effective_from):
+        """
+        Bring the stored element costs of a project type in line with the given rows.
+        
+        Stored elements are matched by subtitle code (in order of appearance for
+        repeated codes) so their ids stay stable; only the elements and cost values
+        that differ are inserted, updated or deleted, each kind with one executemany.
+        A new element stores its occurrence, its position among the elements with its
+        subtitle code; the unmatched elements removed are always the last ones of their
+        code, so the occurrence of an element never changes. The changed cost values
+        are appended to the history.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+            project_type_id (int): The project type ID
+            elements (list): Element tuples from _element_cost_rows
+            element_values (list): Cost values per element from _element_cost_rows
+            effective_from (str): Timestamp of the transaction, from _history_now
+            
+        Returns:
+            dict: Number of inserted, updated and deleted rows
+        """
+        changes = {"inserted": 0, "updated": 0, "deleted": 0}
+        
+        cursor.execute(
+            """
+            SELECT id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit, occurrence
+            FROM element_costs
+            WHERE project_type_id = ?
+            ORDER BY id
+            """,
+            (project_type_id,)
+        )
+        stored_by_code = {}
+        identities = {}
+        for row in cursor.fetchall():
+            stored_by_code.setdefault(row[1], []).append(row[:9])
+            identities[row[0]] = (row[1], row[9])
+        
+        # Pair each incoming element with a stored one
+        element_ids = []
+        new_elements = []
+        update_elements = []
+        occurrences = {}
+        
+        for element in elements:
+            occurrence = occurrences[element[0]] = occurrences.get(element[0], -1) + 1
+            candidates = stored_by_code.get(element[0])
+            
+            if candidates:
+                stored = candidates.pop(0)
+                element_ids.append(stored[0])
+                
+                if tuple(stored[1:]) != element:
+                    update_elements.append(element[1:] + (stored[0],))
+            else:
+                element_ids.append(None)
+                new_elements.append(element + (occurrence,))
+        
+        removed_ids = [(row[0],) for rows in stored_by_code.values() for row in rows]
+        
+        # Stored values of the elements that are kept
+        cursor.execute(
+            """
+            SELECT v.id, v.element_cost_id, v.level, v.length_min, v.length_max, v.cost_value
+            FROM element_costs_values v
+            JOIN element_costs e ON e.id = v.element_cost_id
+            WHERE e.project_type_id = ?
+            ORDER BY v.id
+            """,
+            (project_type_id,)
+        )
+        stored_values = {}
+        delete_values = []
+        
+        for value_id, element_cost_id, level, length_min, length_max, cost_value in cursor.fetchall():
+            key = (element_cost_id, level, length_min, length_max)
+            
+            if key in stored_values:
+                delete_values.append((value_id,))
+            else:
+                stored_values[key] = (value_id, cost_value)
+        
+        if removed_ids:
+            cursor.executemany("DELETE FROM element_costs_values WHERE element_cost_id = ?", removed_ids)
+            changes["deleted"] += cursor.rowcount
+            cursor.executemany("DELETE FROM element_costs WHERE id = ?", removed_ids)
+            changes["deleted"] += cursor.rowcount
+        
+        if update_elements:
+            cursor.executemany(
+                """
+                UPDATE element_costs
+                SET subtitle_1 = ?, subtitle_2 = ?, subtitle_3 = ?, subtitle_4 = ?, subtitle_5 = ?, row_order = ?, unit = ?
+                WHERE id = ?
+                """,
+                update_elements
+            )
+            changes["updated"] += cursor.rowcount
+        
+        if new_elements:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM element_costs")
+            last_id = cursor.fetchone()[0]
+            
+            cursor.executemany(
+                """
+                INSERT INTO element_costs 
+                (project_type_id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit, occurrence)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(project_type_id,) + element for element in new_elements]
+            )
+            changes["inserted"] += cursor.rowcount
+            
+            # AUTOINCREMENT ids grow in insertion order
+            cursor.execute(
+                "SELECT id FROM element_costs WHERE project_type_id = ? AND id > ? ORDER BY id",
+                (project_type_id, last_id)
+            )
+            new_ids = [row[0] for row in cursor.fetchall()]
+            for element_id, element in zip(new_ids, new_elements):
+                identities[element_id] = (element[0], element[-1])
+            
+            new_ids = iter(new_ids)
+            element_ids = [element_id if element_id is not None else next(new_ids) for element_id in element_ids]
+        
+        insert_values = []
+        update_values = []
+        history = []
+        
+        for element_id, values in zip(element_ids, element_values):
+            for (level, min_length, max_length), cost_value in values.items():
+                stored = stored_values.pop((element_id, level, min_length, max_length), None)
+                
+                if stored is None:
+                    insert_values.append((element_id, level, min_length, max_length, cost_value))
+                elif stored[1] != cost_value:
+                    update_values.append((cost_value, stored[0]))
+                else:
+                    continue
+                
+                history.append((element_id, level, min_length, max_length, cost_value))
+        
+        # Values of kept elements that are no longer in the frame
+        removed = set(row[0] for row in removed_ids)
+        delete_values.extend(
+            (value_id,) for (element_id, _, _, _), (value_id, _) in stored_values.items() if element_id not in removed
+        )
+        
+        # The values of removed elements are recorded as removed too
+        history.extend(
+            key + (None,) for key, (_, cost_value) in stored_values.items() if cost_value is not None
+        )
+        
+        if delete_values:
+            cursor.executemany("DELETE FROM element_costs_values WHERE id = ?", delete_values)
+            changes["deleted"] += cursor.rowcount
+        
+        if update_values:
+            cursor.executemany("UPDATE element_costs_values SET cost_value = ? WHERE id = ?", update_values)
+            changes["updated"] += cursor.rowcount
+        
+        if insert_values:
+            cursor.executemany(
+                """
+                INSERT INTO element_costs_values
+                (element_cost_id, level, length_min, length_max, cost_value)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                insert_values
+            )
+            changes["inserted"] += cursor.rowcount
+        
+        self._write_history(
+            cursor,
+            [(project_type_id,) + identities[record[0]] + record[1:] for record in history],
+            effective_from
+        )
+        
+        return changes
 
     def _parse_length_range(self, length_str):
         """
@@ -666,7 +1703,6 @@ class DatabaseManager:
             self.logger.error(f"Error getting database stats: {e}")
             
         finally:
-            if conn:
-                conn.close()
+            self._release_connection(conn)
                 
         return stats
\ No newline at end of file
@@ -1,66 +1,55 @@
-
 # database/db_migrator.py
 # -*- coding: utf-8 -*-
 """
-Migration script to convert from fixed levels/lengths schema to dynamic schema.
+Versioned schema migrations for the element costs database.
+
+The schema version is stored in PRAGMA user_version. DatabaseManager._init_database
+calls migrate() on startup, which backs the database up with the SQLite online-backup
+API and then applies every pending migration in a single transaction. Migrations are
+written to be idempotent, so a database created by an older build without a version
+(user_version 0) is upgraded in place.
 """
 
 import sqlite3
-import pandas as pd
 import logging
 import json
 import os
-import shutil
-from pathlib import Path
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger("migration")
+logger = logging.getLogger(__name__)
 
-def migrate_database(db_path):
-    """
-    Migrate the database from fixed to dynamic level/length schema.
-    
-    Args:
-        db_path (str): Path to the SQLite database file
-    """
-    # Create a backup of the original database
-    backup_path = f"{db_path}.bak"
-    if os.path.exists(db_path):
-        logger.info(f"Creating backup of database at {backup_path}")
-        try:
-            shutil.copy2(db_path, backup_path)
-            logger.info(f"Backup created successfully")
-        except Exception as e:
-            logger.error(f"Failed to create backup: {str(e)}")
-            return
-    else:
-        logger.warning(f"Database file not found at {db_path}")
-        return
+# Level/length layout of the legacy fixed-column schema (l1_lt15 ... l4_45_60)
+LEGACY_LEVELS = ["L1", "L2", "L3", "L4"]
+LEGACY_LENGTHS = ["<15 min", "15-30 min", "30-45 min", "45-60 min"]
+LEGACY_COLUMNS = {
+    f"{level.lower()}_{suffix}": (level, min_len, max_len)
+    for level in LEGACY_LEVELS
+    for suffix, min_len, max_len in (("lt15", 0, 14), ("15_30", 15, 30), ("30_45", 31, 45), ("45_60", 46, 60))
+}
+
+class Migration:
+    """One schema version: apply(cursor) upgrades the previous version to it."""
+
+    def __init__(self, version, description, apply):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+    def __repr__(self):
+        return f"Migration({self.version}: {self.description})"
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
 
-    shutil.copy2(db_path, backup_path)
-    
-    # Connect to the original database
-    old_conn = sqlite3.connect(backup_path)
-    old_cursor = old_conn.cursor()
-    
-    # Create a new database with the updated schema
-    if os.path.exists(db_path):
-        os.remove(db_path)
-    
-    new_conn = sqlite3.connect(db_path)
-    new_cursor = new_conn.cursor()
-    
-    # Initialize new schema
-    logger.info("Creating new schema")
-    new_cursor.execute('''
+def _create_base_schema(cursor):
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS project_types (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT UNIQUE NOT NULL
     )
     ''')
-    
-    new_cursor.execute('''
+
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS element_costs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         project_type_id INTEGER NOT NULL,
@@ -75,8 +64,8 @@ def migrate_database(db_path):
         FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
     )
     ''')
-    
-    new_cursor.execute('''
+
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS element_costs_values (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         element_cost_id INTEGER NOT NULL,
@@ -87,8 +76,8 @@ def migrate_database(db_path):
         FOREIGN KEY (element_cost_id) REFERENCES element_costs (id) ON DELETE CASCADE
     )
     ''')
-    
-    new_cursor.execute('''
+
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS project_metadata (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         project_type_id INTEGER NOT NULL,
@@ -97,123 +86,301 @@ def migrate_database(db_path):
         FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
     )
     ''')
-    
-    new_conn.commit()
-    
+
+def _convert_legacy_schema(cursor):
+    """Move the costs of the fixed-column element_costs table into element_costs_values."""
+    columns = _table_columns(cursor, "element_costs")
+    legacy_columns = [column for column in LEGACY_COLUMNS if column in columns]
+
+    logger.info("Converting fixed level/length columns to the dynamic schema")
+
+    cursor.execute("ALTER TABLE element_costs RENAME TO element_costs_legacy")
+    _create_base_schema(cursor)
+
+    cursor.execute('''
+    INSERT INTO element_costs
+    (id, project_type_id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit)
+    SELECT id, project_type_id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit
+    FROM element_costs_legacy
+    ''')
+
+    for column in legacy_columns:
+        level, min_len, max_len = LEGACY_COLUMNS[column]
+        cursor.execute(f'''
+        INSERT INTO element_costs_values (element_cost_id, level, length_min, length_max, cost_value)
+        SELECT id, ?, ?, ?, {column} FROM element_costs_legacy WHERE {column} IS NOT NULL
+        ''', (level, min_len, max_len))
+
+    cursor.execute('''
+    INSERT INTO project_metadata (project_type_id, levels, lengths)
+    SELECT id, ?, ? FROM project_types
+    WHERE id NOT IN (SELECT project_type_id FROM project_metadata)
+    ''', (json.dumps(LEGACY_LEVELS), json.dumps(LEGACY_LENGTHS)))
+
+    cursor.execute("DROP TABLE element_costs_legacy")
+
+def migrate_v1(cursor):
+    """Dynamic level/length schema, converting the legacy fixed-column schema."""
+    columns = _table_columns(cursor, "element_costs")
+
+    if any(column in LEGACY_COLUMNS for column in columns):
+        _convert_legacy_schema(cursor)
+    else:
+        _create_base_schema(cursor)
+
+def migrate_v2(cursor):
+    """Lookup indexes and unique constraints; duplicates are removed first, the newest row wins."""
+    # get_element_costs already let the last stored value win
+    cursor.execute('''
+    DELETE FROM element_costs_values
+    WHERE id NOT IN (
+        SELECT MAX(id) FROM element_costs_values
+        GROUP BY element_cost_id, level, length_min, length_max
+    )
+    ''')
+    cursor.execute('''
+    DELETE FROM project_metadata
+    WHERE id NOT IN (SELECT MAX(id) FROM project_metadata GROUP BY project_type_id)
+    ''')
+
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_element_costs_values_key
+    ON element_costs_values (element_cost_id, level, length_min, length_max)
+    ''')
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_project_metadata_project_type
+    ON project_metadata (project_type_id)
+    ''')
+
+    # Subtitle codes may repeat within a cost sheet, so this one is not unique
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_element_costs_type_code
+    ON element_costs (project_type_id, subtitle_code)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_element_costs_type_order
+    ON element_costs (project_type_id, row_order)
+    ''')
+
+# Values that existed before the history was recorded apply to every earlier date
+HISTORY_BASELINE = "1970-01-01 00:00:00.000"
+
+def migrate_v3(cursor):
+    """Effective-dated history of the cost values, written by DatabaseManager."""
+    # The occurrence of an element is its position among the elements of its project
+    # type with the same subtitle code, in id order. DatabaseManager._sync_element_costs
+    # assigns it when it inserts an element and always removes the last elements of a
+    # code, so the occurrences of a code stay 0..n-1 and never change while the element
+    # exists
+    if "occurrence" not in _table_columns(cursor, "element_costs"):
+        cursor.execute("ALTER TABLE element_costs ADD COLUMN occurrence INTEGER NOT NULL DEFAULT 0")
+
+    cursor.execute('''
+    UPDATE element_costs SET occurrence = (
+        SELECT COUNT(*) FROM element_costs p
+        WHERE p.project_type_id = element_costs.project_type_id
+          AND p.subtitle_code IS element_costs.subtitle_code AND p.id < element_costs.id
+    )
+    ''')
+
+    # Replaces idx_element_costs_type_code, a prefix of it
+    cursor.execute("DROP INDEX IF EXISTS idx_element_costs_type_code")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_element_costs_type_code_occurrence
+    ON element_costs (project_type_id, subtitle_code, occurrence)
+    ''')
+
+    # Records identify an element by subtitle code and occurrence rather than by id, so
+    # the history outlives the element rows and applies across restored backups. Every
+    # transaction that changes cost values appends one record per changed value, all
+    # with the same effective_from; a NULL cost_value records a removed value
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS element_costs_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_type_id INTEGER NOT NULL,
+        subtitle_code TEXT,
+        occurrence INTEGER NOT NULL,
+        level TEXT NOT NULL,
+        length_min INTEGER NOT NULL,
+        length_max INTEGER NOT NULL,
+        cost_value REAL,
+        effective_from TEXT NOT NULL,
+        FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
+    )
+    ''')
+
+    # Point-in-time lookups seek the latest record of a value key
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_element_costs_history_key
+    ON element_costs_history (project_type_id, subtitle_code, occurrence, level, length_min, length_max, effective_from)
+    ''')
+
+    cursor.execute('''
+    INSERT INTO element_costs_history
+    (project_type_id, subtitle_code, occurrence, level, length_min, length_max, cost_value, effective_from)
+    SELECT e.project_type_id, e.subtitle_code, e.occurrence, v.level, v.length_min, v.length_max, v.cost_value, ?
+    FROM element_costs_values v
+    JOIN element_costs e ON e.id = v.element_cost_id
+    WHERE NOT EXISTS (SELECT 1 FROM element_costs_history)
+    ''', (HISTORY_BASELINE,))
+
+def migrate_v4(cursor):
+    """Content hash of the CSV file each project type was last imported from."""
+    # DatabaseManager removes the row whenever the costs are saved or edited otherwise,
+    # so a matching hash means the stored costs are still exactly that file's
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS element_cost_imports (
+        project_type_id INTEGER PRIMARY KEY,
+        file_name TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        metadata TEXT NOT NULL,  -- JSON of the parsed levels, lengths and length ranges
+        imported_at TEXT NOT NULL,
+        FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_element_cost_imports_hash
+    ON element_cost_imports (content_hash)
+    ''')
+
+# New random token of a project type's content; the hex text of 8 random bytes
+CONTENT_VERSION_TOKEN = "lower(hex(randomblob(8)))"
+
+def migrate_v5(cursor):
+    """Content version of each project type's element costs, for caches built from them."""
+    # DatabaseManager replaces the token in every transaction that changes the costs.
+    # Random tokens rather than a counter, so a restored backup never reuses the
+    # version of different content
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS element_cost_versions (
+        project_type_id INTEGER PRIMARY KEY,
+        version TEXT NOT NULL,
+        FOREIGN KEY (project_type_id) REFERENCES project_types (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute(f'''
+    INSERT OR IGNORE INTO element_cost_versions (project_type_id, version)
+    SELECT id, {CONTENT_VERSION_TOKEN} FROM project_types
+    ''')
+
+MIGRATIONS = [
+    Migration(1, "Dynamic level/length schema", migrate_v1),
+    Migration(2, "Indexes and unique constraints", migrate_v2),
+    Migration(3, "Effective-dated cost value history", migrate_v3),
+    Migration(4, "Import content hashes", migrate_v4),
+    Migration(5, "Element cost content versions", migrate_v5),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+def get_schema_version(conn):
+    """Schema version stored in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def backup_database(conn, backup_path, pages=-1, progress=None):
+    """
+    Copy a database through the SQLite online-backup API.
+
+    The copy is written next to backup_path and renamed over it once complete, so an
+    interrupted backup never leaves a partial file behind. Writers on other connections
+    are not blocked; the backup restarts a step if they change the pages being copied.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database to copy
+        backup_path (str): Destination file, replaced if it exists
+        pages (int): Pages copied per step, -1 to copy everything in one step
+        progress (callable, optional): progress(status, remaining, total) after each
+            step; an exception it raises aborts the backup
+    """
+    partial_path = f"{backup_path}.part"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    backup_conn = sqlite3.connect(partial_path)
     try:
-        # Get project types from old database
-        old_cursor.execute("SELECT id, name FROM project_types")
-        project_types = old_cursor.fetchall()
-        
-        # Default level and length information for old schema
-        default_levels = ["L1", "L2", "L3", "L4"]
-        default_lengths = ["<15 min", "15-30 min", "30-45 min", "45-60 min"]
-        default_length_ranges = {
-            "<15 min": (0, 14),
-            "15-30 min": (15, 30),
-            "30-45 min": (31, 45),
-            "45-60 min": (46, 60)
-        }
-        
-        # Process each project type
-        for project_type_id, project_type_name in project_types:
-            logger.info(f"Migrating project type: {project_type_name}")
-            
-            # Insert project type into new database
-            new_cursor.execute("INSERT INTO project_types (id, name) VALUES (?, ?)", (project_type_id, project_type_name))
-            
-            # Save metadata
-            new_cursor.execute(
-                "INSERT INTO project_metadata (project_type_id, levels, lengths) VALUES (?, ?, ?)",
-                (project_type_id, json.dumps(default_levels), json.dumps(default_lengths))
-            )
-            
-            # Get all element costs for this project type
-            old_cursor.execute("""
-                SELECT * FROM element_costs WHERE project_type_id = ?
-            """, (project_type_id,))
-            
-            columns = [col[0] for col in old_cursor.description]
-            element_costs = [dict(zip(columns, row)) for row in old_cursor.fetchall()]
-            
-            # Process each element cost
-            for element in element_costs:
-                # Insert the base element information into new schema
-                new_cursor.execute("""
-                    INSERT INTO element_costs 
-                    (id, project_type_id, subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, row_order, unit)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    element["id"], 
-                    element["project_type_id"], 
-                    element.get("subtitle_code", ""),
-                    element.get("subtitle_1", ""),
-                    element.get("subtitle_2", ""),
-                    element.get("subtitle_3", ""),
-                    element.get("subtitle_4", ""),
-                    element.get("subtitle_5", ""),
-                    element.get("row_order", 0),
-                    element.get("unit", "")
-                ))
-                
-                # Map old columns to new level/length combinations
-                column_mapping = {
-                    "l1_lt15": ("L1", "<15 min", 0, 14),
-                    "l1_15_30": ("L1", "15-30 min", 15, 30),
-                    "l1_30_45": ("L1", "30-45 min", 31, 45),
-                    "l1_45_60": ("L1", "45-60 min", 46, 60),
-                    "l2_lt15": ("L2", "<15 min", 0, 14),
-                    "l2_15_30": ("L2", "15-30 min", 15, 30),
-                    "l2_30_45": ("L2", "30-45 min", 31, 45),
-                    "l2_45_60": ("L2", "45-60 min", 46, 60),
-                    "l3_lt15": ("L3", "<15 min", 0, 14),
-                    "l3_15_30": ("L3", "15-30 min", 15, 30),
-                    "l3_30_45": ("L3", "30-45 min", 31, 45),
-                    "l3_45_60": ("L3", "45-60 min", 46, 60),
-                    "l4_lt15": ("L4", "<15 min", 0, 14),
-                    "l4_15_30": ("L4", "15-30 min", 15, 30),
-                    "l4_30_45": ("L4", "30-45 min", 31, 45),
-                    "l4_45_60": ("L4", "45-60 min", 46, 60),
-                }
-                
-                # Insert cost values for each level/length combination
-                for old_col, (level, length, min_len, max_len) in column_mapping.items():
-                    if old_col in element and element[old_col] is not None:
-                        cost_value = element[old_col]
-                        
-                        new_cursor.execute("""
-                            INSERT INTO element_costs_values
-                            (element_cost_id, level, length_min, length_max, cost_value)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (element["id"], level, min_len, max_len, cost_value))
-            
-            # Commit after each project type
-            new_conn.commit()
-            logger.info(f"Migrated {len(element_costs)} elements for {project_type_name}")
-    
-    except Exception as e:
-        logger.error(f"Error during migration: {str(e)}")
-        # Restore from backup
-        new_conn.close()
-        old_conn.close()
-        os.remove(db_path)
-        shutil.copy2(backup_path, db_path)
-        logger.info(f"Restored from backup due to error")
+        conn.backup(backup_conn, pages=pages, progress=progress)
+    except BaseException:
+        backup_conn.close()
+        os.remove(partial_path)
         raise
-    
+    backup_conn.close()
+
+    os.replace(partial_path, backup_path)
+
+def migrate(conn, db_path=None, backup=True):
+    """
+    Apply the pending migrations of a database.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database, outside a transaction
+        db_path (str, optional): Database file, used to name the backup
+            "<db_path>.v<version>.bak"; no backup is taken without it
+        backup (bool): Back the database up before upgrading it
+
+    Returns:
+        int: The schema version after the upgrade
+    """
+    current_version = get_schema_version(conn)
+    pending = [migration for migration in MIGRATIONS if migration.version > current_version]
+
+    if not pending:
+        return current_version
+
+    has_tables = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchone()[0] > 0
+
+    if backup and db_path and has_tables:
+        backup_path = f"{db_path}.v{current_version}.bak"
+        backup_database(conn, backup_path)
+        logger.info(f"Backed up schema version {current_version} to {backup_path}")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+
+        for migration in pending:
+            logger.info(f"Applying migration {migration.version}: {migration.description}")
+            migration.apply(cursor)
+
+        cursor.execute(f"PRAGMA user_version = {int(pending[-1].version)}")
+        conn.commit()
+
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    logger.info(f"Database schema upgraded from version {current_version} to {pending[-1].version}")
+    return pending[-1].version
+
+def migrate_database(db_path):
+    """
+    Upgrade a database file to the current schema version.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+    """
+    if not os.path.exists(db_path):
+        logger.warning(f"Database file not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA foreign_keys = 1")
+        version = migrate(conn, db_path)
+        logger.info(f"Database at {db_path} is at schema version {version}")
     finally:
-        new_conn.close()
-        old_conn.close()
-    
-    logger.info("Migration completed successfully")
+        conn.close()
 
 if __name__ == "__main__":
     import sys
-    
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     if len(sys.argv) > 1:
         db_path = sys.argv[1]
     else:
         # Default path
         db_path = "database/project_costs.db"
-    
-    migrate_database(db_path)
\ No newline at end of file
+
+    migrate_database(db_path)
@@ -0,0 +1,191 @@
+# database/db_worker.py
+# -*- coding: utf-8 -*-
+"""
+Background execution of database operations.
+
+DbWorker runs callables (usually DatabaseManager methods) on QThreadPool threads so
+the GUI thread never waits on SQLite. Reads share a small pool; writes go through a
+single-thread pool so they are applied one at a time, in submission order. Every
+submitted job reports back through the Qt signals of its DbJob, which are delivered
+on the GUI thread.
+
+DatabaseManager keeps one connection per thread, so the pool threads are never
+expired: each keeps its connection until close_all_connections().
+"""
+
+import logging
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from config.settings import DATABASE_SETTINGS
+
+class DbJobCancelled(Exception):
+    """Raised by DbJob.check_cancelled() to stop a cancelled job."""
+
+class DbJobSignals(QObject):
+    """Signals of a DbJob; QRunnable is not a QObject."""
+
+    finished = Signal(object)           # result of the job
+    failed = Signal(str)                # error message
+    cancelled = Signal()
+    progress = Signal(int, int, str)    # done, total, description
+    completed = Signal(object)          # the job, after any of the above
+
+class DbJob(QRunnable):
+    """
+    One database operation queued on a DbWorker.
+
+    Cancelling a job that has not started skips it. A running job stops only where
+    its function calls check_cancelled(), which it can do when submitted with
+    with_job=True; a write that was already committed is reported as finished.
+    """
+
+    def __init__(self, name, func, args, kwargs, with_job=False):
+        super().__init__()
+        # The worker keeps the job alive until its completed signal is delivered
+        self.setAutoDelete(False)
+
+        self.name = name
+        self.signals = DbJobSignals()
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._with_job = with_job
+        self._cancel_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def cancel(self):
+        """Ask the job to stop."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise DbJobCancelled if the job was cancelled; called by the job's function."""
+        if self._cancel_event.is_set():
+            raise DbJobCancelled(self.name)
+
+    def report_progress(self, done, total, description=""):
+        """Report progress from the job's function; delivered on the GUI thread."""
+        self.signals.progress.emit(int(done), int(total), description)
+
+    def run(self):
+        try:
+            self.check_cancelled()
+
+            if self._with_job:
+                result = self._func(*self._args, job=self, **self._kwargs)
+            else:
+                result = self._func(*self._args, **self._kwargs)
+
+            self.signals.finished.emit(result)
+
+        except DbJobCancelled:
+            self.logger.info(f"Database job {self.name} cancelled")
+            self.signals.cancelled.emit()
+
+        except Exception as e:
+            self.logger.exception(f"Database job {self.name} failed")
+            self.signals.failed.emit(str(e))
+
+        finally:
+            self.signals.completed.emit(self)
+
+class DbWorker(QObject):
+    """Runs database jobs off the GUI thread, serializing the writes."""
+
+    def __init__(self, read_threads=None, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self._jobs = set()
+        self._jobs_lock = threading.Lock()
+
+        self._read_pool = QThreadPool(self)
+        self._read_pool.setMaxThreadCount(read_threads or DATABASE_SETTINGS["read_threads"])
+        self._read_pool.setExpiryTimeout(-1)
+
+        self._write_pool = QThreadPool(self)
+        self._write_pool.setMaxThreadCount(1)
+        self._write_pool.setExpiryTimeout(-1)
+
+    def submit(self, func, *args, write=False, with_job=False, name=None, **kwargs):
+        """
+        Queue func(*args, **kwargs) on a pool thread.
+
+        Args:
+            func (callable): The operation, e.g. a DatabaseManager method
+            *args: Positional arguments of func
+            write (bool): Run on the write queue, after every write submitted before it
+            with_job (bool): Pass the DbJob to func as job=, for progress and cancellation
+            name (str, optional): Name used in the log, func's name by default
+            **kwargs: Keyword arguments of func
+
+        Returns:
+            DbJob: The queued job; connect to job.signals before control returns
+                to the event loop
+        """
+        job = DbJob(name or getattr(func, "__name__", "job"), func, args, kwargs, with_job)
+        job.signals.completed.connect(self._job_completed)
+
+        with self._jobs_lock:
+            self._jobs.add(job)
+
+        (self._write_pool if write else self._read_pool).start(job)
+        return job
+
+    def _job_completed(self, job):
+        with self._jobs_lock:
+            self._jobs.discard(job)
+
+    def pending_jobs(self):
+        """Number of jobs queued or running."""
+        with self._jobs_lock:
+            return len(self._jobs)
+
+    def cancel_all(self):
+        """Cancel every queued or running job."""
+        with self._jobs_lock:
+            jobs = list(self._jobs)
+
+        for job in jobs:
+            job.cancel()
+
+    def wait(self, msecs=-1):
+        """
+        Block until the running jobs are done.
+
+        Args:
+            msecs (int): Timeout per pool in milliseconds, -1 to wait indefinitely
+
+        Returns:
+            bool: True if both pools are idle
+        """
+        write_done = self._write_pool.waitForDone(msecs)
+        read_done = self._read_pool.waitForDone(msecs)
+        return write_done and read_done
+
+    def shutdown(self, msecs=5000):
+        """Cancel the jobs and wait for the running ones, e.g. before closing the connections."""
+        self.cancel_all()
+        self._read_pool.clear()
+        self._write_pool.clear()
+
+        if not self.wait(msecs):
+            self.logger.warning("Database jobs still running at shutdown")
+
+_WORKER = None
+
+def get_db_worker():
+    """Get the application's DbWorker, created on first use."""
+    global _WORKER
+
+    if _WORKER is None:
+        _WORKER = DbWorker()
+    return _WORKER
+
+def shutdown_db_worker():
+    """Stop the application's DbWorker if it was created."""
+    if _WORKER is not None:
+        _WORKER.shutdown()
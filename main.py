@@ -5,11 +5,13 @@ Entry point for the Project Cost Calculator application.
 
 import sys
 import logging
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QFile, QTextStream
 from PySide6.QtGui import QFont
 from ui.main_window import MainWindow
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, close_all_connections
+from database.db_worker import shutdown_db_worker
 
 def setup_logging():
     """Set up logging configuration."""
@@ -184,6 +186,10 @@ def main():
     app.setApplicationName("Project Cost Calculator")
     app.setOrganizationName("IPSOS")
     
+    # Stop the background database jobs, then close the connections of every manager
+    app.aboutToQuit.connect(shutdown_db_worker)
+    app.aboutToQuit.connect(close_all_connections)
+    
     # Apply stylesheet
     app.setStyleSheet(load_stylesheet())                                                                    
     
@@ -195,4 +201,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Worker processes (scenario sweep) re-launch the frozen executable
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
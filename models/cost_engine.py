@@ -0,0 +1,304 @@
+# models/cost_engine.py
+# -*- coding: utf-8 -*-
+"""
+Cost engine producing the flat cost rows of a project from a compiled CostPlan.
+
+The engine keeps the rows of the last calculation together with a dependency graph
+from model inputs to rows: ("samples", province) for everything priced from the
+province's samples, and ("general", field) / ("clt_settings", field) /
+("settings", field) for the fields a rule declares in its `reads`. ProjectModel
+reports each edit through invalidate_field / invalidate_province, so the next
+rows() call only recomputes the rows whose inputs changed and patches the cache.
+"""
+
+import logging
+
+from models.cost_plan import get_cost_plan
+from models.quanty_mappings import map_quanty_for_price, get_chi_phi_phieu_pv_title
+
+COMMENT_TITLES = {
+    "price_growth": "Price Growth",
+    "target_for_interviewer": "Target for Interviewer",
+    "daily_sup_target": "Daily SUP Target"
+}
+
+SAMPLE_TYPE_ORDER = {
+    "Pilot" : 0,
+    "Main" : 1,
+    "Booster" : 2,
+    "Non" : 3
+}
+
+# Columns of the flat cost rows returned by rows()
+COST_ROW_COLUMNS = (
+    "subtitle", "province", "description", "target_audience", "code",
+    "unit", "cost", "quanty", "total_cost", "comment"
+)
+
+# Cell parts that are not element rows
+PRICING_ROWS = "pricing"
+SUP_COMMENT = "sup_comment"
+
+def get_comment(comment_item):
+    comment = ""
+
+    if comment_item:
+        for key, value in comment_item.items():
+            comment += ('' if len(comment) == 0 else '\n') + f'{COMMENT_TITLES[key]}: {value}'
+
+    return comment
+
+def rule_dependencies(rule, province):
+    """Input keys of a rule for one province, from its declared reads."""
+    keys = []
+
+    for read in rule.reads:
+        section, _, field = read.partition(".")
+
+        if section == "samples":
+            keys.append(("samples", province))
+        else:
+            keys.append((section, field))
+
+    return keys
+
+def toggle_index(cost_toggles):
+    """
+    Lower-cased view of cost_toggles answering is_enabled() with dict lookups.
+
+    Args:
+        cost_toggles (dict): ProjectModel.cost_toggles
+
+    Returns:
+        tuple: ({group: {name: enabled}}, {name: enabled}) where the first
+            match wins, the same as the linear scan in ProjectModel.is_enabled
+    """
+    groups = {}
+    names = {}
+
+    for group, costs in cost_toggles.items():
+        lowered = groups.setdefault(group, {})
+
+        for name, enabled in costs.items():
+            lowered.setdefault(name.lower(), enabled)
+            names.setdefault(name.lower(), enabled)
+
+    return groups, names
+
+def is_element_enabled(plan_element, toggles):
+    """
+    Check a plan element against the index returned by toggle_index().
+
+    Args:
+        plan_element (PlanElement): Element to check
+        toggles (tuple): (groups, names) from toggle_index()
+
+    Returns:
+        bool: Same result as ProjectModel.is_enabled for the element
+    """
+    toggle_groups, toggle_names = toggles
+
+    if plan_element.cost_group:
+        return toggle_groups.get(plan_element.cost_group, {}).get(plan_element.toggle_key)
+    return toggle_names.get(plan_element.toggle_key, True)
+
+class CostEngine:
+    """Incremental calculator of the flat cost rows of a ProjectModel."""
+
+    def __init__(self, project, plan=None):
+        """
+        Args:
+            project (ProjectModel): The project to price
+            plan (CostPlan, optional): Fixed plan to use instead of the cached plan
+                of the project's type
+        """
+        self.project = project
+        self.logger = logging.getLogger(__name__)
+
+        self._fixed_plan = plan
+        self._plan = None
+
+        # {(leaf_index, province): {element_index | PRICING_ROWS | SUP_COMMENT: value}}
+        self._cells = {}
+        # {input_key: {(leaf_index, province, part)}}
+        self._dependents = {}
+
+        # Number of rows computed by the last rows() call, 0 when fully served from cache
+        self.last_recomputed = 0
+
+    def invalidate_all(self):
+        """Forget every cached row."""
+        self._cells.clear()
+        self._dependents.clear()
+
+    def invalidate_province(self, province):
+        """Recompute the rows priced from a province's samples."""
+        self._invalidate_key(("samples", province))
+
+    def invalidate_field(self, section, field):
+        """
+        Recompute the rows whose rules read a model field.
+
+        Args:
+            section (str): "general", "clt_settings", "hut_settings" or "settings"
+            field (str): Field name inside the section
+        """
+        self._invalidate_key((section, field))
+
+    def _invalidate_key(self, key):
+        for leaf_index, province, part in self._dependents.pop(key, ()):
+            cell = self._cells.get((leaf_index, province))
+
+            if cell is not None:
+                cell.pop(part, None)
+
+    def _depend(self, keys, leaf_index, province, part):
+        for key in keys:
+            self._dependents.setdefault(key, set()).add((leaf_index, province, part))
+
+    def _get_plan(self):
+        plan = self._fixed_plan or get_cost_plan(self.project.general.get('project_type', ""))
+
+        if plan is not self._plan:
+            self.invalidate_all()
+            self._plan = plan
+
+        return plan
+
+    def rows(self):
+        """
+        Get the flat cost rows, recomputing only invalidated rows.
+
+        Cost toggles and the presence of travel data are applied on every call,
+        so they never require recomputation.
+
+        Returns:
+            list: One row per element and province, in hierarchy order
+        """
+        plan = self._get_plan()
+        project = self.project
+
+        toggles = toggle_index(project.cost_toggles)
+        has_travel = len(project.travel.keys()) > 0
+
+        flat_rows = []
+        recomputed = 0
+
+        for leaf_index, leaf in enumerate(plan.leaves):
+            if leaf.is_travel and not has_travel:
+                continue
+
+            enabled_elements = [
+                (element_index, plan_element)
+                for element_index, plan_element in enumerate(leaf.elements)
+                if is_element_enabled(plan_element, toggles)
+            ]
+
+            for province, target_audiences in project.samples.items():
+                cell = self._cells.setdefault((leaf_index, province), {})
+
+                if leaf.is_interviewer:
+                    if PRICING_ROWS not in cell:
+                        cell[PRICING_ROWS] = self._pricing_rows(leaf.title, province, target_audiences)
+                        self._depend([("samples", province)], leaf_index, province, PRICING_ROWS)
+                        recomputed += len(cell[PRICING_ROWS])
+
+                    flat_rows.extend(list(row) for row in cell[PRICING_ROWS])
+
+                if SUP_COMMENT not in cell:
+                    cell[SUP_COMMENT] = self._sup_comment(target_audiences) if leaf.is_supervisor else ""
+                    self._depend([("samples", province)], leaf_index, province, SUP_COMMENT)
+
+                for element_index, plan_element in enabled_elements:
+                    row = cell.get(element_index)
+
+                    if row is None:
+                        row = self._element_row(leaf.title, province, plan_element, cell[SUP_COMMENT])
+                        cell[element_index] = row
+                        self._depend(
+                            rule_dependencies(plan_element.cost_rule, province) + rule_dependencies(plan_element.quanty_rule, province),
+                            leaf_index, province, element_index
+                        )
+                        if plan_element.has_sup_comment:
+                            self._depend([("samples", province)], leaf_index, province, element_index)
+                        recomputed += 1
+
+                    flat_rows.append(list(row))
+
+        self.last_recomputed = recomputed
+
+        return flat_rows
+
+    def total_cost(self):
+        """Running total of the project, recomputing only invalidated rows."""
+        return sum(row[8] for row in self.rows())
+
+    def _sup_comment(self, target_audiences):
+        sup_comment = ""
+
+        for key, target_audience in target_audiences.items():
+            comment = get_comment(target_audience.get('comment', {}))
+
+            if comment:
+                sup_comment += ("\n" if len(sup_comment) > 0 else "") + comment
+
+        return sup_comment
+
+    def _pricing_rows(self, current_title, province, target_audiences):
+        rows = []
+
+        sorted_target_audiences = sorted(
+            target_audiences.items(),
+            key = lambda item: SAMPLE_TYPE_ORDER.get(item[1].get("sample_type", ""), 99)
+        )
+
+        for key, target_audience in sorted_target_audiences:
+            for price in target_audience.get('pricing', []):
+                cost = price.get('price', 0) * abs(1 + price.get('price_growth', 0) / 100)
+                quanty = map_quanty_for_price(self.project, price, province, target_audience)
+
+                try:
+                    total_cost = cost * quanty
+                except Exception as e:
+                    logging.critical(f"[Error] Failed to calculate total for {price.get('type')} in {current_title}")
+                    raise Exception(f"[Error] Failed to calculate total for {price.get('type')} in {current_title}")
+
+                rows.append((
+                    current_title,
+                    province,
+                    get_chi_phi_phieu_pv_title(price.get('type', '').lower()),
+                    target_audience.get('name', ''),
+                    0,
+                    "Phiếu",
+                    0 if not cost or cost == 0 else cost,
+                    0 if not quanty or quanty == 0 else quanty,
+                    0 if not total_cost or total_cost == 0 else total_cost,
+                    get_comment(price.get('comment', {}))
+                ))
+
+        return rows
+
+    def _element_row(self, current_title, province, plan_element, sup_comment):
+        element = plan_element.element
+
+        cost = plan_element.cost_handler(self.project, element)
+        quanty = plan_element.quanty_handler(self.project, element, province, title=current_title)
+
+        try:
+            total_cost = cost * quanty
+        except Exception as e:
+            logging.critical(f"[Error] Failed to calculate total for {plan_element.description} in {current_title}")
+            raise Exception(f"[Error] Failed to calculate total for {plan_element.description} in {current_title}")
+
+        return (
+            plan_element.row_name,
+            province,
+            plan_element.description,
+            plan_element.target_audience,
+            plan_element.code,
+            plan_element.unit,
+            0 if not cost or cost == 0 else cost,
+            0 if not quanty or quanty == 0 else quanty,
+            0 if not total_cost or total_cost == 0 else total_cost,
+            sup_comment if plan_element.has_sup_comment else ""
+        )
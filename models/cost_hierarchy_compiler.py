@@ -0,0 +1,193 @@
+# models/cost_hierarchy_compiler.py
+# -*- coding: utf-8 -*-
+"""
+Cost hierarchy compiled from the element cost database.
+
+The hierarchy JSON files in config/ are generated offline from a cost sheet, so they
+drift from the element costs in the database. The compiler builds the same
+{project_type: {"children": {...}, "elements": [...]}} tree from the element_costs
+rows of a project type instead: the subtitles of a row up to its first empty one are
+the path of the element, the last of them being its description and the others the
+titles of the nodes holding it. The tree is built in a single pass over the rows in
+row order, each node being found by its path.
+
+Compiled hierarchies are cached on disk next to the database, one file per project
+type keyed by DatabaseManager.get_content_version. Every write to the costs of a
+project type, an import in particular, gives it a new version, so a stale file is
+recompiled on the next lookup.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+# Stored in the cache files; bump it when the compiled tree changes shape
+HIERARCHY_FORMAT = 1
+
+CACHE_DIR_NAME = "hierarchy_cache"
+
+def _text(value):
+    """Subtitle, code or unit text as stored; missing values were stored as "nan" or "None"."""
+    if value is None:
+        return ""
+
+    text = str(value).strip()
+    return "" if text in ("nan", "None") else text
+
+def _new_node():
+    return {"children": {}, "elements": []}
+
+def _node(nodes, path):
+    """Get the node of a path, creating it and its missing ancestors."""
+    node = nodes.get(path)
+
+    if node is None:
+        parent = _node(nodes, path[:-1])
+        node = parent["children"][path[-1]] = _new_node()
+        nodes[path] = node
+
+    return node
+
+def build_cost_hierarchy(project_type, rows):
+    """
+    Build the cost hierarchy of a project type from its element rows.
+
+    Args:
+        project_type (str): The project type name, the root key of the hierarchy
+        rows (iterable): (subtitle_code, subtitle_1..5, unit, base_cost) tuples in row
+            order, as returned by DatabaseManager.get_hierarchy_elements
+
+    Returns:
+        dict: The hierarchy in the format of the config JSON files
+    """
+    root = _new_node()
+    nodes = {(): root}
+
+    for subtitle_code, subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5, unit, base_cost in rows:
+        path = []
+        for subtitle in (subtitle_1, subtitle_2, subtitle_3, subtitle_4, subtitle_5):
+            subtitle = _text(subtitle)
+            if not subtitle:
+                break
+            path.append(subtitle)
+
+        # A row without subtitles lands on the root, which cost plans do not read
+        description = path.pop() if path else ""
+
+        _node(nodes, tuple(path))["elements"].append({
+            "code": _text(subtitle_code),
+            "unit": _text(unit),
+            "description": description,
+            "cost": 0.0 if base_cost is None else base_cost
+        })
+
+    return {project_type: root}
+
+class CostHierarchyCompiler:
+    """Compiles the cost hierarchies of the database and caches them on disk."""
+
+    def __init__(self, db_manager, cache_dir=None):
+        """
+        Args:
+            db_manager (DatabaseManager): The element cost database
+            cache_dir (str, optional): Directory of the cache files, a directory
+                next to the database file by default
+        """
+        self.db_manager = db_manager
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_manager.db_path)), CACHE_DIR_NAME
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def compile(self, project_type):
+        """
+        Build the hierarchy of a project type from the database, bypassing the cache.
+
+        Args:
+            project_type (str): The project type name
+
+        Returns:
+            tuple: (version, hierarchy); hierarchy is None if the project type has no
+                elements in the database
+        """
+        version, rows = self.db_manager.get_hierarchy_elements(project_type)
+
+        if not rows:
+            return version, None
+
+        return version, build_cost_hierarchy(project_type, rows)
+
+    def get_hierarchy(self, project_type):
+        """
+        Get the hierarchy of a project type, compiling it if the cached one is stale.
+
+        Args:
+            project_type (str): The project type name
+
+        Returns:
+            dict: The hierarchy, or None if the project type has no elements in the database
+        """
+        version = self.db_manager.get_content_version(project_type)
+        if version is None:
+            return None
+
+        cache_path = self.cache_path(project_type)
+        hierarchy = self._read_cache(cache_path, project_type, version)
+        if hierarchy is not None:
+            return hierarchy
+
+        # The version read with the rows, which may be newer than the one above
+        version, hierarchy = self.compile(project_type)
+
+        if hierarchy is not None and version is not None:
+            self._write_cache(cache_path, project_type, version, hierarchy)
+            self.logger.info(f"Compiled cost hierarchy for {project_type} at content version {version}")
+
+        return hierarchy
+
+    def cache_path(self, project_type):
+        """Cache file of a project type; names such as "F2F/D2D" are hashed into the file name."""
+        digest = hashlib.sha256(project_type.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _read_cache(self, cache_path, project_type, version):
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                artifact = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable cost hierarchy cache {cache_path}: {e}")
+            return None
+
+        if (
+            artifact.get("format") != HIERARCHY_FORMAT
+            or artifact.get("project_type") != project_type
+            or artifact.get("version") != version
+        ):
+            return None
+
+        return artifact.get("hierarchy")
+
+    def _write_cache(self, cache_path, project_type, version, hierarchy):
+        artifact = {
+            "format": HIERARCHY_FORMAT,
+            "project_type": project_type,
+            "version": version,
+            "hierarchy": hierarchy
+        }
+
+        # Written aside and renamed, so another process never reads a partial file
+        partial_path = f"{cache_path}.{os.getpid()}.part"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(partial_path, "w", encoding="utf-8") as f:
+                json.dump(artifact, f, ensure_ascii=False)
+            os.replace(partial_path, cache_path)
+
+        except OSError as e:
+            self.logger.warning(f"Failed to cache the cost hierarchy of {project_type}: {e}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
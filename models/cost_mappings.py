@@ -1,33 +1,30 @@
+from models.rule_registry import COST_RULES, DEFAULT_RULE, cost_rule
+
+@cost_rule("Chi phí thuê tablet < 9 inch", reads=("general.device_type", "general.tablet_usage_duration"))
 def get_cost_tablet_small(project, element):
     device_type = project.general.get('device_type', "").lower()
     tablet_duration = project.general.get('tablet_usage_duration', "<= 15 phút")
     return 5000 if tablet_duration == "<= 15 phút" else 8000
 
+@cost_rule("Chi phí thuê tablet >= 9 inch")
 def get_cost_tablet_large(project, element):
     return element.get('cost', 0)
 
-def get_cost_laptop(project, element):    
+@cost_rule("Chi phí thuê laptop")
+def get_cost_laptop(project, element):
     return element.get('cost', 0)
 
+@cost_rule(DEFAULT_RULE)
 def get_default_cost(project, element):
     return element.get('cost', 0)
 
+@cost_rule("Chi phí gửi xe", reads=("settings.parking_fee",))
 def get_cost_parking_fee(project, element):
     return project.settings.get('parking_fee', 5000)
 
-COST_MAPPINGS = {
-    "default" : get_default_cost,
-    "Chi phí thuê tablet < 9 inch" : get_cost_tablet_small,
-    "Chi phí thuê tablet >= 9 inch" : get_cost_tablet_large,
-    "Chi phí thuê laptop" : get_cost_laptop,
-    "Chi phí gửi xe" : get_cost_parking_fee
-
-}
+def resolve_cost_rule(description):
+    return COST_RULES.resolve(description)
 
 def map_cost_for_element(project, element):
     description = element.get('description', "")
-
-    for key, func in COST_MAPPINGS.items():
-        if key == description:
-            return func(project, element)
-    return COST_MAPPINGS["default"](project, element)
\ No newline at end of file
+    return resolve_cost_rule(description)(project, element)
@@ -0,0 +1,226 @@
+# models/cost_plan.py
+# -*- coding: utf-8 -*-
+"""
+Compiled cost plan for the hierarchical cost calculation.
+
+The cost hierarchy JSON (config/clt_cost_hierarchy.json, config/f2f_cost_hierarchy.json)
+is walked once per project type and turned into a flat, read-only list of leaves.
+Each leaf already knows its full title, its cost-toggle group and the cost/quantity
+rules of its elements, bound once from the rule registry, so ProjectModel.flatten_cost_hierarchy only
+has to loop over provinces and emit rows.
+
+When a hierarchy provider is set (ElementCostsModel sets its CostHierarchyCompiler),
+the hierarchy of a project type stored in the element cost database is compiled
+instead of its JSON file, which remains the fallback.
+"""
+
+import os
+import sys
+import json
+import logging
+
+from models.cost_mappings import resolve_cost_rule
+from models.quanty_mappings import resolve_quanty_rule
+from utils.profiler import PROFILER
+
+COST_HIERARCHY_FILES = {
+    "CLT": "config/clt_cost_hierarchy.json",
+    "F2F/D2D": "config/f2f_cost_hierarchy.json"
+}
+
+# Leaves under this title are only emitted when the project has travel data
+TRAVEL_TITLE = "TRAVEL"
+
+INTERVIEWER_TITLE = "INTERVIEWER"
+SUPERVISOR_TITLE = "SUPERVISOR/ ASSISTANT"
+
+# Element whose row carries the combined SUP comments of the province
+SUP_COMMENT_ELEMENT = "Chi phí Quản lý recruit - On-field"
+
+_PLAN_CACHE = {}
+
+# provider(project_type) -> hierarchy dict or None, see set_hierarchy_provider
+_HIERARCHY_PROVIDER = None
+
+logger = logging.getLogger(__name__)
+
+def resource_path(path):
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, path)
+    return os.path.join(os.getcwd(), path)
+
+class _ReadOnly:
+    """Slots are assigned once in __init__ and cannot be rebound afterwards."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__}.{name} is read-only")
+        super().__setattr__(name, value)
+
+class PlanElement(_ReadOnly):
+    """A single cost element of a leaf with its handlers resolved."""
+
+    __slots__ = (
+        "element", "description", "toggle_key", "cost_group", "cost_rule", "quanty_rule",
+        "cost_handler", "quanty_handler", "row_name", "target_audience",
+        "code", "unit", "has_sup_comment", "quanty_reads_samples"
+    )
+
+    def __init__(self, element, title, cost_group):
+        description = element.get("description", "")
+
+        self.element = element
+        self.description = description
+        self.toggle_key = description.lower()
+        self.cost_group = cost_group
+        self.cost_rule = resolve_cost_rule(description)
+        self.quanty_rule = resolve_quanty_rule(description, title)
+        # Timed wrappers while profiling, see the listener at the end of the module
+        self.cost_handler = self.cost_rule.handler()
+        self.quanty_handler = self.quanty_rule.handler()
+        self.row_name = element.get("name", title)
+        self.target_audience = element.get("target_audience", "")
+        self.code = element.get("code", "")
+        self.unit = element.get("unit", "")
+        self.has_sup_comment = description == SUP_COMMENT_ELEMENT
+        # False when the quantity is the same for every province
+        self.quanty_reads_samples = self.quanty_rule.reads_field("samples")
+
+class PlanLeaf(_ReadOnly):
+    """A leaf of the cost hierarchy: the full title and its compiled elements."""
+
+    __slots__ = ("title", "titles", "is_travel", "is_interviewer", "is_supervisor", "elements")
+
+    def __init__(self, title, elements):
+        titles = tuple(title.split(" / "))
+
+        self.title = title
+        self.titles = titles
+        self.is_travel = TRAVEL_TITLE in titles
+        self.is_interviewer = title == INTERVIEWER_TITLE
+        self.is_supervisor = title == SUPERVISOR_TITLE
+        self.elements = tuple(
+            PlanElement(element, title, get_cost_group(titles, element.get("description", "")))
+            for element in elements
+        )
+
+class CostPlan(_ReadOnly):
+    """Flat, immutable list of leaves compiled from one project type's hierarchy."""
+
+    __slots__ = ("project_type", "leaves")
+
+    def __init__(self, project_type, leaves):
+        self.project_type = project_type
+        self.leaves = tuple(leaves)
+
+    def __iter__(self):
+        return iter(self.leaves)
+
+    def __len__(self):
+        return len(self.leaves)
+
+def get_cost_group(titles, description):
+    """Cost-toggle group used by ProjectModel.is_enabled for an element."""
+    if titles[0] == "QC" and "IDI" not in description:
+        return "qc_method_costs"
+    elif titles[0] == "COMMUNICATION" and len(titles) > 1 and titles[1] == "QC":
+        return "qc_communication_cost"
+    return ""
+
+def compile_cost_plan(hierarchy, project_type):
+    """
+    Compile the hierarchy of a project type into a CostPlan.
+
+    Args:
+        hierarchy (dict): Cost hierarchy as stored in the config JSON files
+        project_type (str): Project type key inside the hierarchy
+
+    Returns:
+        CostPlan: The compiled plan, leaves in hierarchy order
+    """
+    leaves = []
+
+    def traverse(subtree, parent_title=""):
+        for title, node in subtree.items():
+            current_title = f"{parent_title} / {title}" if parent_title else title
+
+            if len(node['children']) == 0 and len(node['elements']):
+                leaves.append(PlanLeaf(current_title, node['elements']))
+            else:
+                traverse(node.get("children", {}), current_title)
+
+    traverse(hierarchy[project_type].get("children", {}))
+
+    return CostPlan(project_type, leaves)
+
+def set_hierarchy_provider(provider):
+    """
+    Set where hierarchies come from before their JSON file is read.
+
+    Plans already compiled are kept until clear_cost_plan_cache() is called.
+
+    Args:
+        provider (callable): provider(project_type) returning the hierarchy of the
+            project type, or None to use its file; None removes the provider
+    """
+    global _HIERARCHY_PROVIDER
+
+    _HIERARCHY_PROVIDER = provider
+
+def load_cost_hierarchy(project_type):
+    """
+    Get the hierarchy of a project type from the provider, or else from its JSON file.
+
+    Args:
+        project_type (str): The project type name
+
+    Returns:
+        dict: The cost hierarchy
+    """
+    if _HIERARCHY_PROVIDER is not None:
+        try:
+            hierarchy = _HIERARCHY_PROVIDER(project_type)
+        except Exception as e:
+            logger.error(f"Failed to get the cost hierarchy of {project_type}, using its file: {e}")
+            hierarchy = None
+
+        if hierarchy is not None:
+            return hierarchy
+
+    if project_type not in COST_HIERARCHY_FILES:
+        raise ValueError(f"[CostPlan Error] No cost hierarchy defined for project type {project_type}.")
+
+    with open(resource_path(COST_HIERARCHY_FILES[project_type]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_cost_plan(project_type):
+    """
+    Get the compiled plan of a project type, loading its hierarchy on first use.
+
+    Args:
+        project_type (str): The project type name
+
+    Returns:
+        CostPlan: The cached plan
+    """
+    plan = _PLAN_CACHE.get(project_type)
+
+    if plan is None:
+        plan = compile_cost_plan(load_cost_hierarchy(project_type), project_type)
+        _PLAN_CACHE[project_type] = plan
+
+        logger.info(f"Compiled cost plan for {project_type} with {len(plan)} leaves")
+
+    return plan
+
+def clear_cost_plan_cache(project_type=None):
+    """Drop the cached plan of one project type, or all of them."""
+    if project_type is None:
+        _PLAN_CACHE.clear()
+    else:
+        _PLAN_CACHE.pop(project_type, None)
+
+# Recompile with the raw or the timed rule functions when profiling is toggled
+PROFILER.add_listener(lambda enabled: clear_cost_plan_cache())
@@ -0,0 +1,146 @@
+# models/element_cost_index.py
+# -*- coding: utf-8 -*-
+"""
+Lookup index over the element costs of one project type.
+
+ElementCostsModel stores each project type as a DataFrame whose cost columns are
+named "<level> (<length>)". The index keeps the first row position of every subtitle
+code, the cost columns as one float matrix, the column of every level/length pair and
+the length buckets sorted by their start for a bisect, so a cost lookup does not filter
+the DataFrame or scan the length buckets.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+class ElementCostIndex:
+    """Row, column and length-bucket index of an element costs DataFrame."""
+
+    def __init__(self, df, metadata):
+        """
+        Args:
+            df (pandas.DataFrame): Element costs of a project type
+            metadata (dict): Its "levels", "lengths" and "length_ranges"
+        """
+        self.data = df
+        self.metadata = metadata
+
+        # The first row of a repeated subtitle code wins, as in the DataFrame lookup
+        self.row_positions = {}
+        if "Subtitle Code" in df.columns:
+            for position, subtitle_code in enumerate(df["Subtitle Code"].tolist()):
+                self.row_positions.setdefault(subtitle_code, position)
+
+        # {level: {length: matrix column}} for the cost columns present in df
+        self.level_columns = {}
+        columns = []
+        for level in metadata.get("levels", []):
+            for length in metadata.get("lengths", []):
+                column = f"{level} ({length})"
+                if column in df.columns:
+                    self.level_columns.setdefault(level, {})[length] = len(columns)
+                    columns.append(column)
+
+        self.matrix = (
+            df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+            if columns else np.empty((len(df), 0))
+        )
+
+        # Length buckets in metadata order; the first containing bucket wins
+        length_ranges = metadata.get("length_ranges", {})
+        self.buckets = [
+            (length_ranges.get(length, (0, 60))[0], length_ranges.get(length, (0, 60))[1], length)
+            for length in metadata.get("lengths", [])
+        ]
+        ordered = sorted(self.buckets, key=lambda bucket: bucket[0])
+        self.overlapping = any(
+            next_min <= max_len for (_, max_len, _), (next_min, _, _) in zip(ordered, ordered[1:])
+        )
+        if not self.overlapping:
+            self.buckets = ordered
+        self.bucket_starts = [min_len for min_len, _, _ in self.buckets]
+
+    def find_length(self, interview_length):
+        """
+        Get the length bucket containing an interview length.
+
+        Args:
+            interview_length (int | float): Interview length in minutes
+
+        Returns:
+            str: The length label, or None
+        """
+        if self.overlapping:
+            for min_len, max_len, length in self.buckets:
+                if min_len <= interview_length <= max_len:
+                    return length
+            return None
+
+        position = bisect_right(self.bucket_starts, interview_length) - 1
+
+        if position >= 0:
+            min_len, max_len, length = self.buckets[position]
+            if interview_length <= max_len:
+                return length
+        return None
+
+    def column(self, classification, interview_length):
+        """
+        Get the matrix column of a level and interview length.
+
+        Returns:
+            int: The column, or None if the project type has no such cost column
+        """
+        length = self.find_length(interview_length)
+        if length is None:
+            return None
+        return self.level_columns.get(classification, {}).get(length)
+
+    def get(self, subtitle_code, classification, interview_length, default=0):
+        """
+        Get one cost value.
+
+        Args:
+            subtitle_code (str): The subtitle code
+            classification (str): The classification (L1, L2, ...)
+            interview_length (int | float): Interview length in minutes
+            default: Value returned when the element or the column is missing
+
+        Returns:
+            float: The cost value
+        """
+        position = self.row_positions.get(subtitle_code)
+        column = self.column(classification, interview_length)
+
+        if position is None or column is None:
+            return default
+        return self.matrix[position, column]
+
+    def get_many(self, subtitle_codes, classification, interview_length, default=0):
+        """
+        Get the cost values of many elements for one level and interview length.
+
+        Args:
+            subtitle_codes (iterable): Subtitle codes
+            classification (str): The classification (L1, L2, ...)
+            interview_length (int | float): Interview length in minutes
+            default: Value of the codes that are missing
+
+        Returns:
+            numpy.ndarray: One float per subtitle code
+        """
+        positions = np.fromiter(
+            (self.row_positions.get(subtitle_code, -1) for subtitle_code in subtitle_codes),
+            dtype=np.intp
+        )
+        values = np.full(len(positions), default, dtype=float)
+
+        column = self.column(classification, interview_length)
+        if column is None:
+            return values
+
+        found = positions >= 0
+        values[found] = self.matrix[positions[found], column]
+        return values
@@ -1,11 +1,120 @@
 # models/element_costs_model.py
 # -*- coding: utf-8 -*-
 from PySide6.QtCore import Signal, QObject
+from collections.abc import MutableMapping
+import numpy as np
 import pandas as pd
 import logging
+import os
+import threading
+import time
 from database.db_manager import DatabaseManager
+from database.db_worker import get_db_worker
+from config.settings import COST_HIERARCHY_SETTINGS
+from models.element_cost_index import ElementCostIndex
+from models.cost_hierarchy_compiler import CostHierarchyCompiler
+from models.cost_plan import set_hierarchy_provider, clear_cost_plan_cache
 from utils.element_costs_importer import ElementCostsImporter
 
+class LazyProjectCosts(MutableMapping):
+    """
+    {project_type: {"data": DataFrame, "metadata": dict}} mapping loaded on first access.
+    
+    Membership and iteration come from the project type manifest, a single COUNT query,
+    so listing the project types never reads their costs. A project type is loaded from
+    the database the first time it is looked up; the load of each type is serialized so
+    a background prefetch and the GUI thread never read it twice. As before, project
+    types without element rows are not listed unless they were stored in memory.
+    """
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self._entries = {}
+        self._manifest = None
+        self._lock = threading.Lock()
+        self._load_locks = {}
+    
+    def manifest(self):
+        """Get the {project_type: row_count} manifest, querying it on first use."""
+        manifest = self._manifest
+        if manifest is None:
+            manifest = self._manifest = self.db_manager.get_project_type_manifest()
+        return manifest
+    
+    def is_loaded(self, project_type):
+        """Whether the costs of a project type are already in memory."""
+        return project_type in self._entries
+    
+    def invalidate(self):
+        """Forget the loaded costs and the manifest, e.g. after the database was replaced."""
+        with self._lock:
+            self._entries = {}
+            self._manifest = None
+            self._load_locks = {}
+    
+    def _load_lock(self, project_type):
+        with self._lock:
+            return self._load_locks.setdefault(project_type, threading.Lock())
+    
+    def _load(self, project_type):
+        start = time.perf_counter()
+        df, metadata = self.db_manager.get_element_costs(project_type)
+        
+        if df is None or df.empty:
+            # Not listed any more, as load_costs_from_database skipped empty types
+            self.manifest()[project_type] = 0
+            return None
+        
+        entry = self._entries[project_type] = {
+            "data": df,
+            "metadata": metadata
+        }
+        self.logger.info(
+            f"Loaded {len(df)} element costs for {project_type} in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return entry
+    
+    def __getitem__(self, project_type):
+        entry = self._entries.get(project_type)
+        if entry is not None:
+            return entry
+        
+        if not self.manifest().get(project_type):
+            raise KeyError(project_type)
+        
+        with self._load_lock(project_type):
+            entry = self._entries.get(project_type)
+            if entry is None:
+                entry = self._load(project_type)
+        
+        if entry is None:
+            raise KeyError(project_type)
+        return entry
+    
+    def __setitem__(self, project_type, entry):
+        self._entries[project_type] = entry
+        self.manifest().setdefault(project_type, 0)
+    
+    def __delitem__(self, project_type):
+        if project_type not in self:
+            raise KeyError(project_type)
+        
+        self._entries.pop(project_type, None)
+        self.manifest().pop(project_type, None)
+    
+    def __contains__(self, project_type):
+        return project_type in self._entries or bool(self.manifest().get(project_type))
+    
+    def __iter__(self):
+        return iter([
+            project_type for project_type, row_count in list(self.manifest().items())
+            if row_count or project_type in self._entries
+        ])
+    
+    def __len__(self):
+        return len(list(iter(self)))
+
 class ElementCostsModel(QObject):
     """Model for managing element costs for different project types."""
     
@@ -13,35 +122,78 @@ class ElementCostsModel(QObject):
     
     def __init__(self):
         super().__init__()
-        self.costs = {}  # {project_type: {"data": DataFrame, "metadata": dict}}
         self.logger = logging.getLogger(__name__)
         
         # Initialize database manager
         self.db_manager = DatabaseManager()
         
-        # Load costs from database
+        # {project_type: {"data": DataFrame, "metadata": dict}}, loaded on first access
+        self.costs = LazyProjectCosts(self.db_manager)
+        
+        # {project_type: ElementCostIndex}, see get_cost_index
+        self._cost_indexes = {}
+        
+        # {(project_type, timestamp): ElementCostIndex} of point-in-time costs, dropped on any change
+        self._as_of_indexes = {}
+        self.costsChanged.connect(self._as_of_indexes.clear)
+        
+        # Cost hierarchies compiled from the stored costs
+        self.hierarchy_compiler = CostHierarchyCompiler(self.db_manager)
+        use_compiled_hierarchies = any(COST_HIERARCHY_SETTINGS["from_database"].values())
+        if use_compiled_hierarchies:
+            set_hierarchy_provider(self._compiled_hierarchy)
+        
+        # Load the project type manifest from database
         self.load_costs_from_database()
+        
+        if use_compiled_hierarchies:
+            # Cost plans are recompiled from the new hierarchies on their next lookup
+            self.costsChanged.connect(clear_cost_plan_cache)
+    
+    def _compiled_hierarchy(self, project_type):
+        """
+        Hierarchy provider of the cost plans, for the project types enabled in
+        COST_HIERARCHY_SETTINGS["from_database"].
+        
+        Args:
+            project_type (str): The project type name
+            
+        Returns:
+            dict: The hierarchy compiled from the database, or None to use the JSON file
+        """
+        if not COST_HIERARCHY_SETTINGS["from_database"].get(project_type, False):
+            return None
+        
+        return self.hierarchy_compiler.get_hierarchy(project_type)
     
     def load_costs_from_database(self):
-        """Load all element costs from the database with dynamic level/length support."""
+        """(Re)load the project types from the database; their costs load on first access."""
         try:
-            # Get all project types
-            project_types = self.db_manager.get_project_types()
-            
-            # Load costs for each project type
-            for project_type in project_types:
-                df, metadata = self.db_manager.get_element_costs(project_type)
-                if df is not None and not df.empty:
-                    self.costs[project_type] = {
-                        "data": df,
-                        "metadata": metadata
-                    }
+            self.costs.invalidate()
+            self._cost_indexes = {}
             
-            self.logger.info(f"Loaded costs for {len(self.costs)} project types from database")
+            self.logger.info(f"Found {len(self.costs)} project types with costs in database")
             self.costsChanged.emit()
             
         except Exception as e:
             self.logger.error(f"Failed to load costs from database: {str(e)}")
+    
+    def prefetch(self, project_type):
+        """
+        Load the costs of a project type on the read pool of the database worker.
+        
+        Args:
+            project_type (str): The project type name, e.g. the one of the open project
+        """
+        if not project_type or self.costs.is_loaded(project_type) or project_type not in self.costs:
+            return
+        
+        # Loads the costs and builds their lookup index
+        get_db_worker().submit(
+            self.get_cost_index,
+            project_type,
+            name=f"element-costs-prefetch-{project_type}"
+        )
 
     def import_csv(self, file_path):
         """Import element costs from a CSV file with dynamic level/length support."""
@@ -59,7 +211,120 @@ class ElementCostsModel(QObject):
             self.logger.error(f"Failed to import costs: {str(e)}")
             return False, f"Failed to import costs: {str(e)}"
     
-    def get_cost(self, project_type, subtitle_code, classification, interview_length):
+    def import_files_async(self, file_paths, force=False):
+        """
+        Import CSV files and Excel workbooks on the database worker's write queue.
+        
+        Connect job.signals.finished to apply_import_results to store the imported
+        costs in the model.
+        
+        Args:
+            file_paths (list): Paths of the .csv and .xlsx files
+            force (bool): Import the files that are unchanged since their last import too
+            
+        Returns:
+            DbJob: The queued job; progress is reported per file and cancelling it
+                stops before the next file
+        """
+        importer = ElementCostsImporter()
+        return get_db_worker().submit(
+            importer.import_files, list(file_paths), self.db_manager,
+            write=True, with_job=True, name="import_files", force=force
+        )
+    
+    def apply_import_results(self, results):
+        """
+        Store the costs imported by ElementCostsImporter.import_files.
+        
+        Args:
+            results (list): Result dicts of import_files
+            
+        Returns:
+            tuple: (success_count, failure_count, messages)
+        """
+        success_count = 0
+        failure_count = 0
+        messages = []
+        changed = False
+        
+        for result in results:
+            if result["success"]:
+                # Skipped files left the stored costs as they were
+                if result.get("data") is not None:
+                    self.costs[result["project_type"]] = {
+                        "data": result["data"],
+                        "metadata": result["metadata"]
+                    }
+                    changed = True
+                success_count += 1
+            else:
+                failure_count += 1
+                
+            messages.append(f"{os.path.basename(result['file_path'])}: {result['message']}")
+        
+        if changed:
+            self.costsChanged.emit()
+        
+        return success_count, failure_count, messages
+    
+    def get_costs_as_of(self, project_type, as_of):
+        """
+        Get the costs of a project type as they were at a point in time.
+        
+        Args:
+            project_type (str): The project type name
+            as_of (datetime | date | str): The point in time, see DatabaseManager.get_element_costs
+            
+        Returns:
+            dict: {"data": DataFrame, "metadata": dict}, or None if the project type has no costs
+        """
+        index = self.get_cost_index(project_type, as_of)
+        if index is None:
+            return None
+        
+        return {"data": index.data, "metadata": index.metadata}
+    
+    def get_cost_index(self, project_type, as_of=None):
+        """
+        Get the lookup index of a project type's costs, building it on first use.
+        
+        The current index is rebuilt when the project type's DataFrame was replaced or
+        edited; point-in-time indexes are read from the history and kept until the
+        costs change.
+        
+        Args:
+            project_type (str): The project type name
+            as_of (datetime | date | str, optional): Index the costs in effect at this time
+            
+        Returns:
+            ElementCostIndex: The index, or None if the project type has no costs
+        """
+        if as_of is not None:
+            key = (project_type, self.db_manager.history_timestamp(as_of))
+            index = self._as_of_indexes.get(key)
+            
+            if index is None:
+                df, metadata = self.db_manager.get_element_costs(project_type, as_of=as_of)
+                if df is None or df.empty:
+                    return None
+                
+                index = self._as_of_indexes[key] = ElementCostIndex(df, metadata)
+            return index
+        
+        project_costs = self.costs.get(project_type)
+        if project_costs is None:
+            return None
+        
+        df = project_costs["data"]
+        index = self._cost_indexes.get(project_type)
+        
+        if index is None or index.data is not df:
+            index = ElementCostIndex(df, project_costs.get("metadata", {}))
+            self._cost_indexes[project_type] = index
+        
+        return index
+    
+    def get_cost(self, project_type, subtitle_code, classification, interview_length, as_of=None):
         """
         Get a specific cost value with dynamic level/length support.
         
@@ -68,46 +333,36 @@ class ElementCostsModel(QObject):
             subtitle_code (str): The subtitle code
             classification (str): The classification (L1, L2, L3, etc.)
             interview_length (int): The interview length in minutes
+            as_of (datetime | date | str, optional): Price with the costs in effect at this time
             
         Returns:
             float: The cost value, or 0 if not found
         """
-        if project_type not in self.costs:
-            return 0
-            
-        df = self.costs[project_type]["data"]
-        metadata = self.costs[project_type].get("metadata", {})
-        
-        # Find the row with the matching subtitle code
-        matching_rows = df[df["Subtitle Code"] == subtitle_code]
-        if matching_rows.empty:
-            return 0
-        
-        # Determine the appropriate column based on classification and interview length
-        available_levels = metadata.get("levels", [])
-        available_lengths = metadata.get("lengths", [])
-        length_ranges = metadata.get("length_ranges", {})
-        
-        if classification not in available_levels:
+        index = self.get_cost_index(project_type, as_of)
+        if index is None:
             return 0
         
-        # Find the appropriate length range
-        matching_length = None
-        for length in available_lengths:
-            min_length, max_length = length_ranges.get(length, (0, 60))
-            if min_length <= interview_length <= max_length:
-                matching_length = length
-                break
+        return index.get(subtitle_code, classification, interview_length)
+    
+    def get_costs_bulk(self, project_type, subtitle_codes, classification, interview_length, as_of=None):
+        """
+        Get the cost values of many elements for one level and interview length.
         
-        if not matching_length:
-            return 0
+        Args:
+            project_type (str): The project type name
+            subtitle_codes (iterable): The subtitle codes
+            classification (str): The classification (L1, L2, L3, etc.)
+            interview_length (int): The interview length in minutes
+            as_of (datetime | date | str, optional): Price with the costs in effect at this time
             
-        column = f"{classification} ({matching_length})"
-        if column not in df.columns:
-            return 0
+        Returns:
+            numpy.ndarray: One cost value per subtitle code, 0 for those not found
+        """
+        index = self.get_cost_index(project_type, as_of)
+        if index is None:
+            return np.zeros(len(list(subtitle_codes)))
         
-        # Return the cost value
-        return matching_rows.iloc[0][column]
+        return index.get_many(subtitle_codes, classification, interview_length)
     
     def _get_column_name(self, classification, interview_length):
         """
@@ -200,25 +455,69 @@ class ElementCostsModel(QObject):
         if column not in df.columns:
             return False
         
-        # Update the value in the DataFrame
-        try:
-            df.at[row_idx[0], column] = float(value)
+        return self.update_costs(project_type, [(subtitle_code, column, value)])
+    
+    def update_costs(self, project_type, edits):
+        """
+        Update many cost cells in one database transaction, e.g. a paste or fill-down.
+        
+        Args:
+            project_type (str): The project type name
+            edits (iterable): (subtitle_code, column, value) tuples, column being a cost
+                column of the data such as "L1 (<15 min)"
             
-            # Update the value in the database
-            success = self.db_manager.update_element_cost(
-                project_type, subtitle_code, classification, matching_length, value
-            )
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if project_type not in self.costs:
+            return False
             
-            if success:
-                self.costsChanged.emit()
-                return True
-            else:
-                # Revert the change in the DataFrame if database update failed
-                self.logger.warning(f"Database update failed for {project_type}, {subtitle_code}, {classification} {matching_length}")
+        df = self.costs[project_type]["data"]
+        metadata = self.costs[project_type].get("metadata", {})
+        
+        # Cost columns are named "<level> (<length>)"
+        column_keys = {
+            f"{level} ({length})": (level, length)
+            for level in metadata.get("levels", [])
+            for length in metadata.get("lengths", [])
+        }
+        
+        # The first row of a repeated subtitle code is the one that is edited
+        row_indexes = {}
+        for row_idx, subtitle_code in zip(df.index, df["Subtitle Code"]):
+            row_indexes.setdefault(str(subtitle_code), row_idx)
+        
+        cells = []
+        db_edits = []
+        for subtitle_code, column, value in edits:
+            row_idx = row_indexes.get(str(subtitle_code))
+            if row_idx is None or column not in column_keys or column not in df.columns:
+                self.logger.warning(f"Cannot update {column} of {subtitle_code} for {project_type}")
                 return False
+            
+            level, length = column_keys[column]
+            cells.append((row_idx, column, float(value)))
+            db_edits.append((subtitle_code, level, length, float(value)))
+        
+        if not cells:
+            return True
+        
+        try:
+            # Update the value in the database
+            if not self.db_manager.update_element_costs(project_type, db_edits):
+                self.logger.warning(f"Database update failed for {len(db_edits)} cost values of {project_type}")
+                return False
+            
+            # Update the values in the DataFrame
+            for row_idx, column, value in cells:
+                df.at[row_idx, column] = value
+            self._cost_indexes.pop(project_type, None)
+            
+            self.costsChanged.emit()
+            return True
                 
         except Exception as e:
-            self.logger.error(f"Error updating cost: {e}")
+            self.logger.error(f"Error updating costs: {e}")
             return False
     
     def _get_interview_length_string(self, interview_length):
@@ -21,13 +21,12 @@ from components.validation_field import FieldValidator
 from formulars.pricing_formulas import (
     calculate_daily_sup_target
 )
-from models.cost_mappings import map_cost_for_element
-from models.quanty_mappings import (
-    map_quanty_for_element,
-    map_quanty_for_price,
-    get_chi_phi_phieu_pv_title,
-    MAPPING_STATIONARY
-)
+from models.cost_plan import compile_cost_plan
+from models.cost_engine import CostEngine
+from models.vector_cost_engine import VectorCostEngine
+from models.sample_summary import ProvinceSampleSummary
+from models.rate_card_index import get_rate_card_index, make_price_entry, make_pricing_entry, make_target_entry
+from models.quanty_mappings import MAPPING_STATIONARY
 
 class ProjectModel(QObject):
     """
@@ -35,7 +34,13 @@ class ProjectModel(QObject):
     """
     dataChanged = Signal()  # Signal emitted whenever data changes
     
-    def __init__(self):
+    def __init__(self, element_costs=None):
+        """
+        Args:
+            element_costs (ElementCostsModel, optional): Element costs shared with
+                another model; a new ElementCostsModel, which opens the database and
+                registers the cost hierarchy provider, is created by default
+        """
         super().__init__()
 
         self.logger = logging.getLogger(__name__)
@@ -43,7 +48,7 @@ class ProjectModel(QObject):
         self.reset()
         
         # Initialize element costs model
-        self.element_costs = ElementCostsModel()
+        self.element_costs = element_costs if element_costs is not None else ElementCostsModel()
     
     def resource_path(self, path):
         if hasattr(sys, '_MEIPASS'):
@@ -297,6 +302,12 @@ class ProjectModel(QObject):
         # Tab 2: Samples data
         # Structure: {province: {target_audience: {sample_type: {"sample_size": int, "price_growth": float}}}}
         self.samples = {}
+
+        # Cached ProvinceSampleSummary per province, see get_sample_summary()
+        self._sample_summaries = {}
+
+        # Incremental calculator of the flat cost rows, see flatten_cost_hierarchy()
+        self.cost_engine = CostEngine(self)
         
         # Tab 3: QC Method data
         # List of dictionaries with team, method, and rate
@@ -326,12 +337,9 @@ class ProjectModel(QObject):
         with open(json_path, mode = 'r', encoding="utf-8") as f:
             self.industries_data = json.load(f)
 
-        self.rate_card_settings = {}
-
-        json_path = self.resource_path(r'config/rate_card_settings.json')
-
-        with open(json_path, mode='r', encoding="utf-8") as f:
-            self.rate_card_settings = json.load(f)
+        # Loaded and indexed once per process, see models/rate_card_index.py
+        self.rate_card_index = get_rate_card_index(self.resource_path(r'config/rate_card_settings.json'))
+        self.rate_card_settings = self.rate_card_index.settings
 
         self.dataChanged.emit()
 
@@ -516,6 +524,7 @@ class ProjectModel(QObject):
             value: New value for the field
         """
         self.settings[field] = value
+        self.cost_engine.invalidate_field("settings", field)
         self.dataChanged.emit()
         
         # If interviewers_per_supervisor is updated, recalculate daily_sup_target for all samples
@@ -565,135 +574,31 @@ class ProjectModel(QObject):
         return audience_entry
 
     def _make_price_entry(self, price, price_growth, type):
-        return {
-            "price": price,
-            "price_growth": price_growth,
-            "type": type,
-            "comment": {}
-        }
+        return make_price_entry(price, price_growth, type)
 
     def _make_pricing_entry(self, sample_type, pricing):
-
-        if sample_type == 'Pilot':
-            return [self._make_price_entry(pricing.get('pilot'), 0, 'pilot')]
-        elif sample_type == 'None':
-            return [self._make_price_entry(pricing.get('non'), 0, 'non')]
-        elif sample_type == 'Main':
-            return [
-                self._make_price_entry(pricing.get('main', {}).get('recruit'), 0, 'recruit'),
-                self._make_price_entry(pricing.get('main', {}).get('location'), 0, 'location')
-            ]
-        elif sample_type == 'Booster':
-            return [
-                self._make_price_entry(pricing.get('main', {}).get('booster'), 0, 'recruit'),
-                self._make_price_entry(pricing.get('main', {}).get('booster'), 0, 'location')
-            ]
-        else:
-            raise ValueError(f"[RateCard Error] Sample type {sample_type} isn't defined in rate card settings.")
+        return make_pricing_entry(sample_type, pricing)
 
     def _make_target_rate_card(self, objectives_classification: str, rate_card: dict):
-        return {
-            "objectives_classification": objectives_classification,
-            "daily_interview_target": rate_card.get('daily_interview_target'),
-            "target_for_interviewer": rate_card.get('target_for_interviewer'),
-            "interviewers_per_supervisor": rate_card.get('interviewers_per_supervisor'),
-        }
+        return make_target_entry(objectives_classification, rate_card)
 
     def _get_rate_card(self, sample_type, interview_length: int, incident_rate: int):
-        project_type = self.general['project_type']
-
-        if project_type not in self.rate_card_settings.keys():
-            raise ValueError(f"[RateCard Error] Project type {project_type} isn't defined in rate card settings.")
-        
-        levels = list([level for level in self.rate_card_settings[project_type].keys()])
-
-        #Determine the level based on total number of levels
-        interval = 100 / len(levels)
-
-        current_level = "L1"
-        start_interval = 100
-        end_interval = 100 - interval
-
-        for i, level in enumerate(levels):
-            
-            if start_interval >= incident_rate >= end_interval:
-                current_level = level
-                break
-            
-            start_interval = end_interval
-            end_interval -= interval + (0 if i < len(levels) else 1)
-
-        rate_cards = self.rate_card_settings[project_type].get(f"{current_level}")
-
-        if not rate_cards:
-            raise ValueError(f"[RateCard Error] No rate cards found for level {current_level} in project type {project_type}.")
-
-        for rate_card in rate_cards:
-            min_len, max_len = rate_card['interview_length_range']
-
-            if min_len <= interview_length <= max_len:
-                try:
-                    objectives_classification = f"{current_level} ({min_len} - {max_len} minutes)"
+        """
+        Get the rate card pricing and target entries of an audience.
 
-                    rate_card_pricing = self._make_pricing_entry(sample_type, rate_card.get('pricing', {}))
-                    rate_card_target = self._make_target_rate_card(objectives_classification, rate_card)
+        Args:
+            sample_type (str): The audience's sample type
+            interview_length (int): Interview length in minutes
+            incident_rate (int): The audience's incident rate
 
-                    return rate_card_pricing, rate_card_target
-                except ValueError as e:
-                    raise str(e)
-        
-        raise ValueError(
-            f"[RateCard Error] No rate card found for interview_length = {interview_length} "
-            f"in project_type '{project_type}', level {current_level}."
-        )
+        Returns:
+            tuple: (pricing, target), copies owned by the caller
+        """
+        return self.rate_card_index.entries(self.general['project_type'], sample_type, interview_length, incident_rate)
     
     def get_rate_card_target(self, incident_rate):
-        project_type = self.general['project_type']
-
-        if project_type not in self.rate_card_settings.keys():
-            raise ValueError(f"[RateCard Error] Project type {project_type} isn't defined in rate card settings.")
-        
-        levels = list([level for level in self.rate_card_settings[project_type].keys()])
-
-        #Determine the level based on total number of levels
-        interval = 100 / len(levels)
-
-        current_level = "L1"
-        start_interval = 100
-        end_interval = 100 - interval
-
-        for i, level in enumerate(levels):
-            
-            if start_interval <= incident_rate <= end_interval:
-                current_level = level
-                break
-            
-            start_interval = end_interval
-            end_interval -= interval + (0 if i < len(levels) else 1)
-
-        rate_cards = self.rate_card_settings[project_type].get(f"{current_level}")
-
-        if not rate_cards:
-            raise ValueError(f"[RateCard Error] No rate cards found for level {current_level} in project type {project_type}.")
-
-        for rate_card in rate_cards:
-            min_len, max_len = rate_card['interview_length_range']
-            interview_length = self.general['interview_length']
-
-            if min_len <= interview_length <= max_len:
-                try:
-                    objectives_classification = f"{current_level} ({min_len} - {max_len} minutes)"
-
-                    rate_card_target = self._make_target_rate_card(objectives_classification, rate_card)
-
-                    return rate_card_target
-                except ValueError as e:
-                    raise str(e)
-            
-        raise ValueError(
-            f"[RateCard Error] No rate card found for interview_length = {interview_length} "
-            f"in project_type '{project_type}', level {current_level}."
-        )
+        """Get the rate card target entry for an incident rate at the project's interview length."""
+        return self.rate_card_index.target(self.general['project_type'], self.general['interview_length'], incident_rate)
     
     def get_audience(self, new_audience_data):
         try:
@@ -746,15 +651,45 @@ class ProjectModel(QObject):
         self.cost_toggles.update(data.get("cost_toggles", {}))
         self.settings.update(data.get("settings", {}))
         self.samples = data.get("samples", {})
+        self.invalidate_sample_summaries()
+        self.cost_engine.invalidate_all()
         self.qc_methods = data.get("qc_methods", [])
         self.travel = data.get("travel", {})
         self.assignments = data.get("assignments", [])  # Load assignments data
         self.additional_costs = data.get("additional_costs", [])
         self.subcontracts = data.get("subcontracts", [])
 
+        # Load the costs of the project's type before they are first shown
+        self.element_costs.prefetch(self.general.get("project_type"))
+
         # Emit signal for UI update
         self.dataChanged.emit()
 
+    def get_sample_summary(self, province):
+        """
+        Get the sample aggregates of a province, building them on first use.
+
+        Args:
+            province (str): Province name
+
+        Returns:
+            ProvinceSampleSummary: Totals shared by all quantity rules of the province
+        """
+        summary = self._sample_summaries.get(province)
+
+        if summary is None:
+            summary = ProvinceSampleSummary(self.samples[province])
+            self._sample_summaries[province] = summary
+
+        return summary
+
+    def invalidate_sample_summaries(self, province=None):
+        """Drop the cached sample aggregates of one province, or of all provinces."""
+        if province is None:
+            self._sample_summaries.clear()
+        else:
+            self._sample_summaries.pop(province, None)
+
     def update_general(self, field, value):
         """
         Update a field in the general data.
@@ -763,12 +698,16 @@ class ProjectModel(QObject):
             field (str): Field name to update
             value: New value for the field
         """
+        before = dict(self.general)
         self.general[field] = value
         
         if field == "device_type":
             self.set_tablet_usage_duration(value)
             self.set_selected_device_cost(value)
 
+        if field == "project_type":
+            self.element_costs.prefetch(value)
+
         if field == "type_of_quota_control":
             if self.general[field] != "Interlocked Quota":
                 self.general["quota_description"] = []
@@ -780,6 +719,8 @@ class ProjectModel(QObject):
             if field == "provinces":
                 self.update_travel_structure()
         
+        self._invalidate_changed_fields("general", before)
+        
         self.dataChanged.emit()
     
     def update_samples_structure(self):
@@ -844,6 +785,8 @@ class ProjectModel(QObject):
                 new_samples[province][f"{sample_type} - {audience_name}"] = audience_entry
 
         self.samples = new_samples
+        self.invalidate_sample_summaries()
+        self.cost_engine.invalidate_all()
         self.dataChanged.emit()
     
     def update_sample(self, province, audience_data):
@@ -867,11 +810,15 @@ class ProjectModel(QObject):
 
         # Update the audience in the model
         self.samples[province][audience_key] = audience_data
+        self.invalidate_sample_summaries(province)
+        self.cost_engine.invalidate_province(province)
 
         # Emit signal to notify change
         self.dataChanged.emit()
 
     def update_clt_settings(self, field, value):
+        before = dict(self.clt_settings)
+
         if field == "clt_number_of_samples_to_label":
             if value == 0:
                 self.clt_settings["clt_description_howtolabelthesample"] = ""
@@ -891,9 +838,13 @@ class ProjectModel(QObject):
 
         self.clt_settings[field] = value
 
+        self._invalidate_changed_fields("clt_settings", before)
+
         self.dataChanged.emit()
 
     def clt_settings_clear(self):
+        before = dict(self.clt_settings)
+
         for key, value in self.clt_settings.items():
             if key == "clt_assistant_setup_days":
                 self.clt_settings[key] = 1
@@ -906,13 +857,17 @@ class ProjectModel(QObject):
             else:
                 self.clt_settings[key] = 0
 
+        self._invalidate_changed_fields("clt_settings", before)
+
     def update_hut_settings(self, field, value):
         self.hut_settings[field] = value
+        self.cost_engine.invalidate_field("hut_settings", field)
         self.dataChanged.emit()
 
     def hut_settings_clear(self):
         for key, value in self.hut_settings.items():
             self.hut_settings[key] = 0
+            self.cost_engine.invalidate_field("hut_settings", key)
 
     def update_travel_structure(self):
         """
@@ -959,135 +914,45 @@ class ProjectModel(QObject):
         self.travel = new_travel
         self.dataChanged.emit()
 
-    def flatten_cost_hierarchy(self, hierarchy):
-        flat_rows = []
-
-        def get_comment(comment_item):
-            comment_titles = {
-                "price_growth": "Price Growth",
-                "target_for_interviewer": "Target for Interviewer",
-                "daily_sup_target": "Daily SUP Target" 
-            }
-
-            comment = ""
-
-            if comment_item:
-                for key, value in comment_item.items():
-                    comment += ('' if len(comment) == 0 else '\n') + f'{comment_titles[key]}: {value}'
-
-            return comment
-    
-        def create_element_from_pricing(current_title, province, target_audience):
-            
-            for price in target_audience.get('pricing', []):
-                cost = price.get('price', 0) * abs(1 + price.get('price_growth', 0) / 100) 
-                quanty = map_quanty_for_price(self, price, province, target_audience)
-                
-                try:
-                    total_cost = cost * quanty
-                except Exception as e:
-                    logging.critical(f"[Error] Failed to calculate total for {price.get('type')} in {current_title}")
-                    raise Exception(f"[Error] Failed to calculate total for {price.get('type')} in {current_title}")
-                
-                comment = get_comment(price.get('comment', {}))
-
-                row = [
-                    current_title,
-                    province,
-                    get_chi_phi_phieu_pv_title(price.get('type', '').lower()),
-                    target_audience.get('name', ''),
-                    0,
-                    "Phiếu",
-                    0 if not cost or cost == 0 else cost,
-                    0 if not quanty or quanty == 0 else quanty,
-                    0 if not total_cost or total_cost == 0 else total_cost,
-                    comment
-                ]
-
-                flat_rows.append(row)
-
-        def create_element(current_title, elements):
-            for province in self.samples.keys():
-                if current_title == "INTERVIEWER":
-                    sample_type_order = {
-                        "Pilot" : 0,
-                        "Main" : 1,
-                        "Booster" : 2,
-                        "Non" : 3
-                    }
-
-                    sorted_target_audiences = sorted(
-                        self.samples.get(province, {}).items(),
-                        key = lambda item: sample_type_order.get(item[1].get("sample_type", ""), 99)
-                    )
-
-                    for key, target_audience in sorted_target_audiences:
-                        create_element_from_pricing(current_title, province, target_audience)
+    def flatten_cost_hierarchy(self, hierarchy=None, vectorized=False):
+        """
+        Calculate the flat cost rows of the project.
 
-                if current_title == "SUPERVISOR/ ASSISTANT":
-                    sup_comment = ""
-                    
-                    for key, target_audience in self.samples.get(province, {}).items():
-                        comment = get_comment(target_audience.get('comment', {}))
+        Without a hierarchy the project's CostEngine is used, so only the rows
+        affected by edits since the last call are recomputed.
 
-                        if comment:
-                            sup_comment += ("\n" if len(sup_comment) > 0 else "") + comment
+        Args:
+            hierarchy (dict, optional): Cost hierarchy to use instead of the compiled
+                plan cached for the project type
+            vectorized (bool): Price everything at once with VectorCostEngine, which
+                suits projects with many provinces and audiences
 
-                for element in elements:
-                    cost_description = element.get("description", "")
+        Returns:
+            list: One row per element and province
+        """
+        plan = None
+        if hierarchy is not None:
+            plan = compile_cost_plan(hierarchy, self.general.get('project_type', ""))
 
-                    if "Chi phí Card điện thoại" in cost_description:
-                        a = ""
+        if vectorized:
+            return VectorCostEngine(self, plan=plan).rows()
 
-                    titles = current_title.split(" / ")
+        if plan is None:
+            return self.cost_engine.rows()
 
-                    if titles[0] == "QC" and "IDI" not in cost_description:
-                        cost_group = "qc_method_costs"
-                    elif titles[0] == "COMMUNICATION" and titles[1] == "QC":
-                        cost_group = "qc_communication_cost"
-                    else:
-                        cost_group = ""
+        return CostEngine(self, plan=plan).rows()
 
-                    if self.is_enabled(cost_description, cost_group=cost_group):
-                        cost = map_cost_for_element(self, element)
-                        quanty = map_quanty_for_element(self, element, province, title=current_title)
-                        
-                        try:
-                            total_cost = cost * quanty
-                        except Exception as e:
-                            logging.critical(f"[Error] Failed to calculate total for {element.get('description')} in {current_title}")
-                            raise Exception(f"[Error] Failed to calculate total for {element.get('description')} in {current_title}")
-
-                        row = [
-                            element.get("name", current_title),
-                            province,
-                            cost_description,
-                            element.get("target_audience", ""),
-                            element.get("code", ""),
-                            element.get("unit", ""),
-                            0 if not cost or cost == 0 else cost,
-                            0 if not quanty or quanty == 0 else quanty,
-                            0 if not total_cost or total_cost == 0 else total_cost,
-                            sup_comment if cost_description == "Chi phí Quản lý recruit - On-field" else ""
-                        ]
-
-                        flat_rows.append(row)
-
-        def traverse(subtree, parent_title=""):
-            for title, node in subtree.items():
-                if title == "TRAVEL" and len(self.travel.keys()) == 0:
-                    continue
-
-                current_title = f"{parent_title} / {title}" if parent_title else title
-
-                if len(node['children']) == 0 and len(node['elements']):
-                    create_element(current_title, node['elements'])
-                else:
-                    traverse(node.get("children", {}), current_title)
+    def get_total_cost(self):
+        """Running total of the project from the incremental cost engine."""
+        return self.cost_engine.total_cost()
 
-        traverse(hierarchy[self.general.get('project_type', "")].get("children", {}))
+    def _invalidate_changed_fields(self, section, before):
+        """Invalidate the cost rows reading any field of a section that differs from `before`."""
+        current = getattr(self, section)
 
-        return flat_rows
+        for field in set(before) | set(current):
+            if before.get(field) != current.get(field):
+                self.cost_engine.invalidate_field(section, field)
     
 
     # def _recalculate_daily_sup_targets(self):
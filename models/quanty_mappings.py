@@ -1,9 +1,13 @@
 import re
-from formulars.pricing_formulas import (
-    calculate_sample_size,
-    calculate_total_of_sample_size,
-    calculate_total_daily_sup_target
+from models.rule_registry import (
+    QUANTITY_RULES,
+    PRICE_QUANTITY_RULES,
+    DEFAULT_RULE,
+    OTHER_DEFAULT_RULE,
+    quantity_rule,
+    price_quantity_rule
 )
+from formulars.pricing_formulas import calculate_sample_size
 
 MAPPING_STATIONARY = {
     "Photo trắng đen" : "bw_page_count",
@@ -33,35 +37,36 @@ def get_chi_phi_phieu_pv_title(type):
     else:
         return None
 
+@quantity_rule(DEFAULT_RULE, reads=("samples",))
 def get_default_quanty(project, element, province, title=""):
-    quanty = calculate_total_of_sample_size(project.samples[province])
+    quanty = project.get_sample_summary(province).total()
 
+@quantity_rule("Quà Phiếu PV - Pilot", "Quà Phiếu PV - Main", "Quà Phiếu PV - Booster", "Quà Phiếu PV - Non", reads=("samples",))
 def get_quaphieu_phongvan(project, element, province, title=""):
     description = element.get('description', '')
 
-    audience_data = [
-        (key, value)
-        for key, value in project.samples[province].items()
-        if re.match(pattern=rf"^Q.+PV\s-\s{value.get('sample_type')}$", string=description)
-    ]
+    summary = project.get_sample_summary(province)
 
-    quanty = calculate_total_of_sample_size(dict(audience_data))
+    quanty = sum(
+        sample_size
+        for sample_type, sample_size in summary.by_type.items()
+        if re.match(pattern=rf"^Q.+PV\s-\s{sample_type}$", string=description)
+    )
     return quanty
 
 def get_sample_size_by_sample_type(project, element, province, title=""):
     sample_size = 0
     description = element.get('description', "")
 
-    for target_audience in project.samples[province].values():
-        sample_type = target_audience.get('sample_type', "")
-
+    for sample_type, type_sample_size in project.get_sample_summary(province).by_type.items():
         if re.match(pattern=f'Quà Phiếu PV - {sample_type}', string=description):
-            sample_size += calculate_sample_size(target_audience.get('sample_size', 0), target_audience.get('extra_rate', 0))
+            sample_size += type_sample_size
 
     return sample_size
 
+@quantity_rule("Chi phí thuê tablet < 9 inch", "Chi phí thuê tablet >= 9 inch", "Chi phí thuê laptop", reads=("samples", "clt_settings.clt_sample_size_per_day"))
 def get_chiphithue_thietbi(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
 
     if "INTERVIEWER" in title:
         return sample_size    
@@ -71,23 +76,27 @@ def get_chiphithue_thietbi(project, element, province, title=""):
         quanty = round(sample_size / clt_sample_size_per_day * 2, 2)
         return quanty
     
+@quantity_rule("Chi phí gửi xe", reads=("samples",))
 def get_quanty_parking_fee(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     return sample_size
 
+@quantity_rule("Chi phí Tuyển đáp viên IDI", reads=("clt_settings.clt_sample_recruit_idi",))
 def get_chiphi_tuyendapvien_idi(project, element, province, title=""):
     sample_recruit_idi = project.clt_settings.get('clt_sample_recruit_idi')
     return sample_recruit_idi
 
+@quantity_rule("Chi phí Phiếu PV - Bài rớt giữa chừng", reads=("samples", "clt_settings.clt_failure_rate"))
 def get_failure_rate(project, element, province, title=""):
     failure_rate = project.clt_settings.get('clt_failure_rate', 0)
-    sample_size = calculate_total_of_sample_size(project.samples[province])
+    sample_size = project.get_sample_summary(province).total()
     quanty = round(sample_size * failure_rate / 100, 1)
     return round(quanty, 2) 
 
+@quantity_rule("Chi phí Quản lý - On-field", reads=("samples", "general.project_type", "general.open_ended_main_count", "general.open_ended_booster_count"))
 def get_chiphi_ql_on_field(project, element, province, title=""):
     quanty = 1
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
 
     if "SUPERVISOR/ ASSISTANT" in title:
         quanty = 1
@@ -123,46 +132,43 @@ def get_chiphi_ql_on_field(project, element, province, title=""):
 
     return quanty
     
+@quantity_rule("Chi phí Quản lý recruit - On-field", reads=("samples",))
 def get_chiphi_ql_recruit_on_field(project, element, province, title=""):
     """
     Chi phi quan ly - on field = 2 + daily_sup_target 
     """
     if "SUPERVISOR/ ASSISTANT" in title:
-        daily_sup_target = calculate_total_daily_sup_target(project.samples.get(province, {}))
+        daily_sup_target = project.get_sample_summary(province).daily_sup_target() if province in project.samples else 0.0
         quanty = round(daily_sup_target, 2) + 2
         return quanty
     if "QC" in title:
-        sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+        sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
         quanty = round((sample_size / 50)) + 1
         return quanty
 
+@quantity_rule("Chi phí Quản lý ngồi bàn - On-field", reads=("samples",))
 def get_chiphi_ql_ngoiban_on_field(project, element, province, title=""):
     """
     Chi phi quan ly ngoi ban - on field = 2 + (sample_size / sample_size_target_per_day)
     """
-    quanty = 0.0
-
-    for key, target_audience in project.samples[province].items():
-        if target_audience.get('sample_type') not in ["Pilot", "Non"]:
-            sample_size = calculate_sample_size(target_audience.get('sample_size', 0), target_audience.get('extra_rate', 0))
-            daily_interview_target = target_audience['target']['daily_interview_target']
-
-            quanty = round(sample_size / daily_interview_target, 2)
-    
+    quanty = project.get_sample_summary(province).interview_days(excluding_items=["Pilot", "Non"])
     return 2 + quanty
 
+@quantity_rule("Chi phí Quản lý IDI", reads=("clt_settings.clt_sample_recruit_idi",))
 def get_chiphi_ql_idi(project, element, province, title=""):
     sample_recruit_idi = project.clt_settings.get('clt_sample_recruit_idi')
     return round(sample_recruit_idi / 15, 2)
 
+@quantity_rule("Chi phí QC - In home", reads=("samples",))
 def get_chiphi_qc_in_home(project, element, province, title=""):
     """
     Formular: Sample * 20%
     """
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     quanty = round(sample_size * 20 / 100, 2)
     return quanty
 
+@quantity_rule("Chi phí QC - In Location")
 def get_chiphi_qc_in_location(project, element, province, title=""):
     """
     Formular: Sample / Daily Interview Target 
@@ -170,8 +176,9 @@ def get_chiphi_qc_in_location(project, element, province, title=""):
 
     return 1
 
+@quantity_rule("Chi phí Coding", reads=("samples", "general.open_ended_main_count", "general.open_ended_booster_count"))
 def get_chiphi_coding(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     number_of_openendeds = project.general.get('open_ended_main_count', 0) + project.general.get('open_ended_booster_count', 0)
     quanty = 0
 
@@ -199,26 +206,30 @@ def get_chiphi_coding(project, element, province, title=""):
 
     return quanty
 
+@quantity_rule("Chi phí Input", reads=("samples",))
 def get_chiphi_input(project, element, province, title=""):
-    quanty = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot"])
+    quanty = project.get_sample_summary(province).total(excluding_items=["Pilot"])
     return quanty
 
+@quantity_rule("Chi phí Quản lý - Hỗ trợ clean data")
 def get_chiphi_hotrocleandata(project, element, province, title=""):
     quanty = 1
     return quanty
 
+@quantity_rule("Chi phí Cước điện thoại cố định", reads=("samples", "general.project_type"))
 def get_chiphi_cuocdienthoaicodinh(project, element, province, title=""):
     project_type = project.general.get("project_type")
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
 
     if project_type == "CATI":
         return sample_size
     else:
         return round(sample_size * 0.75, 2)
 
+@quantity_rule("Chi phí Card điện thoại", reads=("samples", "general.project_type"))
 def get_chiphi_carddienthoai(project, element, province, title=""):
     project_type = project.general.get("project_type")
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     quanty = 0
 
     if project_type == "CLT":
@@ -231,206 +242,146 @@ def get_chiphi_carddienthoai(project, element, province, title=""):
 
     return quanty
 
+@quantity_rule("Photo trắng đen", reads=("samples", "general.bw_page_count"))
 def get_photo_trangden(project, element, province, title=""):
     """
     Formular = sample_size * 130% * Số trang photo trắng đen
     """
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     bw_page_count = project.general.get('bw_page_count', 0)
     quanty = sample_size * 1.3 * bw_page_count
     return quanty
 
+@quantity_rule("Showphoto", reads=("general.showphoto_page_count", "general.clt_provincial_desk_interviewers_count"))
 def get_show_photo(project, element, province, title=""):
     showphoto_page_count = project.general.get("showphoto_page_count", 0)
     clt_provincial_desk_interviewers_count = project.general.get("clt_provincial_desk_interviewers_count", 0)
     quanty = clt_provincial_desk_interviewers_count * showphoto_page_count
     return quanty
 
+@quantity_rule("Showcard", reads=("general.showcard_page_count",))
 def get_show_card(project, element, province, title=""):
     showcard_page_count = project.general.get("showcard_page_count", 0)
     quanty = showcard_page_count
     return quanty
 
+@quantity_rule("Dropcard", reads=("general.dropcard_page_count", "general.clt_provincial_desk_interviewers_count"))
 def get_drop_card(project, element, province, title=""):
     dropcard_page_count = project.general.get("dropcard_page_count", 0)
     clt_provincial_desk_interviewers_count = project.general.get("clt_provincial_desk_interviewers_count", 0)
     quanty = clt_provincial_desk_interviewers_count * dropcard_page_count
     return quanty
 
+@quantity_rule("In màu \\ In concept", reads=("general.color_page_count", "general.clt_provincial_desk_interviewers_count"))
 def get_inmau_inconcept(project, element, province, title=""):
     color_page_count = project.general.get("color_page_count", 0)
     clt_provincial_desk_interviewers_count = project.general.get("clt_provincial_desk_interviewers_count", 0)
     quanty = clt_provincial_desk_interviewers_count * color_page_count
     return quanty
 
+@quantity_rule("Decal", reads=("samples", "general.decal_page_count"))
 def get_decal(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     decal_page_count = project.general.get("decal_page_count", 0)
     quanty = (sample_size / decal_page_count) if decal_page_count > 0 else 0
     return quanty
 
+@quantity_rule("Ép Plastic", reads=("general.laminated_page_count", "general.clt_provincial_desk_interviewers_count"))
 def get_ep_flastic(project, element, province, title=""):
     laminated_page_count = project.general.get('laminated_page_count', 0)
     clt_provincial_desk_interviewers_count = project.general.get("clt_provincial_desk_interviewers_count", 0)
     quanty = clt_provincial_desk_interviewers_count * laminated_page_count
     return quanty
 
+@quantity_rule("Hồ sơ biểu mẫu", reads=("samples",))
 def get_hosobieumau(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     quanty = sample_size
     return quanty
 
+@quantity_rule("Chi phí đóng cuốn", reads=("general.stimulus_material_production_count",))
 def get_chiphidongcuon(project, element, province, title=""):
     stimulus_material_production_count = project.general.get('stimulus_material_production_count', 0)
     quanty = stimulus_material_production_count
     return quanty
 
+@quantity_rule("Chi phí QC - IDI", "Quà Phiếu PV - IDI", reads=("clt_settings.clt_sample_recruit_idi",))
 def get_sample_recruit_idi(project, element, province, title=""):
     return project.clt_settings.get('clt_sample_recruit_idi', 0)
 
+@quantity_rule("Chi phí Assistant - Set up", reads=("clt_settings.clt_assistant_setup_days",))
 def get_chiphi_assistant_set_up(project, element, province, title=""):
     return project.clt_settings.get('clt_assistant_setup_days', 1)
 
+@quantity_rule("Chi phí Assistant - On-field", reads=("samples",))
 def get_chiphi_assistant_on_field(project, element, province, title=""):
     """
     Chi phí Assistant - On-field = round(sample_size / daily_interview_target, 2)
     """
-    quanty = 0.0
-
-    for key, target_audience in project.samples[province].items():
-        if target_audience.get('sample_type') not in ["Pilot", "Non"]:
-            sample_size = calculate_sample_size(target_audience.get('sample_size', 0), target_audience.get('extra_rate', 0))
-            daily_interview_target = target_audience['target']['daily_interview_target']
-
-            quanty = round(sample_size / daily_interview_target, 2)
-    
+    quanty = project.get_sample_summary(province).interview_days(excluding_items=["Pilot", "Non"])
     return quanty
 
+@quantity_rule(OTHER_DEFAULT_RULE)
 def get_other_default(project, element, province, title=""):
     return 1
 
+@quantity_rule("Tiền vận chuyển")
 def get_tienvanchuyen(project, element, province, title=""):
     return 2
 
+@quantity_rule("Tiền thuê location", reads=("samples", "clt_settings.clt_sample_size_per_day"))
 def get_tienthue_location(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     clt_sample_size_per_day = project.clt_settings.get('clt_sample_size_per_day', 0)
     quanty = round(sample_size / clt_sample_size_per_day, 2)
     return quanty
 
+@quantity_rule("Tiền thuê tủ lạnh, …", reads=("samples", "clt_settings.clt_sample_size_per_day"))
 def get_tienthue_tulanh(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     clt_sample_size_per_day = project.clt_settings.get('clt_sample_size_per_day', 0)
     quanty = round(sample_size / clt_sample_size_per_day, 2)
     return quanty
 
+@quantity_rule("Tiền thuê TV", reads=("samples", "clt_settings.clt_sample_size_per_day"))
 def get_tienthue_tivi(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     clt_sample_size_per_day = project.clt_settings.get('clt_sample_size_per_day', 0)
     quanty = round(sample_size / clt_sample_size_per_day, 2)
     return quanty
 
+@quantity_rule("Tiền thuê partition", reads=("samples", "clt_settings.clt_sample_size_per_day"))
 def get_tienthue_partition(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     clt_sample_size_per_day = project.clt_settings.get('clt_sample_size_per_day', 0)
     quanty = round(sample_size / clt_sample_size_per_day, 2)
     return quanty
 
+@quantity_rule("Tiền set-up location")
 def get_tien_setup_location(project, element, province, title=""):
     return 2
 
+@quantity_rule("Tiền nước uống, khăn giấy, bánh lạt,…", reads=("samples",))
 def get_tien_nuocuong_khangiay_banhlat(project, element, province, title=""):
-    sample_size = calculate_total_of_sample_size(project.samples[province], excluding_items=["Pilot", "Non"])
+    sample_size = project.get_sample_summary(province).total(excluding_items=["Pilot", "Non"])
     return sample_size
 
-QUANTY_MAPPINGS = {
-    "default" : get_default_quanty,
-    "Chi phí thuê tablet < 9 inch" : get_chiphithue_thietbi,
-    "Chi phí thuê tablet >= 9 inch" : get_chiphithue_thietbi,
-    "Chi phí thuê laptop" : get_chiphithue_thietbi,
-
-    "Chi phí gửi xe" : get_quanty_parking_fee,
-    "Chi phí Phiếu PV - Bài rớt giữa chừng" : get_failure_rate,
-    "Chi phí Tuyển đáp viên IDI" : get_chiphi_tuyendapvien_idi,
-    #--SUPERVISOR / ASSISTANT
-    "Chi phí Quản lý - On-field" : get_chiphi_ql_on_field,
-    "Chi phí Quản lý recruit - On-field" : get_chiphi_ql_recruit_on_field,
-    "Chi phí Quản lý ngồi bàn - On-field" : get_chiphi_ql_ngoiban_on_field,
-    "Chi phí Quản lý IDI" : get_chiphi_ql_idi,
-
-    "Chi phí Assistant - Set up" : get_chiphi_assistant_set_up,
-    "Chi phí Assistant - On-field" : get_chiphi_assistant_on_field,
-
-    #--QC
-    "Chi phí QC - In home" : get_chiphi_qc_in_home,
-    "Chi phí QC - In Location" : get_chiphi_qc_in_location,
-    "Chi phí QC - IDI" : get_sample_recruit_idi,
-
-    #--DP
-    "Chi phí Coding" : get_chiphi_coding,
-    "Chi phí Input" : get_chiphi_input,
-    "Chi phí Quản lý - Hỗ trợ clean data" : get_chiphi_hotrocleandata,
-
-    #--INCENTIVE
-    "Quà Phiếu PV - Pilot": get_quaphieu_phongvan,
-    "Quà Phiếu PV - Main": get_quaphieu_phongvan,
-    "Quà Phiếu PV - Booster": get_quaphieu_phongvan,
-    "Quà Phiếu PV - Non": get_quaphieu_phongvan,
-    "Quà Phiếu PV - IDI" : get_sample_recruit_idi,
-    
-    #--COMMUNICATION
-    "Chi phí Cước điện thoại cố định" : get_chiphi_cuocdienthoaicodinh,
-    "Chi phí Card điện thoại" : get_chiphi_carddienthoai,
-
-    #--STATIONARY
-    "Photo trắng đen" : get_photo_trangden,
-    "Showphoto" : get_show_photo,
-    "Showcard" : get_show_card,
-    "Dropcard" : get_drop_card,
-    "In màu \ In concept" : get_inmau_inconcept,
-    "Decal" : get_decal,
-    "Ép Plastic" : get_ep_flastic,
-    "Hồ sơ biểu mẫu" : get_hosobieumau,
-    "Chi phí đóng cuốn" : get_chiphidongcuon,
-
-    #--OTHER
-    "other_default" : get_other_default,
-    "Tiền vận chuyển" : get_tienvanchuyen,
-    "Tiền thuê location" : get_tienthue_location, 
-    "Tiền thuê tủ lạnh, …" : get_tienthue_tulanh,
-    "Tiền thuê TV" : get_tienthue_tivi, 
-    "Tiền thuê partition" : get_tienthue_partition,
-    "Tiền set-up location" : get_tien_setup_location,
-    "Tiền nước uống, khăn giấy, bánh lạt,…" : get_tien_nuocuong_khangiay_banhlat
-}
+def resolve_quanty_rule(description, title=""):
+    return QUANTITY_RULES.resolve(description, fallback=OTHER_DEFAULT_RULE if title == "OTHER" else DEFAULT_RULE)
 
 def map_quanty_for_element(project, element, province, title=""):
     description = element.get('description', "")
-
-    for key, func in QUANTY_MAPPINGS.items():
-        if key == description:
-            return func(project, element, province, title=title)
-    
-    if title == "OTHER":
-        return QUANTY_MAPPINGS["other_default"](project, element, province)
-    else:
-        return QUANTY_MAPPINGS["default"](project, element, province)
+    return resolve_quanty_rule(description, title)(project, element, province, title=title)
 
 ###-------- QUANTY BY PRICING ---------------
 
+@price_quantity_rule(DEFAULT_RULE, "Chi phí Phiếu PV - Recruit", "Chi phí Phiếu PV - In Location", reads=("samples",))
 def get_sample_size_by_province(project, price, province, target_audience):
     return calculate_sample_size(target_audience.get('sample_size', 0), target_audience.get('extra_rate', 0))
 
-QUANTY_BY_PRICING_MAPPINGS = {
-    "default" : get_sample_size_by_province, 
-    "Chi phí Phiếu PV - Recruit" : get_sample_size_by_province,
-    "Chi phí Phiếu PV - In Location" : get_sample_size_by_province
-}
-         
-def map_quanty_for_price(project, price, province, target_audience):
+def resolve_price_quanty_rule(price):
     description = get_chi_phi_phieu_pv_title(price.get('type', "").lower())
+    return PRICE_QUANTITY_RULES.resolve(description)
 
-    for key, func in QUANTY_BY_PRICING_MAPPINGS.items():
-        if key == description:
-            return func(project, price, province, target_audience)
-    return QUANTY_BY_PRICING_MAPPINGS["default"](project, price, province, target_audience)
+def map_quanty_for_price(project, price, province, target_audience):
+    return resolve_price_quanty_rule(price)(project, price, province, target_audience)
\ No newline at end of file
@@ -0,0 +1,282 @@
+# models/rate_card_index.py
+# -*- coding: utf-8 -*-
+"""
+Lookup index over config/rate_card_settings.json.
+
+A rate card is chosen by the audience's incident rate, which selects the level
+(the levels split 0-100 into equal bands, the first level holding the highest
+rates), and by the project's interview length, which selects the card of that
+level whose interview_length_range contains it. The index precomputes the level
+of every integer incident rate, keeps the cards of each level sorted for a
+bisect over their lengths, and memoizes the pricing/target entries built from
+a card so ProjectModel.update_samples_structure does not rescan the settings
+for every audience on every edit.
+"""
+
+import json
+import logging
+from bisect import bisect_right
+
+_INDEX_CACHE = {}
+
+logger = logging.getLogger(__name__)
+
+def make_price_entry(price, price_growth, type):
+    return {
+        "price": price,
+        "price_growth": price_growth,
+        "type": type,
+        "comment": {}
+    }
+
+def make_pricing_entry(sample_type, pricing):
+    """
+    Build the price entries of a sample type from a pricing block of the settings.
+
+    Args:
+        sample_type (str): "Pilot", "None", "Main" or "Booster"
+        pricing (dict): Pricing block of a rate card or an industry audience
+
+    Returns:
+        list: Price entries as stored in audience["pricing"]
+    """
+    if sample_type == 'Pilot':
+        return [make_price_entry(pricing.get('pilot'), 0, 'pilot')]
+    elif sample_type == 'None':
+        return [make_price_entry(pricing.get('non'), 0, 'non')]
+    elif sample_type == 'Main':
+        return [
+            make_price_entry(pricing.get('main', {}).get('recruit'), 0, 'recruit'),
+            make_price_entry(pricing.get('main', {}).get('location'), 0, 'location')
+        ]
+    elif sample_type == 'Booster':
+        return [
+            make_price_entry(pricing.get('main', {}).get('booster'), 0, 'recruit'),
+            make_price_entry(pricing.get('main', {}).get('booster'), 0, 'location')
+        ]
+    else:
+        raise ValueError(f"[RateCard Error] Sample type {sample_type} isn't defined in rate card settings.")
+
+def make_target_entry(objectives_classification, rate_card):
+    return {
+        "objectives_classification": objectives_classification,
+        "daily_interview_target": rate_card.get('daily_interview_target'),
+        "target_for_interviewer": rate_card.get('target_for_interviewer'),
+        "interviewers_per_supervisor": rate_card.get('interviewers_per_supervisor'),
+    }
+
+def level_for_incident_rate(levels, incident_rate):
+    """
+    Level of an incident rate when the levels split 0-100 into equal bands.
+
+    Args:
+        levels (list): Level names, highest incident rates first
+        incident_rate (int | float): The audience's incident rate
+
+    Returns:
+        str: The level name, "L1" when the rate falls in no band
+    """
+    interval = 100 / len(levels)
+
+    start_interval = 100
+    end_interval = 100 - interval
+
+    for level in levels:
+        if start_interval >= incident_rate >= end_interval:
+            return level
+
+        start_interval = end_interval
+        end_interval -= interval
+
+    return "L1"
+
+def _copy_pricing(pricing):
+    return [dict(entry, comment=dict(entry["comment"])) for entry in pricing]
+
+class LevelCards:
+    """Rate cards of one level sorted by the start of their interview length range."""
+
+    __slots__ = ("level", "starts", "cards", "overlapping")
+
+    def __init__(self, level, rate_cards):
+        ordered = sorted(rate_cards, key=lambda rate_card: rate_card['interview_length_range'][0])
+
+        self.level = level
+        self.cards = [
+            (rate_card['interview_length_range'][0], rate_card['interview_length_range'][1], rate_card)
+            for rate_card in ordered
+        ]
+        self.starts = [min_len for min_len, _, _ in self.cards]
+        # Overlapping ranges keep the first match in settings order, as a linear scan would
+        self.overlapping = any(
+            next_min <= max_len for (_, max_len, _), (next_min, _, _) in zip(self.cards, self.cards[1:])
+        )
+        if self.overlapping:
+            self.cards = [
+                (rate_card['interview_length_range'][0], rate_card['interview_length_range'][1], rate_card)
+                for rate_card in rate_cards
+            ]
+
+    def find(self, interview_length):
+        """
+        Get the card whose range contains an interview length.
+
+        Returns:
+            tuple: (min_len, max_len, rate_card), or None
+        """
+        if self.overlapping:
+            for card in self.cards:
+                if card[0] <= interview_length <= card[1]:
+                    return card
+            return None
+
+        position = bisect_right(self.starts, interview_length) - 1
+
+        if position >= 0:
+            card = self.cards[position]
+            if interview_length <= card[1]:
+                return card
+        return None
+
+class RateCardIndex:
+    """Level table, sorted cards and memoized entries of the rate card settings."""
+
+    def __init__(self, settings):
+        """
+        Args:
+            settings (dict): {project_type: {level: [rate_card]}} as in rate_card_settings.json
+        """
+        self.settings = settings
+        self._level_tables = {}
+        self._levels = {}
+        self._cards = {}
+        self._entries = {}
+
+        for project_type, levels in settings.items():
+            level_names = list(levels.keys())
+
+            self._levels[project_type] = level_names
+            self._level_tables[project_type] = tuple(
+                level_for_incident_rate(level_names, incident_rate) for incident_rate in range(101)
+            )
+            self._cards[project_type] = {
+                level: LevelCards(level, rate_cards) for level, rate_cards in levels.items() if rate_cards
+            }
+
+    def level(self, project_type, incident_rate):
+        """
+        Get the level of an incident rate.
+
+        Args:
+            project_type (str): Project type of the settings
+            incident_rate (int | float): The audience's incident rate
+
+        Returns:
+            str: The level name
+        """
+        if project_type not in self._levels:
+            raise ValueError(f"[RateCard Error] Project type {project_type} isn't defined in rate card settings.")
+
+        if type(incident_rate) is int and 0 <= incident_rate <= 100:
+            return self._level_tables[project_type][incident_rate]
+        return level_for_incident_rate(self._levels[project_type], incident_rate)
+
+    def find(self, project_type, interview_length, incident_rate):
+        """
+        Get the rate card for an interview length and incident rate.
+
+        Args:
+            project_type (str): Project type of the settings
+            interview_length (int): Interview length in minutes
+            incident_rate (int | float): The audience's incident rate
+
+        Returns:
+            tuple: (objectives_classification, rate_card)
+        """
+        current_level = self.level(project_type, incident_rate)
+        level_cards = self._cards[project_type].get(current_level)
+
+        if level_cards is None:
+            raise ValueError(f"[RateCard Error] No rate cards found for level {current_level} in project type {project_type}.")
+
+        card = level_cards.find(interview_length)
+
+        if card is None:
+            raise ValueError(
+                f"[RateCard Error] No rate card found for interview_length = {interview_length} "
+                f"in project_type '{project_type}', level {current_level}."
+            )
+
+        min_len, max_len, rate_card = card
+        return f"{current_level} ({min_len} - {max_len} minutes)", rate_card
+
+    def entries(self, project_type, sample_type, interview_length, incident_rate):
+        """
+        Get the pricing and target entries of an audience from its rate card.
+
+        Args:
+            project_type (str): Project type of the settings
+            sample_type (str): The audience's sample type
+            interview_length (int): Interview length in minutes
+            incident_rate (int | float): The audience's incident rate
+
+        Returns:
+            tuple: (pricing, target), fresh copies the caller may modify
+        """
+        key = (project_type, sample_type, interview_length, incident_rate)
+        cached = self._entries.get(key)
+
+        if cached is None:
+            objectives_classification, rate_card = self.find(project_type, interview_length, incident_rate)
+
+            cached = (
+                make_pricing_entry(sample_type, rate_card.get('pricing', {})),
+                make_target_entry(objectives_classification, rate_card)
+            )
+            self._entries[key] = cached
+
+        pricing, target = cached
+        return _copy_pricing(pricing), dict(target)
+
+    def target(self, project_type, interview_length, incident_rate):
+        """
+        Get the target entry of an audience from its rate card.
+
+        Returns:
+            dict: The target entry, a fresh copy
+        """
+        key = (project_type, None, interview_length, incident_rate)
+        cached = self._entries.get(key)
+
+        if cached is None:
+            objectives_classification, rate_card = self.find(project_type, interview_length, incident_rate)
+
+            cached = (None, make_target_entry(objectives_classification, rate_card))
+            self._entries[key] = cached
+
+        return dict(cached[1])
+
+def get_rate_card_index(json_path):
+    """
+    Get the index of a rate card settings file, loading it on first use.
+
+    Args:
+        json_path (str): Path of rate_card_settings.json
+
+    Returns:
+        RateCardIndex: The cached index
+    """
+    index = _INDEX_CACHE.get(json_path)
+
+    if index is None:
+        with open(json_path, mode='r', encoding="utf-8") as f:
+            index = RateCardIndex(json.load(f))
+
+        _INDEX_CACHE[json_path] = index
+        logger.info(f"Indexed rate card settings from {json_path}")
+
+    return index
+
+def clear_rate_card_index_cache():
+    """Drop the cached indexes, e.g. after the settings file was edited."""
+    _INDEX_CACHE.clear()
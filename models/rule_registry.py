@@ -0,0 +1,153 @@
+# models/rule_registry.py
+# -*- coding: utf-8 -*-
+"""
+Registry of the quantity and cost rules used by the hierarchical cost calculation.
+
+Rules register themselves with a decorator and the cost element descriptions they
+handle, e.g. @quantity_rule("Chi phí Coding", reads=("samples", "general.coding")).
+Descriptions are normalized once so lookups are plain dict hits, and every rule
+declares the model fields it reads so the engine can tell which rows an edit affects.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from utils.profiler import PROFILER
+
+DEFAULT_RULE = "default"
+OTHER_DEFAULT_RULE = "other_default"
+
+# Model sections a rule can read from. "samples" is scoped to the province being priced.
+RULE_SOURCES = ("samples", "general", "clt_settings", "hut_settings", "settings")
+
+@lru_cache(maxsize=4096)
+def normalize_rule_key(text):
+    """Normalize an element description for rule lookup (unicode form, spacing and case)."""
+    text = unicodedata.normalize("NFC", str(text or ""))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+class Rule:
+    """A registered rule: the handler plus the model fields it reads."""
+
+    __slots__ = ("name", "func", "reads", "registry", "_timed")
+
+    def __init__(self, name, func, reads, registry):
+        self.name = name
+        self.func = func
+        self.reads = tuple(reads)
+        self.registry = registry
+        self._timed = None
+
+    def __call__(self, *args, **kwargs):
+        return self.handler()(*args, **kwargs)
+
+    @property
+    def profile_name(self):
+        """Name the rule's calls are recorded under by the profiler."""
+        return f"rule.{self.registry}.{self.func.__name__}"
+
+    def handler(self):
+        """
+        Get the function to call for this rule.
+
+        Returns:
+            callable: The rule function, wrapped with a timer while profiling is enabled
+        """
+        if not PROFILER.enabled:
+            return self.func
+
+        if self._timed is None:
+            self._timed = PROFILER.timed(self.profile_name, self.func)
+        return self._timed
+
+    def __repr__(self):
+        return f"Rule({self.registry}:{self.name} -> {self.func.__name__})"
+
+    def reads_field(self, field):
+        """
+        Check whether a changed model field is an input of this rule.
+
+        Args:
+            field (str): Dotted field path such as "general.bw_page_count",
+                or a whole section such as "samples"
+
+        Returns:
+            bool: True if the rule reads the field
+        """
+        for read in self.reads:
+            if read == field or read.startswith(field + ".") or field.startswith(read + "."):
+                return True
+        return False
+
+class RuleRegistry:
+    """Rules of one kind keyed by normalized element description."""
+
+    def __init__(self, name):
+        self.name = name
+        self._rules = {}
+
+    def register(self, *names, reads=()):
+        """
+        Decorator registering a function under one or more element descriptions.
+
+        Args:
+            *names (str): Element descriptions handled by the function
+            reads (tuple): Model fields read by the function
+
+        Returns:
+            callable: Decorator returning the function unchanged
+        """
+        for read in reads:
+            if read.split(".", 1)[0] not in RULE_SOURCES:
+                raise ValueError(f"[Rule Error] Unknown model field '{read}' declared by {self.name} rule.")
+
+        def decorator(func):
+            for name in names:
+                key = normalize_rule_key(name)
+
+                if key in self._rules:
+                    raise ValueError(f"[Rule Error] {self.name} rule '{name}' is already registered.")
+
+                self._rules[key] = Rule(name, func, reads, self.name)
+            return func
+
+        return decorator
+
+    def get(self, description):
+        """Get the rule registered for a description, or None."""
+        return self._rules.get(normalize_rule_key(description))
+
+    def resolve(self, description, fallback=DEFAULT_RULE):
+        """Get the rule for a description, falling back to the given default rule."""
+        rule = self._rules.get(normalize_rule_key(description))
+
+        if rule is None:
+            rule = self._rules[normalize_rule_key(fallback)]
+        return rule
+
+    def rules(self):
+        """All registered rules in registration order."""
+        return list(self._rules.values())
+
+    def __contains__(self, description):
+        return normalize_rule_key(description) in self._rules
+
+    def __len__(self):
+        return len(self._rules)
+
+QUANTITY_RULES = RuleRegistry("quantity")
+PRICE_QUANTITY_RULES = RuleRegistry("price_quantity")
+COST_RULES = RuleRegistry("cost")
+
+def quantity_rule(*names, reads=()):
+    """Register a quantity rule: func(project, element, province, title="")."""
+    return QUANTITY_RULES.register(*names, reads=reads)
+
+def price_quantity_rule(*names, reads=()):
+    """Register a quantity rule for rate-card pricing rows: func(project, price, province, target_audience)."""
+    return PRICE_QUANTITY_RULES.register(*names, reads=reads)
+
+def cost_rule(*names, reads=()):
+    """Register a unit cost rule: func(project, element)."""
+    return COST_RULES.register(*names, reads=reads)
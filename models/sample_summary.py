@@ -0,0 +1,99 @@
+# models/sample_summary.py
+# -*- coding: utf-8 -*-
+"""
+Per-province aggregates of the sample structure.
+
+Quantity rules ask the same questions about a province over and over (total sample
+size without Pilot/Non, daily SUP target, ...). ProvinceSampleSummary answers them
+from totals computed once; ProjectModel keeps one summary per province and drops it
+when update_sample or update_samples_structure changes the province's samples.
+"""
+
+from formulars.pricing_formulas import calculate_sample_size
+
+class ProvinceSampleSummary:
+    """Sample totals of one province, grouped by sample type."""
+
+    def __init__(self, target_audience_data):
+        """
+        Args:
+            target_audience_data (dict): project.samples[province]
+        """
+        self.target_audience_data = target_audience_data
+
+        # {sample_type: total sample size including the extra rate}
+        self.by_type = {}
+        # {sample_type: total sample size as entered}
+        self.by_type_without_extra = {}
+
+        for target_audience in target_audience_data.values():
+            sample_type = target_audience.get('sample_type')
+            sample_size = target_audience.get('sample_size', 0)
+
+            self.by_type[sample_type] = self.by_type.get(sample_type, 0) + calculate_sample_size(sample_size, target_audience.get('extra_rate', 0))
+            self.by_type_without_extra[sample_type] = self.by_type_without_extra.get(sample_type, 0) + sample_size
+
+        self._totals = {}
+        self._daily_sup_target = None
+        self._interview_days = {}
+
+    def total(self, excluding_items=()):
+        """
+        Total sample size including the extra rate.
+
+        Args:
+            excluding_items (list): Sample types left out of the total
+
+        Returns:
+            float: Same value as calculate_total_of_sample_size(samples, excluding_items)
+        """
+        key = tuple(excluding_items)
+
+        if key not in self._totals:
+            self._totals[key] = sum(size for sample_type, size in self.by_type.items() if sample_type not in key)
+
+        return self._totals[key]
+
+    def total_without_extra(self, excluding_items=()):
+        """Total sample size as entered, without the extra rate."""
+        return sum(size for sample_type, size in self.by_type_without_extra.items() if sample_type not in excluding_items)
+
+    def total_by_type(self, sample_type):
+        """Sample size including the extra rate of a single sample type."""
+        return self.by_type.get(sample_type, 0)
+
+    def daily_sup_target(self):
+        """Sum of the daily SUP targets of Main and Booster audiences, rounded to 2 decimals."""
+        if self._daily_sup_target is None:
+            total = 0.0
+
+            for target_audience in self.target_audience_data.values():
+                if target_audience.get('sample_type', '') in ["Main", "Booster"]:
+                    total += target_audience['target']['daily_sup_target']
+
+            self._daily_sup_target = round(total, 2)
+
+        return self._daily_sup_target
+
+    def interview_days(self, excluding_items=("Pilot", "Non")):
+        """
+        Days needed to reach the daily interview target.
+
+        As in the on-field management rules, the value comes from the last audience
+        that is not excluded: round(sample_size / daily_interview_target, 2).
+        """
+        key = tuple(excluding_items)
+
+        if key not in self._interview_days:
+            days = 0.0
+
+            for target_audience in self.target_audience_data.values():
+                if target_audience.get('sample_type') not in key:
+                    sample_size = calculate_sample_size(target_audience.get('sample_size', 0), target_audience.get('extra_rate', 0))
+                    daily_interview_target = target_audience['target']['daily_interview_target']
+
+                    days = round(sample_size / daily_interview_target, 2)
+
+            self._interview_days[key] = days
+
+        return self._interview_days[key]
@@ -0,0 +1,271 @@
+# models/scenario_sweep.py
+# -*- coding: utf-8 -*-
+"""
+Parameter sweep over a project.
+
+A sweep takes a project and a grid of parameter overrides, e.g.
+
+    run_sweep(project_model, {"interview_length": [15, 30, 45], "sample_size": [100, 200]})
+
+and prices every combination. Each scenario is the saved project with the overrides
+applied the way the Samples/General tabs would apply them: interview length and
+incident rate re-select the rate card of every audience, sample size refreshes the
+daily SUP target. Scenarios are priced in worker processes that load the project
+once and reuse the compiled cost plan of its type, and the totals come back as a
+DataFrame with one row per scenario.
+"""
+
+import os
+import re
+import copy
+import math
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from formulars.pricing_formulas import calculate_daily_sup_target
+
+logger = logging.getLogger(__name__)
+
+# Audience-level parameters, applied to every target audience of the project
+AUDIENCE_PARAMETERS = ("incident_rate", "sample_size", "extra_rate")
+
+# Parameters understood without a section prefix
+SWEEP_PARAMETERS = ("interview_length",) + AUDIENCE_PARAMETERS
+
+# Sections that accept "section.field" overrides
+OVERRIDE_SECTIONS = ("general", "clt_settings", "hut_settings", "settings")
+
+# Parameters that change which rate card an audience is priced with
+RATE_CARD_PARAMETERS = ("interview_length", "incident_rate")
+
+# Smaller sweeps are priced in-process, starting workers would take longer
+PARALLEL_THRESHOLD = 32
+
+RESULT_COLUMNS = ["total_cost", "status", "error"]
+
+# "start-stop" or "start-stop:step"
+_RANGE_PATTERN = re.compile(r"^(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)(?:\s*:\s*(\d+(?:\.\d+)?))?$")
+
+_worker_project_data = None
+_worker_project_model = None
+
+def parse_sweep_values(text):
+    """
+    Parse the values of one sweep parameter.
+
+    Args:
+        text (str): Comma separated values and ranges, e.g. "10, 20, 30" or "10-40:10"
+            (start-stop:step, both ends included; the step defaults to 1)
+
+    Returns:
+        list: The values as int where possible, otherwise float
+    """
+    values = []
+
+    for part in str(text).split(","):
+        part = part.strip()
+
+        if not part:
+            continue
+
+        match = _RANGE_PATTERN.match(part)
+
+        if match:
+            start, stop = _to_number(match.group(1)), _to_number(match.group(2))
+            step = _to_number(match.group(3)) if match.group(3) else 1
+
+            if step <= 0:
+                raise ValueError(f"[Sweep Error] Step must be positive in '{part}'.")
+
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            values.extend(_to_number(start + i * step) for i in range(max(count, 0)))
+        else:
+            values.append(_to_number(part))
+
+    return values
+
+def _to_number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+def expand_grid(grid):
+    """
+    All combinations of a parameter grid.
+
+    Args:
+        grid (dict): {parameter: [values]}
+
+    Returns:
+        list: One {parameter: value} dict per scenario, the last parameter varying fastest
+    """
+    for parameter in grid:
+        _check_parameter(parameter)
+
+    names = list(grid.keys())
+
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def _check_parameter(parameter):
+    section, _, field = parameter.partition(".")
+
+    if parameter in SWEEP_PARAMETERS or (field and section in OVERRIDE_SECTIONS):
+        return
+
+    raise ValueError(f"[Sweep Error] Unknown sweep parameter '{parameter}'.")
+
+def apply_overrides(project_model, overrides):
+    """
+    Apply the overrides of one scenario to a loaded project.
+
+    Args:
+        project_model (ProjectModel): Project to change in place
+        overrides (dict): {parameter: value}
+    """
+    audiences = list(project_model.general.get("target_audiences", []))
+
+    for target_audiences in project_model.samples.values():
+        audiences.extend(target_audiences.values())
+
+    for parameter, value in overrides.items():
+        _check_parameter(parameter)
+
+        if parameter == "interview_length":
+            project_model.general["interview_length"] = value
+        elif parameter in AUDIENCE_PARAMETERS:
+            for audience in audiences:
+                audience[parameter] = value
+        else:
+            section, _, field = parameter.partition(".")
+            getattr(project_model, section)[field] = value
+
+    reprice = any(parameter in overrides for parameter in RATE_CARD_PARAMETERS)
+
+    for audience in audiences:
+        if reprice:
+            _reprice_audience(project_model, audience)
+
+        if not reprice and "sample_size" not in overrides:
+            continue
+
+        target = audience.get("target", {})
+        target["daily_sup_target"] = calculate_daily_sup_target(
+            audience.get("sample_size", 0),
+            target.get("target_for_interviewer", 0),
+            target.get("interviewers_per_supervisor", 0)
+        )
+
+    project_model.invalidate_sample_summaries()
+    project_model.cost_engine.invalidate_all()
+
+def _reprice_audience(project_model, audience):
+    """Re-select the rate card of an audience, keeping the price growths entered by type."""
+    fresh = project_model.get_audience(audience)
+    previous = {price.get("type"): price for price in audience.get("pricing", [])}
+
+    for price in fresh["pricing"]:
+        if price.get("type") in previous:
+            price["price_growth"] = previous[price["type"]].get("price_growth", 0)
+            price["comment"] = previous[price["type"]].get("comment", {})
+
+    audience["pricing"] = fresh["pricing"]
+    audience.setdefault("target", {}).update(fresh["target"])
+
+def evaluate_scenario(project_data, overrides, project_model=None):
+    """
+    Price one scenario.
+
+    Args:
+        project_data (dict): Saved project, as returned by ProjectModel.to_dict
+        overrides (dict): {parameter: value}
+        project_model (ProjectModel, optional): Model to load the scenario into,
+            reused between scenarios of the same worker
+
+    Returns:
+        dict: The overrides with total_cost, status ("ok" or "failed") and error
+    """
+    if project_model is None:
+        from models.project_model import ProjectModel
+        project_model = ProjectModel()
+
+    result = dict(overrides)
+    result.update({"total_cost": None, "status": "ok", "error": ""})
+
+    try:
+        project_model.from_dict(copy.deepcopy(project_data))
+        apply_overrides(project_model, overrides)
+        result["total_cost"] = project_model.get_total_cost()
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    return result
+
+def _scenario_model(project):
+    """
+    Model the scenarios of an in-process sweep are loaded into.
+
+    Args:
+        project (ProjectModel | dict): The project passed to run_sweep
+
+    Returns:
+        ProjectModel: A new model; it shares the element costs of a ProjectModel
+            project, so no database connection or hierarchy provider is set up
+    """
+    from models.project_model import ProjectModel
+
+    if isinstance(project, dict):
+        return ProjectModel()
+
+    return ProjectModel(element_costs=project.element_costs)
+
+def _init_worker(project_data):
+    """Initializer of the ProcessPoolExecutor workers: one model per worker process."""
+    global _worker_project_data, _worker_project_model
+
+    from models.project_model import ProjectModel
+
+    _worker_project_data = project_data
+    _worker_project_model = ProjectModel()
+
+def _evaluate_chunk(scenarios):
+    return [evaluate_scenario(_worker_project_data, overrides, _worker_project_model) for overrides in scenarios]
+
+def run_sweep(project, grid, jobs=None):
+    """
+    Price every combination of a parameter grid.
+
+    Args:
+        project (ProjectModel | dict): The project, or its to_dict() data
+        grid (dict): {parameter: [values]} where parameter is one of SWEEP_PARAMETERS
+            or a "section.field" path such as "clt_settings.clt_failure_rate"
+        jobs (int, optional): Number of worker processes, defaults to the CPU count;
+            1 prices in the calling process
+
+    Returns:
+        pandas.DataFrame: One row per scenario with the parameter values, total_cost,
+            status and error, in expand_grid() order
+    """
+    project_data = project if isinstance(project, dict) else project.to_dict()
+    project_data = copy.deepcopy(project_data)
+
+    scenarios = expand_grid(grid)
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs <= 1 or len(scenarios) < PARALLEL_THRESHOLD:
+        project_model = _scenario_model(project)
+        results = [evaluate_scenario(project_data, overrides, project_model) for overrides in scenarios]
+    else:
+        chunk_size = max(1, math.ceil(len(scenarios) / (jobs * 4)))
+        chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(project_data,)) as executor:
+            results = [result for chunk in executor.map(_evaluate_chunk, chunks) for result in chunk]
+
+    failures = sum(1 for result in results if result["status"] != "ok")
+    if failures:
+        logger.warning(f"{failures} of {len(results)} sweep scenarios failed")
+
+    return pd.DataFrame(results, columns=list(grid.keys()) + RESULT_COLUMNS)
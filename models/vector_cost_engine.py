@@ -0,0 +1,336 @@
+# models/vector_cost_engine.py
+# -*- coding: utf-8 -*-
+"""
+Vectorized mode of the cost engine.
+
+CostEngine multiplies cost by quantity one row at a time. VectorCostEngine splits
+the calculation into passes over the whole project instead:
+
+1. the unit cost of every enabled plan element is computed once into a vector (cost
+   rules do not depend on the province) and the quantity rules fill a dense
+   elements x provinces matrix, calling rules that do not read the samples once
+   per element; rate-card prices, price growths and quantities are collected into
+   flat arrays;
+2. totals, price-growth adjustments (price * abs(1 + price_growth / 100)), leaf
+   subtotals and province totals are NumPy array operations;
+3. the rows are assembled in the same order and with the same values as
+   ProjectModel.flatten_cost_hierarchy.
+
+Quantity rules reading the samples are still called once per cell; the savings
+come from the shared rules, the arithmetic and the aggregation.
+"""
+
+import logging
+
+import numpy as np
+
+from models.cost_plan import get_cost_plan
+from models.cost_engine import CostEngine, SAMPLE_TYPE_ORDER, get_comment, toggle_index, is_element_enabled
+from models.quanty_mappings import map_quanty_for_price, get_chi_phi_phieu_pv_title
+
+# Values priced with array arithmetic. Anything else (None, strings, Decimal, ...) is
+# multiplied one cell at a time, exactly as the row-by-row engine does.
+NUMBER_TYPES = frozenset((int, float, bool))
+INTEGER_TYPES = frozenset((int, bool))
+
+# Row columns, see ProjectModel.flatten_cost_hierarchy
+COST_COLUMN = 6
+TOTAL_COLUMN = 8
+
+def _cell(value):
+    """Row value as written by the row-by-row engine: falsy values become 0."""
+    return 0 if not value or value == 0 else value
+
+def find_row_mismatches(expected, actual):
+    """
+    Compare rows cell by cell; cells must be equal and of the same type.
+
+    Args:
+        expected (list): Rows of the row-by-row engine
+        actual (list): Rows of the vectorized engine
+
+    Returns:
+        list: (row index, expected row, actual row) of the rows that differ, a
+            missing row being None
+    """
+    mismatches = []
+
+    for index in range(max(len(expected), len(actual))):
+        expected_row = expected[index] if index < len(expected) else None
+        actual_row = actual[index] if index < len(actual) else None
+
+        if (
+            expected_row is None or actual_row is None
+            or len(expected_row) != len(actual_row)
+            or any(
+                type(a) is not type(b) or a != b
+                for a, b in zip(expected_row, actual_row)
+            )
+        ):
+            mismatches.append((index, expected_row, actual_row))
+
+    return mismatches
+
+def verify_rows(project, plan=None):
+    """
+    Price a project with both engines and compare their rows.
+
+    Args:
+        project (ProjectModel): The project to price
+        plan (CostPlan, optional): Fixed plan to use instead of the cached plan
+            of the project's type
+
+    Returns:
+        list: The mismatches, see find_row_mismatches; empty when the rows are identical
+    """
+    return find_row_mismatches(CostEngine(project, plan=plan).rows(), VectorCostEngine(project, plan=plan).rows())
+
+class VectorCostResult:
+    """Rows and aggregates of one vectorized calculation."""
+
+    def __init__(self, rows, subtotals, province_totals, total_cost):
+        """
+        Args:
+            rows (list): Flat cost rows, identical to flatten_cost_hierarchy
+            subtotals (dict): {leaf title: total cost}, in hierarchy order
+            province_totals (dict): {province: total cost}
+            total_cost (float): Total cost of the project
+        """
+        self.rows = rows
+        self.subtotals = subtotals
+        self.province_totals = province_totals
+        self.total_cost = total_cost
+
+class VectorCostEngine:
+    """Calculator of the flat cost rows using NumPy arrays over elements x provinces."""
+
+    def __init__(self, project, plan=None):
+        """
+        Args:
+            project (ProjectModel): The project to price
+            plan (CostPlan, optional): Fixed plan to use instead of the cached plan
+                of the project's type
+        """
+        self.project = project
+        self.plan = plan
+        self.logger = logging.getLogger(__name__)
+
+    def rows(self):
+        """Flat cost rows, the same as ProjectModel.flatten_cost_hierarchy."""
+        return self.calculate().rows
+
+    def total_cost(self):
+        """Total cost of the project."""
+        return self.calculate().total_cost
+
+    def calculate(self):
+        """
+        Price the project.
+
+        Rules are called in the same order as the row-by-row engine, so a failing
+        element raises the same exception.
+
+        Returns:
+            VectorCostResult: The rows together with the leaf subtotals and province totals
+        """
+        project = self.project
+        plan = self.plan or get_cost_plan(project.general.get('project_type', ""))
+
+        toggles = toggle_index(project.cost_toggles)
+        has_travel = len(project.travel.keys()) > 0
+
+        provinces = list(project.samples.keys())
+
+        # Enabled elements of the emitted leaves, numbered across the whole plan
+        leaves = []
+        plan_elements = []
+        element_leaf = []
+
+        for leaf in plan.leaves:
+            if leaf.is_travel and not has_travel:
+                continue
+
+            leaf_elements = []
+
+            for plan_element in leaf.elements:
+                if is_element_enabled(plan_element, toggles):
+                    leaf_elements.append(len(plan_elements))
+                    plan_elements.append(plan_element)
+                    element_leaf.append(len(leaves))
+
+            leaves.append((leaf, leaf_elements))
+
+        # Pass 1: call the rules in row order. Rows are created with their final
+        # values except for the array-priced cells, which are filled in pass 3.
+        flat_rows = []
+
+        # Unit cost vector, computed on the first row of each element
+        costs = [None] * len(plan_elements)
+        cost_computed = [False] * len(plan_elements)
+        # Quantities of elements whose rule does not read the samples, shared by all provinces
+        shared_quanties = {}
+
+        # Array-priced element cells: (element, province) coordinates and quantities
+        cell_rows = []
+        cell_elements = []
+        cell_provinces = []
+        cell_quanties = []
+        cell_integer = []
+
+        # Array-priced rate-card rows
+        price_rows = []
+        price_values = []
+        price_growths = []
+        price_quanties = []
+        price_leaves = []
+        price_provinces = []
+
+        for position, (leaf, leaf_elements) in enumerate(leaves):
+            for province_index, (province, target_audiences) in enumerate(project.samples.items()):
+                if leaf.is_interviewer:
+                    sorted_target_audiences = sorted(
+                        target_audiences.items(),
+                        key = lambda item: SAMPLE_TYPE_ORDER.get(item[1].get("sample_type", ""), 99)
+                    )
+
+                    for key, target_audience in sorted_target_audiences:
+                        for price in target_audience.get('pricing', []):
+                            value = price.get('price', 0)
+                            growth = price.get('price_growth', 0)
+                            vector_priced = type(value) in NUMBER_TYPES and type(growth) in NUMBER_TYPES
+
+                            cost = None if vector_priced else value * abs(1 + growth / 100)
+                            quanty = map_quanty_for_price(project, price, province, target_audience)
+
+                            row = [
+                                leaf.title,
+                                province,
+                                get_chi_phi_phieu_pv_title(price.get('type', '').lower()),
+                                target_audience.get('name', ''),
+                                0,
+                                "Phiếu",
+                                None,
+                                _cell(quanty),
+                                None,
+                                get_comment(price.get('comment', {}))
+                            ]
+                            flat_rows.append(row)
+
+                            if vector_priced and type(quanty) in NUMBER_TYPES:
+                                price_rows.append(row)
+                                price_values.append(value)
+                                price_growths.append(growth)
+                                price_quanties.append(quanty)
+                                price_leaves.append(position)
+                                price_provinces.append(province_index)
+                                continue
+
+                            if cost is None:
+                                cost = value * abs(1 + growth / 100)
+
+                            try:
+                                total_cost = cost * quanty
+                            except Exception as e:
+                                logging.critical(f"[Error] Failed to calculate total for {price.get('type')} in {leaf.title}")
+                                raise Exception(f"[Error] Failed to calculate total for {price.get('type')} in {leaf.title}")
+
+                            row[COST_COLUMN] = _cell(cost)
+                            row[TOTAL_COLUMN] = _cell(total_cost)
+
+                sup_comment = self._sup_comment(target_audiences) if leaf.is_supervisor else ""
+
+                for element_index in leaf_elements:
+                    plan_element = plan_elements[element_index]
+
+                    if not cost_computed[element_index]:
+                        costs[element_index] = plan_element.cost_handler(project, plan_element.element)
+                        cost_computed[element_index] = True
+
+                    cost = costs[element_index]
+
+                    if plan_element.quanty_reads_samples:
+                        quanty = plan_element.quanty_handler(project, plan_element.element, province, title=leaf.title)
+                    elif element_index in shared_quanties:
+                        quanty = shared_quanties[element_index]
+                    else:
+                        quanty = plan_element.quanty_handler(project, plan_element.element, province, title=leaf.title)
+                        shared_quanties[element_index] = quanty
+
+                    row = [
+                        plan_element.row_name,
+                        province,
+                        plan_element.description,
+                        plan_element.target_audience,
+                        plan_element.code,
+                        plan_element.unit,
+                        _cell(cost),
+                        _cell(quanty),
+                        None,
+                        sup_comment if plan_element.has_sup_comment else ""
+                    ]
+                    flat_rows.append(row)
+
+                    if type(cost) in NUMBER_TYPES and type(quanty) in NUMBER_TYPES:
+                        cell_rows.append(row)
+                        cell_elements.append(element_index)
+                        cell_provinces.append(province_index)
+                        cell_quanties.append(quanty)
+                        cell_integer.append(type(cost) in INTEGER_TYPES and type(quanty) in INTEGER_TYPES)
+                        continue
+
+                    try:
+                        total_cost = cost * quanty
+                    except Exception as e:
+                        logging.critical(f"[Error] Failed to calculate total for {plan_element.description} in {leaf.title}")
+                        raise Exception(f"[Error] Failed to calculate total for {plan_element.description} in {leaf.title}")
+
+                    row[TOTAL_COLUMN] = _cell(total_cost)
+
+        # Pass 2: array arithmetic
+        unit_costs = np.array([cost if type(cost) in NUMBER_TYPES else 0 for cost in costs], dtype=float)
+        cell_elements = np.array(cell_elements, dtype=np.intp)
+        cell_provinces = np.array(cell_provinces, dtype=np.intp)
+
+        quanty_matrix = np.zeros((len(plan_elements), len(provinces)))
+        quanty_matrix[cell_elements, cell_provinces] = cell_quanties
+
+        total_matrix = unit_costs[:, np.newaxis] * quanty_matrix
+        cell_totals = total_matrix[cell_elements, cell_provinces]
+
+        price_costs = np.array(price_values, dtype=float) * np.abs(1 + np.array(price_growths, dtype=float) / 100)
+        price_totals = price_costs * np.array(price_quanties, dtype=float)
+
+        leaf_totals = np.bincount(
+            np.array(element_leaf, dtype=np.intp)[cell_elements], weights=cell_totals, minlength=len(leaves)
+        ) + np.bincount(np.array(price_leaves, dtype=np.intp), weights=price_totals, minlength=len(leaves))
+
+        province_column_totals = total_matrix.sum(axis=0) + np.bincount(
+            np.array(price_provinces, dtype=np.intp), weights=price_totals, minlength=len(provinces)
+        )
+
+        # Pass 3: write the array results back into the rows
+        for row, total_cost, integer in zip(cell_rows, cell_totals.tolist(), cell_integer):
+            row[TOTAL_COLUMN] = _cell(int(total_cost) if integer else total_cost)
+
+        for row, cost, total_cost in zip(price_rows, price_costs.tolist(), price_totals.tolist()):
+            row[COST_COLUMN] = _cell(cost)
+            row[TOTAL_COLUMN] = _cell(total_cost)
+
+        subtotals = {}
+        for (leaf, leaf_elements), total in zip(leaves, leaf_totals.tolist()):
+            subtotals[leaf.title] = subtotals.get(leaf.title, 0) + total
+
+        province_totals = dict(zip(provinces, province_column_totals.tolist()))
+
+        return VectorCostResult(flat_rows, subtotals, province_totals, float(sum(province_totals.values())))
+
+    def _sup_comment(self, target_audiences):
+        sup_comment = ""
+
+        for key, target_audience in target_audiences.items():
+            comment = get_comment(target_audience.get('comment', {}))
+
+            if comment:
+                sup_comment += ("\n" if len(sup_comment) > 0 else "") + comment
+
+        return sup_comment
@@ -1,22 +1,22 @@
 # ui/dialogs/bulk_import_dialog.py
 # -*- coding: utf-8 -*-
 """
-Dialog for bulk importing element costs from multiple CSV files.
+Dialog for bulk importing element costs from multiple CSV files and Excel workbooks.
 """
 
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QListWidget, QFileDialog, QProgressBar, QMessageBox,
-    QFrame, QSplitter, QApplication
+    QFrame, QSplitter, QCheckBox
 )
 from PySide6.QtCore import Qt, Signal, QSize
 from PySide6.QtGui import QIcon
 
 import os
-from utils.element_costs_importer import ElementCostsImporter
+from utils.element_costs_importer import ElementCostsImporter, is_cost_sheet_file
 
 class BulkImportDialog(QDialog):
-    """Dialog for bulk importing element costs from multiple CSV files."""
+    """Dialog for bulk importing element costs from multiple CSV files and Excel workbooks."""
     
     importCompleted = Signal(int, int, list)  # success_count, failure_count, messages
     
@@ -25,6 +25,7 @@ class BulkImportDialog(QDialog):
         self.element_costs_model = element_costs_model
         self.importer = ElementCostsImporter()
         self.selected_files = []
+        self.import_job = None
         
         self.init_ui()
         
@@ -38,14 +39,14 @@ class BulkImportDialog(QDialog):
         main_layout = QVBoxLayout(self)
         
         # Header
-        header_label = QLabel("Import Element Costs from Multiple CSV Files")
+        header_label = QLabel("Import Element Costs from Multiple CSV Files or Workbooks")
         header_label.setStyleSheet("font-size: 14px; font-weight: bold; margin-bottom: 10px;")
         main_layout.addWidget(header_label)
         
         # Instructions
         instructions = QLabel(
-            "Select individual CSV files or a directory containing CSV files to import. "
-            "Each file should contain element costs for a single project type."
+            "Select individual CSV files or Excel workbooks, or a directory containing them, to import. "
+            "Each CSV file and each worksheet should contain element costs for a single project type."
         )
         instructions.setWordWrap(True)
         main_layout.addWidget(instructions)
@@ -83,6 +84,10 @@ class BulkImportDialog(QDialog):
         
         main_layout.addLayout(file_layout)
         
+        # Files identical to their last import are skipped unless forced
+        self.force_check = QCheckBox("Re-import files that are unchanged since their last import")
+        main_layout.addWidget(self.force_check)
+        
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setTextVisible(True)
@@ -107,12 +112,12 @@ class BulkImportDialog(QDialog):
         main_layout.addLayout(buttons_layout)
         
     def add_files(self):
-        """Add individual CSV files."""
+        """Add individual CSV files and workbooks."""
         file_paths, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select CSV Files",
+            "Select CSV Files or Workbooks",
             "",
-            "CSV Files (*.csv);;All Files (*)"
+            "Cost Sheets (*.csv *.xlsx);;CSV Files (*.csv);;Excel Workbooks (*.xlsx);;All Files (*)"
         )
         
         if not file_paths:
@@ -128,18 +133,18 @@ class BulkImportDialog(QDialog):
         self.update_progress_status()
         
     def add_directory(self):
-        """Add all CSV files from a directory."""
+        """Add all CSV files and workbooks from a directory."""
         directory = QFileDialog.getExistingDirectory(
             self,
-            "Select Directory Containing CSV Files"
+            "Select Directory Containing CSV Files or Workbooks"
         )
         
         if not directory:
             return
             
-        # Add all CSV files from directory
+        # Add all CSV files and workbooks from directory
         for filename in os.listdir(directory):
-            if filename.endswith(".csv"):
+            if is_cost_sheet_file(filename):
                 file_path = os.path.join(directory, filename)
                 if file_path not in self.selected_files:
                     self.selected_files.append(file_path)
@@ -194,7 +199,7 @@ class BulkImportDialog(QDialog):
             QMessageBox.warning(
                 self,
                 "No Files Selected",
-                "Please select at least one CSV file to import."
+                "Please select at least one CSV file or workbook to import."
             )
             return
             
@@ -202,7 +207,7 @@ class BulkImportDialog(QDialog):
         reply = QMessageBox.question(
             self,
             "Confirm Import",
-            f"Import {len(self.selected_files)} CSV files? This will overwrite any existing costs for the same project types.",
+            f"Import {len(self.selected_files)} files? This will overwrite any existing costs for the same project types.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
@@ -210,54 +215,89 @@ class BulkImportDialog(QDialog):
         if reply == QMessageBox.No:
             return
             
-        # Import files
-        success_count = 0
-        failure_count = 0
-        messages = []
-        
-        # Update progress bar
+        # Import on the database worker; the dialog stays responsive and can cancel
+        self.set_importing(True)
         self.progress_bar.setRange(0, len(self.selected_files))
         self.progress_bar.setValue(0)
         
-        # Process each file
-        for i, file_path in enumerate(self.selected_files):
-            # Update progress
-            self.progress_bar.setValue(i)
-            self.progress_bar.setFormat(f"Importing {os.path.basename(file_path)}... {i}/{len(self.selected_files)}")
-            
-            # Import file
-            success, message = self.importer.import_csv(file_path, self.element_costs_model)
-            
-            if success:
-                success_count += 1
-            else:
-                failure_count += 1
-                
-            messages.append(f"{os.path.basename(file_path)}: {message}")
-            
-            # Process events to keep UI responsive
-            QApplication.processEvents()
-            
+        self.import_job = self.element_costs_model.import_files_async(
+            self.selected_files, force=self.force_check.isChecked()
+        )
+        self.import_job.signals.progress.connect(self.update_import_progress)
+        self.import_job.signals.finished.connect(self.handle_import_finished)
+        self.import_job.signals.failed.connect(self.handle_import_failed)
+        
+    def set_importing(self, importing):
+        """Enable or disable the file controls while an import runs."""
+        for button in (self.import_button, self.add_files_button, self.add_directory_button,
+                       self.remove_button, self.clear_button, self.force_check):
+            button.setEnabled(not importing)
+        
+        self.cancel_button.setText("Stop" if importing else "Cancel")
+        
+    def update_import_progress(self, done, total, description):
+        """Show the progress reported by the import job."""
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"{description} {done}/{total}")
+        
+    def handle_import_failed(self, error):
+        """Handle an import job that raised."""
+        self.import_job = None
+        self.set_importing(False)
+        self.progress_bar.setFormat("Import failed")
+        QMessageBox.critical(self, "Import Error", f"Failed to import costs: {error}")
+        
+    def handle_import_finished(self, results):
+        """Store the imported costs and report the outcome."""
+        cancelled = self.import_job is not None and self.import_job.is_cancelled()
+        self.import_job = None
+        self.set_importing(False)
+        
+        success_count, failure_count, messages = self.element_costs_model.apply_import_results(results)
+        statuses = [result.get("status") for result in results]
+        files_done = len(set(result["file_path"] for result in results))
+        summary = (
+            f"{statuses.count('new')} new, {statuses.count('updated')} updated, "
+            f"{statuses.count('skipped')} skipped as unchanged"
+        )
+        
         # Update progress
-        self.progress_bar.setValue(len(self.selected_files))
-        self.progress_bar.setFormat(f"Import completed: {success_count} succeeded, {failure_count} failed")
+        self.progress_bar.setValue(files_done)
+        self.progress_bar.setFormat(f"Import completed: {summary}, {failure_count} failed")
         
         # Emit signal
         self.importCompleted.emit(success_count, failure_count, messages)
         
         # Show result
-        if failure_count == 0:
+        if cancelled:
+            QMessageBox.information(
+                self,
+                "Import Stopped",
+                f"Import stopped after {files_done} of {len(self.selected_files)} files: "
+                f"{summary}, {failure_count} failed."
+            )
+        elif failure_count == 0:
             QMessageBox.information(
                 self,
                 "Import Completed",
-                f"Successfully imported {success_count} CSV files."
+                f"Successfully imported {success_count} cost sheets: {summary}.\n\n" + "\n".join(messages)
             )
             self.accept()
         else:
-            error_msg = "\n".join([msg for msg in messages if "Failed" in msg])
+            error_msg = "\n".join([msg for msg, result in zip(messages, results) if not result["success"]])
             QMessageBox.warning(
                 self,
                 "Import Completed with Errors",
-                f"Imported {success_count} files successfully, but {failure_count} files failed:\n\n{error_msg}"
+                f"Imported {success_count} cost sheets successfully ({summary}), "
+                f"but {failure_count} files failed:\n\n{error_msg}"
             )
-            # Keep the dialog open so user can see the errors
\ No newline at end of file
+            # Keep the dialog open so user can see the errors
+    
+    def reject(self):
+        """Stop a running import before the dialog can be closed."""
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.progress_bar.setFormat("Stopping after the current file...")
+            return
+        
+        super().reject()
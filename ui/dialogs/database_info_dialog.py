@@ -9,13 +9,35 @@ from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont, QIcon
 import os
 
+from database.db_worker import get_db_worker
+
+def _job_progress(job, description):
+    """progress(done, total) callback reporting to a DbJob and stopping when it is cancelled."""
+    def progress(done, total):
+        job.check_cancelled()
+        job.report_progress(done, total, description)
+    return progress
+
+def backup_database_file(db_manager, file_path, job=None):
+    """Back the database up to a file; runs as a DbWorker job."""
+    return db_manager.backup_to(file_path, progress=_job_progress(job, "Backing up"))
+
+def restore_database_file(db_manager, file_path, job=None):
+    """Restore the database from a backup file; runs as a DbWorker write job."""
+    return db_manager.restore_from(file_path, progress=_job_progress(job, "Restoring"))
+
 class DatabaseInfoDialog(QDialog):
     """Dialog to display information about the database."""
     
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, db_manager, parent=None, element_costs_model=None):
         super().__init__(parent)
         self.db_manager = db_manager
+        self.element_costs_model = element_costs_model
+        self.worker = get_db_worker()
+        self.job = None
+        self.job_file_path = None
         self.init_ui()
+        self.load_stats()
         
     def init_ui(self):
         """Initialize the UI components."""
@@ -35,9 +57,6 @@ class DatabaseInfoDialog(QDialog):
         header_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(header_label)
         
-        # Get database stats
-        stats = self.db_manager.get_database_stats()
-        
         # Database info section
         info_frame = QFrame()
         info_frame.setFrameShape(QFrame.StyledPanel)
@@ -45,18 +64,16 @@ class DatabaseInfoDialog(QDialog):
         info_layout = QVBoxLayout(info_frame)
         
         # Database path
-        path_label = QLabel(f"<b>Database Location:</b> {stats['path']}")
+        path_label = QLabel(f"<b>Database Location:</b> {self.db_manager.db_path}")
         path_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
         info_layout.addWidget(path_label)
         
-        # File size
-        size_mb = stats['size_bytes'] / (1024 * 1024)
-        size_label = QLabel(f"<b>Database Size:</b> {size_mb:.2f} MB")
-        info_layout.addWidget(size_label)
+        # File size and total elements, filled in by load_stats
+        self.size_label = QLabel("<b>Database Size:</b> ...")
+        info_layout.addWidget(self.size_label)
         
-        # Total elements
-        elements_label = QLabel(f"<b>Total Element Costs:</b> {stats['total_elements']}")
-        info_layout.addWidget(elements_label)
+        self.elements_label = QLabel("<b>Total Element Costs:</b> ...")
+        info_layout.addWidget(self.elements_label)
         
         # Add info frame to main layout
         main_layout.addWidget(info_frame)
@@ -71,23 +88,6 @@ class DatabaseInfoDialog(QDialog):
         self.table.setHorizontalHeaderLabels(["Project Type", "Number of Cost Elements"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setAlternatingRowColors(True)
-        
-        # Add project types to table
-        project_types = stats['project_types']
-        self.table.setRowCount(len(project_types))
-        
-        for i, project_type in enumerate(project_types):
-            # Add project type
-            type_item = QTableWidgetItem(project_type['name'])
-            type_item.setFlags(type_item.flags() & ~Qt.ItemIsEditable)
-            self.table.setItem(i, 0, type_item)
-            
-            # Add element count
-            count_item = QTableWidgetItem(str(project_type['elements']))
-            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            count_item.setFlags(count_item.flags() & ~Qt.ItemIsEditable)
-            self.table.setItem(i, 1, count_item)
-        
         main_layout.addWidget(self.table)
         
         # Database actions
@@ -109,21 +109,81 @@ class DatabaseInfoDialog(QDialog):
         
         main_layout.addWidget(actions_frame)
         
+        # Progress of the running database job
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        main_layout.addWidget(self.progress_bar)
+        
         # Buttons
         buttons_layout = QHBoxLayout()
         
         self.close_button = QPushButton("Close")
-        self.close_button.clicked.connect(self.accept)
+        self.close_button.clicked.connect(self.reject)
         
         buttons_layout.addStretch()
         buttons_layout.addWidget(self.close_button)
         
         main_layout.addLayout(buttons_layout)
     
-    def backup_database(self):
-        """Backup the database to a file."""
-        import shutil
+    def set_busy(self, busy, job=None):
+        """Show the progress bar and block the actions while a job runs."""
+        self.job = job if busy else None
+        self.progress_bar.setVisible(busy)
+        self.backup_button.setEnabled(not busy)
+        self.restore_button.setEnabled(not busy)
+        self.close_button.setText("Cancel" if busy else "Close")
+        
+        if busy:
+            # Busy indicator until the job reports its page count
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setFormat("")
+    
+    def update_progress(self, done, total, description):
+        """Show the page progress of a backup or restore."""
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"{description}... %p% ({done:,}/{total:,} pages)")
+    
+    def load_stats(self):
+        """Read the database statistics on the database worker."""
+        job = self.worker.submit(self.db_manager.get_database_stats)
+        self.set_busy(True, job)
+        job.signals.finished.connect(self.display_stats)
+        job.signals.failed.connect(self.handle_job_failed)
+    
+    def display_stats(self, stats):
+        """Fill the labels and the project types table."""
+        self.set_busy(False)
         
+        # File size
+        size_mb = stats['size_bytes'] / (1024 * 1024)
+        self.size_label.setText(f"<b>Database Size:</b> {size_mb:.2f} MB")
+        
+        # Total elements
+        self.elements_label.setText(f"<b>Total Element Costs:</b> {stats['total_elements']}")
+        
+        # Add project types to table
+        project_types = stats['project_types']
+        self.table.setRowCount(len(project_types))
+        
+        for i, project_type in enumerate(project_types):
+            # Add project type
+            type_item = QTableWidgetItem(project_type['name'])
+            type_item.setFlags(type_item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(i, 0, type_item)
+            
+            # Add element count
+            count_item = QTableWidgetItem(str(project_type['elements']))
+            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            count_item.setFlags(count_item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(i, 1, count_item)
+    
+    def handle_job_failed(self, error):
+        self.set_busy(False)
+        QMessageBox.critical(self, "Database Error", f"Database operation failed: {error}")
+    
+    def backup_database(self):
+        """Back the database up to a file with the online-backup API."""
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "Backup Database",
@@ -133,27 +193,35 @@ class DatabaseInfoDialog(QDialog):
         
         if not file_path:
             return
-            
-        try:
-            # Copy the database file
-            shutil.copy2(self.db_manager.db_path, file_path)
-            
+        
+        # A read job: the backup is consistent without holding up the writes
+        job = self.worker.submit(backup_database_file, self.db_manager, file_path, with_job=True)
+        self.set_busy(True, job)
+        job.signals.progress.connect(self.update_progress)
+        self.job_file_path = file_path
+        job.signals.finished.connect(self.handle_backup_finished)
+        job.signals.failed.connect(self.handle_job_failed)
+        job.signals.cancelled.connect(self.handle_job_cancelled)
+    
+    def handle_backup_finished(self, success):
+        file_path = self.job_file_path
+        self.set_busy(False)
+        
+        if success:
             QMessageBox.information(
                 self,
                 "Backup Successful",
                 f"Database successfully backed up to:\n{file_path}"
             )
-        except Exception as e:
+        else:
             QMessageBox.critical(
                 self,
                 "Backup Failed",
-                f"Failed to backup database: {str(e)}"
+                f"Failed to backup database to {file_path}. See the log for details."
             )
     
     def restore_database(self):
-        """Restore the database from a backup file."""
-        import shutil
-        
+        """Restore the database from a backup file while the application keeps running."""
         # Confirm with user
         reply = QMessageBox.warning(
             self,
@@ -176,28 +244,48 @@ class DatabaseInfoDialog(QDialog):
         
         if not file_path:
             return
-            
-        try:
-            # Close all connections to the database
-            self.db_manager._get_connection().close()
-            
-            # Copy the backup file to the database location
-            shutil.copy2(file_path, self.db_manager.db_path)
-            
-            QMessageBox.information(
-                self,
-                "Restore Successful",
-                "Database successfully restored. The application will now close.\n\n"
-                "Please restart the application to load the restored data."
-            )
-            
-            # Close the application
-            self.accept()
-            self.parent().close()
-            
-        except Exception as e:
+        
+        # Queued behind pending writes, which the restore then replaces
+        job = self.worker.submit(restore_database_file, self.db_manager, file_path, write=True, with_job=True)
+        self.set_busy(True, job)
+        job.signals.progress.connect(self.update_progress)
+        self.job_file_path = file_path
+        job.signals.finished.connect(self.handle_restore_finished)
+        job.signals.failed.connect(self.handle_job_failed)
+        job.signals.cancelled.connect(self.handle_job_cancelled)
+    
+    def handle_restore_finished(self, success):
+        file_path = self.job_file_path
+        self.set_busy(False)
+        
+        if not success:
             QMessageBox.critical(
                 self,
                 "Restore Failed",
-                f"Failed to restore database: {str(e)}"
-            )
\ No newline at end of file
+                f"Failed to restore database from {file_path}. The current data was kept; see the log for details."
+            )
+            return
+        
+        # Reload the element costs in place
+        if self.element_costs_model is not None:
+            self.element_costs_model.load_costs_from_database()
+        
+        self.load_stats()
+        
+        QMessageBox.information(
+            self,
+            "Restore Successful",
+            f"Database successfully restored from:\n{file_path}"
+        )
+    
+    def handle_job_cancelled(self):
+        self.set_busy(False)
+        self.load_stats()
+    
+    def reject(self):
+        """Cancel a running backup or restore instead of closing."""
+        if self.job is not None:
+            self.job.cancel()
+            return
+        
+        super().reject()
@@ -1,7 +1,7 @@
 # ui/dialogs/element_cost_edit_dialog.py
 # -*- coding: utf-8 -*-
 """
-Dialog for editing a single element cost.
+Dialog for editing an element cost, or one value across its levels/lengths.
 """
 
 from PySide6.QtWidgets import (
@@ -10,12 +10,21 @@ from PySide6.QtWidgets import (
     QMessageBox, QGroupBox
 )
 from PySide6.QtCore import Qt, Signal
+import pandas as pd
 
 class ElementCostEditDialog(QDialog):
     """Dialog for editing a single element cost."""
     
     costUpdated = Signal(str, str, str, float)  # subtitle_code, classification, interval, new_value
     
+    # Apply To choices: (all levels, all lengths)
+    APPLY_SCOPES = {
+        "This cost only": (False, False),
+        "All lengths of this level": (False, True),
+        "All levels of this length": (True, False),
+        "All levels and lengths": (True, True),
+    }
+    
     def __init__(self, subtitle_code, subtitle_name, element_costs_model, project_type, parent=None):
         super().__init__(parent)
         self.subtitle_code = subtitle_code
@@ -53,16 +62,23 @@ class ElementCostEditDialog(QDialog):
         cost_group = QGroupBox("Cost Values")
         cost_layout = QFormLayout(cost_group)
         
+        # Levels and lengths of the project type, the standard ones without metadata
+        metadata = self._project_costs().get("metadata") or {}
+        
         # Classification selection
         self.classification_combo = QComboBox()
-        self.classification_combo.addItems(["L1", "L2", "L3", "L4"])
+        self.classification_combo.addItems(metadata.get("levels") or ["L1", "L2", "L3", "L4"])
         self.classification_combo.currentTextChanged.connect(self.update_cost_value)
         
         # Interview length selection
         self.length_combo = QComboBox()
-        self.length_combo.addItems(["<15 min", "15-30 min", "30-45 min", "45-60 min"])
+        self.length_combo.addItems(metadata.get("lengths") or ["<15 min", "15-30 min", "30-45 min", "45-60 min"])
         self.length_combo.currentTextChanged.connect(self.update_cost_value)
         
+        # Range the value is written to
+        self.apply_combo = QComboBox()
+        self.apply_combo.addItems(list(self.APPLY_SCOPES))
+        
         # Cost input
         self.cost_spin = QDoubleSpinBox()
         self.cost_spin.setRange(0, 1000000000)  # 0 to 1 billion
@@ -74,6 +90,7 @@ class ElementCostEditDialog(QDialog):
         cost_layout.addRow("Classification:", self.classification_combo)
         cost_layout.addRow("Interview Length:", self.length_combo)
         cost_layout.addRow("Cost Value:", self.cost_spin)
+        cost_layout.addRow("Apply To:", self.apply_combo)
         
         main_layout.addWidget(cost_group)
         
@@ -95,13 +112,17 @@ class ElementCostEditDialog(QDialog):
         # Initialize with current value
         self.update_cost_value()
         
+    def _project_costs(self):
+        """Get the {"data": DataFrame, "metadata": dict} entry of the project type."""
+        return self.element_costs_model.costs.get(self.project_type) or {}
+        
     def update_cost_value(self):
         """Update the cost spin box with the current value."""
         classification = self.classification_combo.currentText()
         length = self.length_combo.currentText()
         
         # Get the current value from the model
-        df = self.element_costs_model.costs.get(self.project_type)
+        df = self._project_costs().get("data")
         if df is not None:
             # Find the row with matching subtitle code
             matching_rows = df[df["Subtitle Code"] == self.subtitle_code]
@@ -111,37 +132,32 @@ class ElementCostEditDialog(QDialog):
                 if column in df.columns:
                     # Get the value
                     value = matching_rows.iloc[0][column]
-                    # Update the spin box
-                    self.cost_spin.setValue(value)
-                    return
+                    if pd.notna(value):
+                        # Update the spin box
+                        self.cost_spin.setValue(float(value))
+                        return
         
         # If we get here, either the value wasn't found or there was an error
         self.cost_spin.setValue(0)
         
     def save_cost(self):
-        """Save the updated cost value."""
+        """Save the cost value to the selected range in one batch."""
         classification = self.classification_combo.currentText()
         length = self.length_combo.currentText()
         value = self.cost_spin.value()
+        all_levels, all_lengths = self.APPLY_SCOPES[self.apply_combo.currentText()]
+        
+        levels = [self.classification_combo.itemText(i) for i in range(self.classification_combo.count())]
+        lengths = [self.length_combo.itemText(i) for i in range(self.length_combo.count())]
         
-        # Find the interview length in minutes
-        if length == "<15 min":
-            length_minutes = 10  # Use mid-point
-        elif length == "15-30 min":
-            length_minutes = 22  # Use mid-point
-        elif length == "30-45 min":
-            length_minutes = 37  # Use mid-point
-        else:  # "45-60 min"
-            length_minutes = 52  # Use mid-point
+        edits = [
+            (self.subtitle_code, f"{level} ({length_label})", value)
+            for level in (levels if all_levels else [classification])
+            for length_label in (lengths if all_lengths else [length])
+        ]
         
         # Update the model
-        success = self.element_costs_model.update_cost(
-            self.project_type,
-            self.subtitle_code,
-            classification,
-            length_minutes,
-            value
-        )
+        success = self.element_costs_model.update_costs(self.project_type, edits)
         
         if success:
             # Emit signal
@@ -158,4 +174,4 @@ class ElementCostEditDialog(QDialog):
                 self,
                 "Update Error",
                 f"Failed to update cost value for {classification} ({length})."
-            )
\ No newline at end of file
+            )
@@ -16,23 +16,29 @@ from openpyxl.utils import (
 from openpyxl.worksheet.dimensions import ColumnDimension, DimensionHolder
 import pandas as pd
 
+from utils.profiler import PROFILER
+
 class HierarchicalCostResultsDialog(QDialog):
     """Dialog to display improved hierarchical project cost calculation results."""
     
     def __init__(self, cost_data, parent=None):
         super().__init__(parent)
         self.cost_data = cost_data
-        self.data = pd.DataFrame(cost_data, columns=["Subtitle", 
-                                                    "Province", 
-                                                    "Description", 
-                                                    "Target_Audience",
-                                                    "Code",
-                                                    "Unit", 
-                                                    "Cost",
-                                                    "Unit Cost (VND)", 
-                                                    "Total Cost (VND)",
-                                                    "Comment"])
-        self.init_ui()
+
+        with PROFILER.section("results_dialog.build_dataframe"):
+            self.data = pd.DataFrame(cost_data, columns=["Subtitle", 
+                                                        "Province", 
+                                                        "Description", 
+                                                        "Target_Audience",
+                                                        "Code",
+                                                        "Unit", 
+                                                        "Cost",
+                                                        "Unit Cost (VND)", 
+                                                        "Total Cost (VND)",
+                                                        "Comment"])
+
+        with PROFILER.section("results_dialog.init_ui"):
+            self.init_ui()
         
     def init_ui(self):
         """Initialize the UI components."""
@@ -148,12 +154,14 @@ class HierarchicalCostResultsDialog(QDialog):
         self.tree.setColumnWidth(7, 200)  
         
         # Add cost hierarchy
-        self.add_cost_hierarchy(self.tree, self.cost_data)
+        with PROFILER.section("results_dialog.build_tree"):
+            self.add_cost_hierarchy(self.tree, self.cost_data)
         
         layout.addWidget(self.tree)
         
         # Expand top-level items
-        self.tree.expandAll()
+        with PROFILER.section("results_dialog.expand_tree"):
+            self.tree.expandAll()
         
         # Enable custom tooltip handling
         self.tree.setMouseTracking(True)
@@ -309,7 +317,8 @@ class HierarchicalCostResultsDialog(QDialog):
         if hasattr(self.parent(), 'project_model'):
             project_model = self.parent().project_model
         
-        self.create_estimate_cost_sheet(wb, project_model=project_model)
+        with PROFILER.section("results_dialog.create_estimate_cost_sheet"):
+            self.create_estimate_cost_sheet(wb, project_model=project_model)
         
         # Remove default sheet
         if "Sheet" in wb.sheetnames:
@@ -317,7 +326,8 @@ class HierarchicalCostResultsDialog(QDialog):
         
         # Save the workbook
         try:
-            wb.save(file_path)
+            with PROFILER.section("results_dialog.save_workbook"):
+                wb.save(file_path)
             QMessageBox.information(
                 self,
                 "Export Successful",
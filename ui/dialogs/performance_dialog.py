@@ -0,0 +1,125 @@
+# ui/dialogs/performance_dialog.py
+# -*- coding: utf-8 -*-
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox
+)
+
+from utils.profiler import PROFILER
+from ui.widgets.numeric_table_item import NumericTableItem
+
+class PerformanceDialog(QDialog):
+    """Dialog showing the timings collected by the profiler."""
+
+    # (key in ProfileStat.to_dict(), header, format)
+    COLUMNS = [
+        ("name", "Name", None),
+        ("calls", "Calls", "{:,}"),
+        ("total_ms", "Total (ms)", "{:,.2f}"),
+        ("mean_ms", "Mean (ms)", "{:,.3f}"),
+        ("max_ms", "Max (ms)", "{:,.2f}"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        """Initialize the UI components."""
+        self.setWindowTitle("Performance")
+        self.setMinimumSize(760, 500)
+
+        main_layout = QVBoxLayout(self)
+
+        self.enabled_check = QCheckBox("Enable profiling")
+        self.enabled_check.setChecked(PROFILER.enabled)
+        self.enabled_check.toggled.connect(self.set_profiling_enabled)
+        main_layout.addWidget(self.enabled_check)
+
+        help_label = QLabel(
+            "While enabled, every quantity/cost rule, database call and results dialog phase is timed. "
+            "Reproduce the slow action, then refresh this list."
+        )
+        help_label.setWordWrap(True)
+        help_label.setStyleSheet("color: #666; font-style: italic;")
+        main_layout.addWidget(help_label)
+
+        self.table = QTableWidget()
+        self.table.setAlternatingRowColors(True)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels([header for _, header, _ in self.COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, len(self.COLUMNS)):
+            self.table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        main_layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        button_layout.addWidget(refresh_button)
+
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(reset_button)
+
+        button_layout.addStretch()
+
+        export_button = QPushButton("Export JSON...")
+        export_button.clicked.connect(self.export_json)
+        button_layout.addWidget(export_button)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+
+        main_layout.addLayout(button_layout)
+
+    def set_profiling_enabled(self, enabled):
+        PROFILER.set_enabled(enabled)
+
+    def refresh(self):
+        """Reload the table from the profiler."""
+        stats = PROFILER.snapshot()
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(stats))
+
+        for row, stat in enumerate(stats):
+            for column, (key, _, text_format) in enumerate(self.COLUMNS):
+                value = stat[key]
+
+                if text_format is None:
+                    item = QTableWidgetItem(str(value))
+                else:
+                    item = NumericTableItem(value, text_format.format(value))
+
+                self.table.setItem(row, column, item)
+
+        self.table.setSortingEnabled(True)
+
+    def reset(self):
+        PROFILER.reset()
+        self.refresh()
+
+    def export_json(self):
+        """Dump the profiler statistics to a JSON file."""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Performance Statistics",
+            "performance.json",
+            "JSON Files (*.json);;All Files (*)"
+        )
+
+        if not file_path:
+            return
+
+        if not file_path.endswith('.json'):
+            file_path += '.json'
+
+        if PROFILER.to_json(file_path):
+            QMessageBox.information(self, "Export Successful", f"Statistics exported to {file_path}")
+        else:
+            QMessageBox.critical(self, "Export Error", f"Failed to save file: {file_path}")
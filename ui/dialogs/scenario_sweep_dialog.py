@@ -0,0 +1,196 @@
+# ui/dialogs/scenario_sweep_dialog.py
+# -*- coding: utf-8 -*-
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+    QSpinBox, QFormLayout, QGroupBox, QTableWidget, QTableWidgetItem,
+    QHeaderView, QFileDialog, QMessageBox, QApplication
+)
+from PySide6.QtCore import Qt
+import os
+import time
+import numbers
+import logging
+
+from models.scenario_sweep import run_sweep, parse_sweep_values, expand_grid
+from ui.widgets.numeric_table_item import NumericTableItem
+
+class ScenarioSweepDialog(QDialog):
+    """Dialog pricing the current project over a grid of parameter values."""
+
+    # (parameter, label); empty inputs keep the project's own values
+    PARAMETERS = [
+        ("interview_length", "Interview length (minutes):"),
+        ("incident_rate", "Incident rate (%):"),
+        ("sample_size", "Sample size per audience:"),
+        ("extra_rate", "Extra rate (%):"),
+    ]
+
+    def __init__(self, project_model, parent=None):
+        super().__init__(parent)
+        self.project_model = project_model
+        self.logger = logging.getLogger(__name__)
+        self.results = None
+        self.init_ui()
+
+    def init_ui(self):
+        """Initialize the UI components."""
+        self.setWindowTitle("Scenario Sweep")
+        self.setMinimumSize(800, 600)
+
+        main_layout = QVBoxLayout(self)
+
+        # Parameter grid
+        grid_group = QGroupBox("Parameter Grid")
+        grid_layout = QFormLayout(grid_group)
+
+        self.value_edits = {}
+
+        for parameter, label in self.PARAMETERS:
+            edit = QLineEdit()
+            edit.setPlaceholderText("Keep project value, or e.g. 10, 20, 30 or 10-40:5")
+            edit.textChanged.connect(self.update_scenario_count)
+            grid_layout.addRow(label, edit)
+            self.value_edits[parameter] = edit
+
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, os.cpu_count() or 1)
+        self.jobs_spin.setValue(os.cpu_count() or 1)
+        grid_layout.addRow("Worker processes:", self.jobs_spin)
+
+        help_label = QLabel("Every combination of the values is priced. Audience parameters apply to all target audiences.")
+        help_label.setWordWrap(True)
+        help_label.setStyleSheet("color: #666; font-style: italic;")
+        grid_layout.addRow("", help_label)
+
+        main_layout.addWidget(grid_group)
+
+        # Run controls
+        run_layout = QHBoxLayout()
+
+        self.count_label = QLabel()
+        run_layout.addWidget(self.count_label)
+        run_layout.addStretch()
+
+        self.run_button = QPushButton("Run Sweep")
+        self.run_button.clicked.connect(self.run)
+        run_layout.addWidget(self.run_button)
+
+        main_layout.addLayout(run_layout)
+
+        # Results
+        self.table = QTableWidget()
+        self.table.setAlternatingRowColors(True)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        main_layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+
+        self.export_button = QPushButton("Export CSV...")
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export_results)
+        button_layout.addWidget(self.export_button)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+
+        main_layout.addLayout(button_layout)
+
+        self.update_scenario_count()
+
+    def get_grid(self):
+        """
+        Read the parameter grid from the inputs.
+
+        Returns:
+            dict: {parameter: [values]} for the parameters that were filled in
+        """
+        grid = {}
+
+        for parameter, edit in self.value_edits.items():
+            text = edit.text().strip()
+
+            if text:
+                grid[parameter] = parse_sweep_values(text)
+
+        return grid
+
+    def update_scenario_count(self):
+        try:
+            grid = self.get_grid()
+            count = len(expand_grid(grid)) if grid else 0
+            self.count_label.setText(f"Scenarios: {count}")
+            self.run_button.setEnabled(count > 0)
+        except ValueError:
+            self.count_label.setText("Scenarios: invalid values")
+            self.run_button.setEnabled(False)
+
+    def run(self):
+        """Run the sweep and show the totals."""
+        grid = self.get_grid()
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            start = time.perf_counter()
+            self.results = run_sweep(self.project_model, grid, jobs=self.jobs_spin.value())
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            self.logger.error(f"Scenario sweep failed: {str(e)}")
+            QMessageBox.critical(self, "Sweep Error", f"{str(e)}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        self.display_results()
+
+        failures = int((self.results["status"] != "ok").sum())
+        self.count_label.setText(
+            f"Scenarios: {len(self.results)} priced in {elapsed:.2f}s" + (f", {failures} failed" if failures else "")
+        )
+        self.export_button.setEnabled(True)
+
+    def display_results(self):
+        columns = list(self.results.columns)
+
+        self.table.setSortingEnabled(False)
+        self.table.clear()
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels(columns)
+        self.table.setRowCount(len(self.results))
+
+        for row, values in enumerate(self.results.itertuples(index=False)):
+            for column, value in enumerate(values):
+                if isinstance(value, numbers.Real) and value == value:
+                    text = f"{value:,.0f}" if columns[column] == "total_cost" else f"{value:g}"
+                    item = NumericTableItem(float(value), text)
+                else:
+                    item = QTableWidgetItem("" if value is None or value != value else str(value))
+
+                self.table.setItem(row, column, item)
+
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSortingEnabled(True)
+
+    def export_results(self):
+        """Export the sweep results to a CSV file."""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Sweep Results",
+            "",
+            "CSV Files (*.csv);;All Files (*)"
+        )
+
+        if not file_path:
+            return
+
+        if not file_path.endswith('.csv'):
+            file_path += '.csv'
+
+        try:
+            self.results.to_csv(file_path, index=False, encoding="utf-8-sig")
+            QMessageBox.information(self, "Export Successful", f"Results exported to {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", f"Failed to save file: {str(e)}")
@@ -29,6 +29,7 @@ import re
 import logging
 from components.validation_field import FieldValidator
 from ui.dialogs.hierarchical_cost_results_dialog import HierarchicalCostResultsDialog
+from utils.profiler import PROFILER
 
 class MainWindow(QMainWindow):
     """
@@ -153,6 +154,11 @@ class MainWindow(QMainWindow):
         hierarchical_calc_action.triggered.connect(self.display_hierarchical_cost_results)
         calculate_menu.addAction(hierarchical_calc_action)
         
+        scenario_sweep_action = QAction("Scenario Sweep...", self)
+        scenario_sweep_action.setShortcut("F8")
+        scenario_sweep_action.triggered.connect(self.show_scenario_sweep)
+        calculate_menu.addAction(scenario_sweep_action)
+        
         report_action = QAction("Generate Report", self)
         report_action.setShortcut("F6")
         report_action.triggered.connect(self.generate_report)
@@ -169,6 +175,10 @@ class MainWindow(QMainWindow):
         db_info_action.triggered.connect(self.show_database_info)
         database_menu.addAction(db_info_action)
         
+        performance_action = QAction("Performance...", self)
+        performance_action.triggered.connect(self.show_performance)
+        help_menu.addAction(performance_action)
+        
         about_action = QAction("About", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -412,21 +422,33 @@ class MainWindow(QMainWindow):
     def show_database_info(self):
         """Show database information dialog."""
         from ui.dialogs.database_info_dialog import DatabaseInfoDialog
-        dialog = DatabaseInfoDialog(self.project_model.element_costs.db_manager, self)
+        dialog = DatabaseInfoDialog(
+            self.project_model.element_costs.db_manager, self,
+            element_costs_model=self.project_model.element_costs
+        )
+        dialog.exec()
+
+    def show_performance(self):
+        """Show the profiling statistics dialog."""
+        from ui.dialogs.performance_dialog import PerformanceDialog
+        dialog = PerformanceDialog(self)
+        dialog.exec()
+
+    def show_scenario_sweep(self):
+        """Show the scenario sweep dialog for the current project."""
+        from ui.dialogs.scenario_sweep_dialog import ScenarioSweepDialog
+        dialog = ScenarioSweepDialog(self.project_model, self)
         dialog.exec()
 
     def display_hierarchical_cost_results(self):
         """Calculate and display hierarchical project cost results."""
         try:
-            # Calculate hierarchical costs
-            path_file = self.resource_path("config/clt_cost_hierarchy.json")
-
-            with open(path_file, "r", encoding="utf-8") as file:
-                hierarchy_data = json.load(file)
-            
-            cost_data = self.project_model.flatten_cost_hierarchy(hierarchy_data)
+            # Calculate hierarchical costs from the compiled plan of the project type
+            with PROFILER.section("results_dialog.calculate"):
+                cost_data = self.project_model.flatten_cost_hierarchy()
             
-            dialog = HierarchicalCostResultsDialog(cost_data, self)
+            with PROFILER.section("results_dialog.create"):
+                dialog = HierarchicalCostResultsDialog(cost_data, self)
             dialog.exec()
             
             self.statusBar().showMessage("Hierarchical cost calculation completed")
@@ -7,9 +7,11 @@ import logging
 class ElementCostsTableModel(QAbstractTableModel):
     """Table model for displaying and editing element costs."""
     
-    def __init__(self, data=None):
+    def __init__(self, data=None, element_costs_model=None):
         super().__init__()
         self._data = data if data is not None else pd.DataFrame()
+        self.element_costs_model = element_costs_model
+        self.project_type = None
         self.logger = logging.getLogger(__name__)
         
     def rowCount(self, parent=QModelIndex()):
@@ -51,33 +53,71 @@ class ElementCostsTableModel(QAbstractTableModel):
         
     def setData(self, index, value, role=Qt.EditRole):
         if role == Qt.EditRole:
-            try:
-                col_name = self._data.columns[index.column()]
-                
-                # Only allow editing cost columns
-                if not col_name.startswith("L"):
-                    return False
-                
-                # Convert value to float for cost columns
-                try:
-                    # Remove commas and convert to float
-                    clean_value = value.replace(',', '')
-                    float_value = float(clean_value)
-                    
-                    # Update the data
-                    self._data.iloc[index.row(), index.column()] = float_value
-                    
-                    # Emit dataChanged signal
-                    self.dataChanged.emit(index, index)
-                    return True
-                except ValueError:
-                    self.logger.warning(f"Invalid value: {value} for column {col_name}")
-                    return False
-            except Exception as e:
-                self.logger.error(f"Error setting data: {e}")
-                return False
+            return self.set_values([(index.row(), index.column(), value)])
                 
         return False
+    
+    def set_values(self, cells):
+        """
+        Set many cost cells at once, saving them in a single database transaction.
+        
+        Args:
+            cells (list): (row, column, value) tuples; values may be numbers or
+                text such as "1,250.00"
+            
+        Returns:
+            bool: True if every cell was set, False if none was
+        """
+        if not cells:
+            return False
+            
+        edits = []
+        for row, column, value in cells:
+            col_name = self._data.columns[column]
+            
+            # Only allow editing cost columns
+            if not col_name.startswith("L"):
+                return False
+            
+            # Remove commas and convert to float
+            try:
+                float_value = float(str(value).replace(',', '').strip())
+            except ValueError:
+                self.logger.warning(f"Invalid value: {value} for column {col_name}")
+                return False
+            
+            edits.append((row, column, float_value))
+        
+        try:
+            subtitle_codes = self._data["Subtitle Code"] if "Subtitle Code" in self._data.columns else None
+            previous = [(row, column, self._data.iloc[row, column]) for row, column, _ in edits]
+            
+            # Update the data; saving may reset the model through costsChanged
+            for row, column, value in edits:
+                self._data.iloc[row, column] = value
+            
+            if self.element_costs_model is not None and self.project_type and subtitle_codes is not None:
+                saved = self.element_costs_model.update_costs(
+                    self.project_type,
+                    [(subtitle_codes.iloc[row], self._data.columns[column], value) for row, column, value in edits]
+                )
+                if not saved:
+                    for row, column, value in previous:
+                        self._data.iloc[row, column] = value
+                    return False
+            
+            # Emit dataChanged once for the bounding range
+            rows = [row for row, _, _ in edits]
+            columns = [column for _, column, _ in edits]
+            self.dataChanged.emit(
+                self.index(min(rows), min(columns)),
+                self.index(max(rows), max(columns))
+            )
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error setting data: {e}")
+            return False
         
     def flags(self, index):
         if not index.isValid():
@@ -3,10 +3,10 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, 
     QLabel, QComboBox, QFileDialog, QMessageBox, QHeaderView,
-    QInputDialog, QLineEdit, QSplitter, QFrame
+    QInputDialog, QLineEdit, QSplitter, QFrame, QApplication
 )
 from PySide6.QtCore import Qt, Slot
-from PySide6.QtGui import QIcon, QFont
+from PySide6.QtGui import QIcon, QFont, QKeySequence, QShortcut
 import logging
 import os
 import pandas as pd
@@ -21,7 +21,7 @@ class ElementCostsTab(QWidget):
         super().__init__()
         self.project_model = project_model
         self.current_project_type = None
-        self.table_model = ElementCostsTableModel()
+        self.table_model = ElementCostsTableModel(element_costs_model=project_model.element_costs)
         self.logger = logging.getLogger(__name__)
         
         self.init_ui()
@@ -72,7 +72,7 @@ class ElementCostsTab(QWidget):
         file_controls = QHBoxLayout()
         
         # Import/Export buttons
-        self.import_button = QPushButton("Import CSV")
+        self.import_button = QPushButton("Import CSV/Excel")
         self.import_button.setIcon(QIcon("icons/import.png"))
         self.import_button.clicked.connect(self.import_csv)
         
@@ -151,7 +151,10 @@ class ElementCostsTab(QWidget):
         h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
         
         # Help text
-        help_label = QLabel("Double-click on cost values to edit them. Filter by subtitle or use search to find specific items.")
+        help_label = QLabel(
+            "Double-click on cost values to edit them, paste a range with Ctrl+V or fill a selection down with Ctrl+D. "
+            "Filter by subtitle or use search to find specific items."
+        )
         help_label.setStyleSheet("color: #666; font-style: italic;")
         
         # Add all components to main layout
@@ -214,6 +217,8 @@ class ElementCostsTab(QWidget):
         
     def update_table(self):
         """Update the table view with current project type data."""
+        self.table_model.project_type = self.current_project_type
+        
         if not self.current_project_type or self.current_project_type not in self.project_model.element_costs.costs:
             # Clear the table if no valid project type
             self.table_model.setDataFrame(None)
@@ -284,25 +289,44 @@ class ElementCostsTab(QWidget):
         self.update_table()
         
     def import_csv(self):
-        """Import element costs from a CSV file."""
+        """Import element costs from a CSV file or Excel workbook."""
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Import Element Costs",
             "",
-            "CSV Files (*.csv);;All Files (*)"
+            "Cost Sheets (*.csv *.xlsx);;CSV Files (*.csv);;Excel Workbooks (*.xlsx);;All Files (*)"
         )
         
         if not file_path:
             return
         
-        # Import the CSV
-        success, message = self.project_model.element_costs.import_csv(file_path)
+        # Import the file on the database worker
+        self.import_button.setEnabled(False)
+        self.bulk_import_button.setEnabled(False)
+        
+        job = self.project_model.element_costs.import_files_async([file_path])
+        job.signals.finished.connect(self.handle_import_finished)
+        job.signals.failed.connect(self.handle_import_failed)
+    
+    def handle_import_finished(self, results):
+        """Store the costs of a finished import and show the result."""
+        self.import_button.setEnabled(True)
+        self.bulk_import_button.setEnabled(True)
+        
+        success_count, _, _ = self.project_model.element_costs.apply_import_results(results)
+        message = "\n".join(result["message"] for result in results) if results else "Import cancelled"
         
         # Show result message
-        if success:
+        if success_count:
             QMessageBox.information(self, "Import Successful", message)
         else:
             QMessageBox.critical(self, "Import Error", message)
+    
+    def handle_import_failed(self, error):
+        """Show the error of a failed import."""
+        self.import_button.setEnabled(True)
+        self.bulk_import_button.setEnabled(True)
+        QMessageBox.critical(self, "Import Error", f"Failed to import costs: {error}")
             
     def export_csv(self):
         """Export current project type costs to CSV."""
@@ -401,6 +425,78 @@ class ElementCostsTab(QWidget):
         """Set up signal/slot connections."""
         # Connect double-click on table to edit cell
         self.table_view.doubleClicked.connect(self.edit_cell)
+        
+        # Range edits, saved in one transaction
+        paste_shortcut = QShortcut(QKeySequence.Paste, self.table_view)
+        paste_shortcut.setContext(Qt.WidgetShortcut)
+        paste_shortcut.activated.connect(self.paste_cells)
+        
+        fill_down_shortcut = QShortcut(QKeySequence("Ctrl+D"), self.table_view)
+        fill_down_shortcut.setContext(Qt.WidgetShortcut)
+        fill_down_shortcut.activated.connect(self.fill_down)
+    
+    def _apply_cells(self, cells, action):
+        """Save (row, column, value) cells through the table model, reporting a failure."""
+        if not cells:
+            return
+        
+        if not self.table_model.set_values(cells):
+            QMessageBox.warning(
+                self,
+                f"{action} Error",
+                f"Failed to update {len(cells)} cost values. Only cost columns (L1-L4) accept numeric values."
+            )
+    
+    def paste_cells(self):
+        """Paste tab-separated clipboard text at the current cell.
+        
+        A single copied value is pasted into every selected cell.
+        """
+        if not self.current_project_type:
+            return
+            
+        text = QApplication.clipboard().text()
+        rows = [line.split("\t") for line in text.rstrip("\r\n").splitlines()]
+        if not rows or rows == [[""]]:
+            return
+        
+        selected = self.table_view.selectionModel().selectedIndexes()
+        
+        if len(rows) == 1 and len(rows[0]) == 1 and selected:
+            cells = [(index.row(), index.column(), rows[0][0]) for index in selected]
+        else:
+            current = self.table_view.currentIndex()
+            if not current.isValid():
+                return
+            
+            cells = [
+                (current.row() + row_offset, current.column() + column_offset, value)
+                for row_offset, values in enumerate(rows)
+                for column_offset, value in enumerate(values)
+                if current.row() + row_offset < self.table_model.rowCount()
+                and current.column() + column_offset < self.table_model.columnCount()
+            ]
+        
+        self._apply_cells(cells, "Paste")
+    
+    def fill_down(self):
+        """Copy the top selected value of each column into the selected cells below it."""
+        if not self.current_project_type:
+            return
+            
+        columns = {}
+        for index in self.table_view.selectionModel().selectedIndexes():
+            columns.setdefault(index.column(), []).append(index.row())
+        
+        cells = []
+        for column, rows in columns.items():
+            rows.sort()
+            value = self.table_model._data.iloc[rows[0], column]
+            if pd.isna(value):
+                continue
+            cells.extend((row, column, value) for row in rows[1:])
+        
+        self._apply_cells(cells, "Fill Down")
     
     def edit_cell(self, index):
         """Handle double-click on a cell."""
@@ -0,0 +1,19 @@
+# ui/widgets/numeric_table_item.py
+# -*- coding: utf-8 -*-
+from PySide6.QtWidgets import QTableWidgetItem
+from PySide6.QtCore import Qt
+
+class NumericTableItem(QTableWidgetItem):
+    """Table item showing formatted text but sorting by the number in Qt.UserRole."""
+
+    def __init__(self, value, text):
+        super().__init__(text)
+        self.setData(Qt.UserRole, value)
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        value, other_value = self.data(Qt.UserRole), other.data(Qt.UserRole)
+
+        if value is None or other_value is None:
+            return other_value is not None
+        return value < other_value
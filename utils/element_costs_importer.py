@@ -1,18 +1,467 @@
 # utils/element_costs_importer.py
 # -*- coding: utf-8 -*-
 """
-Utility for importing element costs from CSV files.
+Utility for importing element costs from CSV files and Excel workbooks.
 """
 
 import pandas as pd
+import numpy as np
 import logging
+import hashlib
+import csv
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import load_workbook
+
+# Seconds between the cancellation checks while waiting for a worker process
+CANCEL_POLL_INTERVAL = 0.2
+
+# Bytes read at a time when hashing an imported file
+HASH_BLOCK_SIZE = 1 << 20
+
+# File extensions of the cost sheets the importer reads
+IMPORT_EXTENSIONS = (".csv", ".xlsx")
+
+def is_cost_sheet_file(file_name):
+    """Whether a file is a CSV file or Excel workbook the importer reads."""
+    base_name = os.path.basename(file_name)
+    # "~$name.xlsx" is the lock file of a workbook open in Excel
+    return base_name.lower().endswith(IMPORT_EXTENSIONS) and not base_name.startswith("~$")
+
+def _read_sheets_file(file_path, chunk_rows):
+    """Parse a file in a worker process of ElementCostsImporter.import_files."""
+    return ElementCostsImporter(chunk_rows).read_sheets(file_path)
 
 class ElementCostsImporter:
-    """Utility class for importing element costs from CSV files."""
+    """Utility class for importing element costs from CSV files and Excel workbooks."""
+    
+    # Rows of cost columns parsed at a time by read_csv
+    CHUNK_ROWS = 20000
     
-    def __init__(self):
+    def __init__(self, chunk_rows=None):
         self.logger = logging.getLogger(__name__)
+        self.chunk_rows = chunk_rows or self.CHUNK_ROWS
+    
+    def read_csv(self, file_path, progress=None):
+        """
+        Read a CSV file and transform it for storage.
+        
+        Produces the same output as _transform_csv_data(pd.read_csv(file_path)) without
+        materializing the raw sheet: the header and time range rows are parsed once to
+        resolve the level/length columns, the text columns are read in one pass and the
+        cost columns are streamed in chunks of chunk_rows rows, filtered and coerced to
+        numbers chunk by chunk.
+        
+        Args:
+            file_path (str): Path to the CSV file
+            progress (callable, optional): progress(rows_done, rows_total) after each chunk
+            
+        Returns:
+            tuple: (project_type, transformed DataFrame, metadata dict); project_type is
+                None if the CSV does not name one
+        """
+        # Column headers and the time range row below them
+        header_df = pd.read_csv(file_path, nrows=1)
+        headers = list(header_df.columns)
+        
+        if header_df.empty or "Project Type" not in headers:
+            return self._read_csv_whole(file_path)
+        
+        level_columns, length_ranges = self._resolve_level_columns(headers, header_df.iloc[0])
+        names, cost_positions, text_positions = self._column_layout(headers, level_columns)
+        
+        # The text columns are read whole so pandas infers their types as before
+        text_df = pd.read_csv(file_path, usecols=text_positions)
+        
+        if len(text_df) < 2:
+            return self._read_csv_whole(file_path)
+        
+        # Extract project type from the first row
+        project_type = None
+        for i in range(min(5, len(text_df))):  # Check first few rows
+            if pd.notna(text_df.iloc[i]["Project Type"]):
+                project_type = text_df.iloc[i]["Project Type"]
+                break
+        
+        if not project_type:
+            return None, None, None
+        
+        # Drop the time range row and the rows with neither a subtitle code nor a project type
+        text_df = text_df.iloc[1:].reset_index(drop=True)
+        text_df.columns = [names[i] for i in text_positions]
+        
+        if "Subtitle Code" in text_df.columns and "Project Type" in text_df.columns:
+            valid_rows = (
+                self._has_text(text_df["Subtitle Code"]) | self._has_text(text_df["Project Type"])
+            ).to_numpy()
+        else:
+            valid_rows = np.ones(len(text_df), dtype=bool)
+        
+        cost_columns = self._read_cost_columns(file_path, cost_positions, valid_rows, progress)
+        if cost_columns is None:
+            self.logger.warning(f"Row count of {file_path} changed between passes; reading it whole")
+            return self._read_csv_whole(file_path)
+        
+        text_df = text_df[valid_rows].reset_index(drop=True)
+        
+        # Reassemble the columns in sheet order
+        columns = {}
+        for position, name_position in enumerate(text_positions):
+            columns[name_position] = text_df.iloc[:, position]
+        for name_position, values in zip(cost_positions, cost_columns):
+            columns[name_position] = values
+        
+        transformed_df = pd.DataFrame({i: columns[i] for i in range(len(names))})
+        transformed_df.columns = names
+        
+        return project_type, transformed_df, self._sheet_metadata(level_columns, length_ranges)
+    
+    def _read_csv_whole(self, file_path):
+        """Read and transform a CSV file in one piece, e.g. a sheet without data rows."""
+        df = pd.read_csv(file_path)
+        
+        # Extract project type from the first row
+        project_type = None
+        if not df.empty and "Project Type" in df.columns:
+            for i in range(min(5, len(df))):  # Check first few rows
+                if pd.notna(df.iloc[i]["Project Type"]):
+                    project_type = df.iloc[i]["Project Type"]
+                    break
+        
+        if not project_type:
+            return None, None, None
+        
+        # Transform the CSV data with dynamic level/length detection
+        transformed_df, metadata = self._transform_csv_data(df)
+        return project_type, transformed_df, metadata
+    
+    def _has_text(self, column):
+        """Vectorized (pd.notna(value) and str(value).strip() != '') of a column."""
+        return column.notna() & (column.astype(str).str.strip() != '')
+    
+    def _is_time_range(self, value):
+        return isinstance(value, str) and any(keyword in value.lower() for keyword in ['phút', 'min'])
+    
+    def _resolve_level_columns(self, headers, time_row):
+        """
+        Find the level/length columns in a single pass over the headers.
+        
+        A header "L<n>" starts a level and the "Unnamed:" columns after it continue it;
+        each column whose time range row holds a length in minutes becomes
+        "<level> (<length>)".
+        
+        Args:
+            headers (list): Column headers as parsed by pandas
+            time_row (pandas.Series): The time range row below the headers
+            
+        Returns:
+            tuple: ({level: [(col_idx, time_range, col_name)]}, {time_range: (min, max)})
+        """
+        level_columns = {}
+        length_ranges = {}
+        
+        # Nearest level header to the left, as the backward search matched it
+        current_level = None
+        
+        for col_idx, col_name in enumerate(headers):
+            col_str = str(col_name).strip()
+            time_range = time_row[col_name] if pd.notna(time_row[col_name]) else None
+            
+            # Check if this is a level column (L1, L2, L3, etc.)
+            if col_str.startswith('L') and len(col_str) > 1 and col_str[1:].isdigit():
+                level = col_str
+                if level not in level_columns:
+                    level_columns[level] = []
+                
+                if time_range and self._is_time_range(time_range):
+                    level_columns[level].append((col_idx, time_range, col_name))
+                    length_ranges[time_range] = self._parse_length_range(time_range)
+            
+            # Unnamed columns take the level of the nearest level header before them
+            elif 'Unnamed:' in col_str or col_str == '':
+                if time_range and self._is_time_range(time_range) and current_level is not None:
+                    level_columns.setdefault(current_level, []).append((col_idx, time_range, col_name))
+                    length_ranges[time_range] = self._parse_length_range(time_range)
+            
+            if str(col_name).startswith('L') and str(col_name)[1:].isdigit():
+                current_level = str(col_name)
+        
+        return level_columns, length_ranges
+    
+    def _column_layout(self, headers, level_columns):
+        """
+        Names of the transformed columns and which of them hold costs.
+        
+        Returns:
+            tuple: (names, cost_positions, text_positions)
+        """
+        column_mapping = {}
+        for level, ranges in level_columns.items():
+            for col_idx, time_range, original_col in ranges:
+                column_mapping[original_col] = f"{level} ({time_range})"
+        
+        names = [column_mapping.get(col_name, col_name) for col_name in headers]
+        
+        # Same rule as the whole-sheet transform: every column named "<level> (..." is a cost
+        level_prefixes = tuple(f"{level} (" for level in level_columns)
+        cost_positions = [i for i, name in enumerate(names) if level_prefixes and str(name).startswith(level_prefixes)]
+        text_positions = [i for i in range(len(names)) if i not in set(cost_positions)]
+        
+        return names, cost_positions, text_positions
+    
+    def _sheet_metadata(self, level_columns, length_ranges):
+        """Metadata about the detected levels and lengths."""
+        return {
+            "levels": sorted(list(level_columns.keys())),
+            "lengths": sorted(list(set(time_range for ranges in level_columns.values() for _, time_range, _ in ranges))),
+            "length_ranges": length_ranges
+        }
+    
+    def _read_cost_columns(self, file_path, positions, valid_rows, progress=None):
+        """
+        Stream the cost columns of a CSV file and coerce them to numbers.
+        
+        Args:
+            file_path (str): Path to the CSV file
+            positions (list): Column positions of the cost columns
+            valid_rows (numpy.ndarray): Rows to keep, time range row excluded
+            progress (callable, optional): progress(rows_done, rows_total) after each chunk
+            
+        Returns:
+            list: One numeric Series per position, or None if the file has a different
+                number of data rows than valid_rows
+        """
+        total_rows = len(valid_rows)
+        pieces = [[] for _ in positions]
+        
+        if positions:
+            rows_done = 0
+            skip_time_row = True
+            
+            # Cost cells are parsed as text and converted like the whole-sheet transform did
+            chunks = pd.read_csv(file_path, usecols=positions, dtype=str, chunksize=self.chunk_rows)
+            
+            for chunk in chunks:
+                if skip_time_row:
+                    chunk = chunk.iloc[1:]
+                    skip_time_row = False
+                
+                keep = valid_rows[rows_done:rows_done + len(chunk)]
+                if len(keep) != len(chunk):
+                    return None
+                rows_done += len(chunk)
+                
+                chunk = chunk[keep]
+                if not chunk.empty:
+                    for column_pieces, (_, values) in zip(pieces, chunk.items()):
+                        column_pieces.append(pd.to_numeric(values, errors='coerce').fillna(0))
+                
+                if progress is not None:
+                    progress(rows_done, total_rows)
+            
+            if rows_done != total_rows:
+                return None
+        
+        elif progress is not None:
+            progress(total_rows, total_rows)
+        
+        columns = []
+        for column_pieces in pieces:
+            if column_pieces:
+                values = pd.concat(column_pieces, ignore_index=True)
+            else:
+                values = pd.to_numeric(pd.Series([], dtype=object), errors='coerce').fillna(0)
+            columns.append(values)
+        
+        return columns
+    
+    def read_sheets(self, file_path, progress=None):
+        """
+        Read the element cost sheets of a CSV file or Excel workbook.
+        
+        Args:
+            file_path (str): Path to the .csv or .xlsx file
+            progress (callable, optional): progress(rows_done, rows_total) while reading
+            
+        Returns:
+            list: (sheet_name, project_type, transformed DataFrame, metadata) per sheet;
+                a CSV file is one sheet named None
+        """
+        if file_path.lower().endswith(".xlsx"):
+            return self.read_xlsx(file_path, progress)
+        
+        project_type, transformed_df, metadata = self.read_csv(file_path, progress)
+        return [(None, project_type, transformed_df, metadata)]
+    
+    def read_xlsx(self, file_path, progress=None):
+        """
+        Read the element cost sheets of an Excel workbook.
+        
+        The workbook is opened in read-only mode, which parses each worksheet as it is
+        iterated instead of loading the workbook. Each worksheet is laid out like a cost
+        CSV: column headers, the time range row, then one row per element. Its rows are
+        streamed through the same level/length detection and row filter as read_csv,
+        chunk_rows rows at a time. Worksheets without level columns or subtitle codes
+        are not cost sheets and are left out.
+        
+        Args:
+            file_path (str): Path to the .xlsx file
+            progress (callable, optional): progress(rows_done, rows_total) after each chunk
+                of a worksheet
+            
+        Returns:
+            list: (sheet_name, project_type, transformed DataFrame, metadata) per cost
+                sheet; project_type is read from the "Project Type" column like in a CSV
+                file, or is the sheet name if that column names none
+        """
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        
+        try:
+            sheets = []
+            for worksheet in workbook.worksheets:
+                sheet = self._read_worksheet(worksheet, progress)
+                
+                if sheet is None:
+                    self.logger.info(f"Worksheet {worksheet.title} of {file_path} holds no element costs")
+                else:
+                    sheets.append((worksheet.title,) + sheet)
+            
+            return sheets
+            
+        finally:
+            # Read-only workbooks keep the file open until closed
+            workbook.close()
+    
+    def _sheet_headers(self, header_row):
+        """Column names of a worksheet header row, named by pandas as in a CSV file."""
+        if not header_row:
+            return []
+        
+        # Empty headers become "Unnamed: <n>" and repeated ones get a ".1", ".2", ... suffix
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(["" if value is None else value for value in header_row])
+        buffer.seek(0)
+        
+        return list(pd.read_csv(buffer, nrows=0).columns)
+    
+    def _read_worksheet(self, worksheet, progress=None):
+        """
+        Stream one worksheet of a read-only workbook, see read_xlsx.
+        
+        Returns:
+            tuple: (project_type, transformed DataFrame, metadata), or None if the worksheet
+                is not an element cost sheet
+        """
+        rows = worksheet.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        time_row = next(rows, None)
+        
+        if header_row is None or time_row is None:
+            return None
+        
+        # Trailing cells without a header or time range are formatting, not columns
+        width = max(len(header_row), len(time_row))
+        while width > 0 and self._cell(header_row, width - 1) is None and self._cell(time_row, width - 1) is None:
+            width -= 1
+        
+        headers = self._sheet_headers([self._cell(header_row, i) for i in range(width)])
+        time_values = pd.Series([self._cell(time_row, i) for i in range(width)], index=headers, dtype=object)
+        
+        level_columns, length_ranges = self._resolve_level_columns(headers, time_values)
+        if not level_columns or "Subtitle Code" not in headers:
+            return None
+        
+        names, cost_positions, text_positions = self._column_layout(headers, level_columns)
+        text_names = [names[i] for i in text_positions]
+        filter_rows = "Subtitle Code" in text_names and "Project Type" in text_names
+        
+        # The project type is looked up in the time range row and the first data rows
+        project_type = None
+        project_type_position = headers.index("Project Type") if "Project Type" in headers else None
+        candidates = [time_values.iloc[project_type_position]] if project_type_position is not None else []
+        
+        text_pieces = []
+        cost_pieces = [[] for _ in cost_positions]
+        rows_done = 0
+        rows_total = max((worksheet.max_row or 0) - 2, 0)
+        
+        def add_chunk(chunk):
+            text_df = pd.DataFrame([[row[i] for i in text_positions] for row in chunk], columns=text_names)
+            # Empty cells read as NaN, as in a CSV file
+            text_df = text_df.where(text_df.notna(), np.nan).infer_objects()
+            
+            if filter_rows:
+                valid_rows = (
+                    self._has_text(text_df["Subtitle Code"]) | self._has_text(text_df["Project Type"])
+                ).to_numpy()
+            else:
+                valid_rows = np.ones(len(chunk), dtype=bool)
+            
+            text_pieces.append(text_df[valid_rows])
+            
+            for column_pieces, position in zip(cost_pieces, cost_positions):
+                values = pd.Series([row[position] for row in chunk], dtype=object)[valid_rows]
+                column_pieces.append(pd.to_numeric(values, errors='coerce').fillna(0))
+        
+        chunk = []
+        for row in rows:
+            # Blank rows are skipped, as read_csv skips blank lines
+            if all(value is None for value in row):
+                continue
+            
+            row = [self._cell(row, i) for i in range(width)]
+            if project_type_position is not None and len(candidates) < 5:
+                candidates.append(row[project_type_position])
+            
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                add_chunk(chunk)
+                rows_done += len(chunk)
+                chunk = []
+                if progress is not None:
+                    progress(rows_done, max(rows_total, rows_done))
+        
+        if chunk:
+            add_chunk(chunk)
+            rows_done += len(chunk)
+            if progress is not None:
+                progress(rows_done, rows_done)
+        
+        if not text_pieces:
+            return None
+        
+        for value in candidates:
+            if pd.notna(value) and str(value).strip() != '':
+                project_type = value
+                break
+        
+        text_df = pd.concat(text_pieces, ignore_index=True)
+        if text_df.empty:
+            return None
+        
+        # Reassemble the columns in sheet order
+        columns = {}
+        for position, name_position in enumerate(text_positions):
+            columns[name_position] = text_df.iloc[:, position]
+        for name_position, column_pieces in zip(cost_positions, cost_pieces):
+            columns[name_position] = pd.concat(column_pieces, ignore_index=True)
+        
+        transformed_df = pd.DataFrame({i: columns[i] for i in range(len(names))})
+        transformed_df.columns = names
+        
+        return project_type or worksheet.title, transformed_df, self._sheet_metadata(level_columns, length_ranges)
+    
+    def _cell(self, row, position):
+        """Value of a worksheet row at a position; read-only rows may be shorter than the sheet."""
+        return row[position] if position < len(row) else None
+    
+    def _import_message(self, project_type, metadata):
+        levels = metadata.get("levels", [])
+        lengths = metadata.get("lengths", [])
+        return (f"Successfully imported costs for {project_type} "
+                f"with {len(levels)} levels and {len(lengths)} length ranges")
     
     def import_csv(self, file_path, element_costs_model):
         """
@@ -28,23 +477,11 @@ class ElementCostsImporter:
         try:
             self.logger.info(f"Importing element costs from {file_path}")
             
-            # Read CSV file
-            df = pd.read_csv(file_path)
-            
-            # Extract project type from the first row
-            project_type = None
-            if not df.empty and "Project Type" in df.columns:
-                for i in range(min(5, len(df))):  # Check first few rows
-                    if pd.notna(df.iloc[i]["Project Type"]):
-                        project_type = df.iloc[i]["Project Type"]
-                        break
+            project_type, transformed_df, metadata = self.read_csv(file_path)
             
             if not project_type:
                 return False, "Could not determine project type from CSV"
             
-            # Transform the CSV data with dynamic level/length detection
-            transformed_df, metadata = self._transform_csv_data(df)
-            
             # Store in the model with metadata
             element_costs_model.costs[project_type] = {
                 "data": transformed_df,
@@ -60,10 +497,7 @@ class ElementCostsImporter:
             element_costs_model.costsChanged.emit()
             
             if success:
-                levels = metadata.get("levels", [])
-                lengths = metadata.get("lengths", [])
-                message = (f"Successfully imported costs for {project_type} "
-                        f"with {len(levels)} levels and {len(lengths)} length ranges")
+                message = self._import_message(project_type, metadata)
                 self.logger.info(message)
                 return True, message
             else:
@@ -73,9 +507,214 @@ class ElementCostsImporter:
             self.logger.error(f"Failed to import costs: {str(e)}")
             return False, f"Failed to import costs: {str(e)}"
     
+    def import_files(self, file_paths, db_manager, job=None, processes=None, force=False):
+        """
+        Read CSV files and Excel workbooks and save them to the database, without touching a model.
+        
+        A file whose content hash matches the last import of its project types is skipped
+        without being read. The other files are parsed in parallel worker processes while
+        the calling thread, the only one writing to the database, saves each parsed file
+        in the order given, writing only the elements and values that changed; the sheets
+        of a workbook are saved in one transaction. Meant to run as a DbWorker write job;
+        the caller applies the results to ElementCostsModel on the GUI thread.
+        
+        Args:
+            file_paths (list): Paths of the .csv and .xlsx files
+            db_manager (DatabaseManager): Database to save the costs to
+            job (DbJob, optional): Job to report progress to; cancelling it stops
+                before the next file
+            processes (int, optional): Number of worker processes, defaults to the CPU
+                count; 1 parses in the calling thread
+            force (bool): Import unchanged files too
+            
+        Returns:
+            list: One dict per imported or skipped sheet (a CSV file is one sheet) and per
+                failed file, with "file_path", "sheet", "success", "status" ("new",
+                "updated", "skipped" or "failed") and "message"; imported and skipped
+                sheets also have "project_type" and "metadata", imported sheets "data"
+        """
+        file_paths = list(file_paths)
+        
+        # Unchanged files are found before any worker is started
+        content_hashes = [self._content_hash(file_path) for file_path in file_paths]
+        import_records = [
+            db_manager.get_import_records(content_hash) if content_hash and not force else []
+            for content_hash in content_hashes
+        ]
+        
+        to_parse = [i for i, records in enumerate(import_records) if not records]
+        processes = min(processes or os.cpu_count() or 1, len(to_parse))
+        
+        results = []
+        executor = None
+        futures = {}
+        
+        if processes > 1:
+            try:
+                executor = ProcessPoolExecutor(max_workers=processes)
+                futures = {i: executor.submit(_read_sheets_file, file_paths[i], self.chunk_rows) for i in to_parse}
+            except OSError as e:
+                self.logger.warning(f"Could not start import processes, parsing in this thread: {str(e)}")
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                executor = None
+                futures = {}
+        
+        try:
+            for i, file_path in enumerate(file_paths):
+                if job is not None:
+                    # Files already saved stay imported; their results are still returned
+                    if job.is_cancelled():
+                        self.logger.info(f"Import cancelled after {i} of {len(file_paths)} files")
+                        return results
+                    job.report_progress(i, len(file_paths), f"Importing {os.path.basename(file_path)}...")
+                
+                if import_records[i]:
+                    for record in import_records[i]:
+                        results.append({
+                            "file_path": file_path,
+                            "sheet": None,
+                            "success": True,
+                            "status": "skipped",
+                            "message": (
+                                f"Skipped {record['project_type']}: unchanged since the import of "
+                                f"{record['file_name']} on {record['imported_at'][:19]}"
+                            ),
+                            "project_type": record["project_type"],
+                            "metadata": record["metadata"]
+                        })
+                    self.logger.info(f"Skipped {file_path}: its project types are up to date")
+                    continue
+                
+                result = {"file_path": file_path, "sheet": None, "success": False, "status": "failed"}
+                try:
+                    self.logger.info(f"Importing element costs from {file_path}")
+                    
+                    if i in futures:
+                        sheets = self._parsed_file(futures[i], job)
+                        if sheets is None:
+                            self.logger.info(f"Import cancelled after {i} of {len(file_paths)} files")
+                            return results
+                    else:
+                        sheets = self.read_sheets(
+                            file_path, progress=self._row_progress(job, i, len(file_paths), file_path)
+                        )
+                    
+                    project_types = [project_type for _, project_type, _, _ in sheets]
+                    repeated = sorted(set(
+                        str(project_type) for project_type in project_types if project_types.count(project_type) > 1
+                    ))
+                    
+                    if not sheets:
+                        result["message"] = "No element cost sheets found in the workbook"
+                    elif not all(project_types):
+                        result["message"] = "Could not determine project type from CSV"
+                    elif repeated:
+                        result["message"] = f"Project type {', '.join(repeated)} is in more than one sheet"
+                    else:
+                        changes = db_manager.import_element_cost_sheets(
+                            [(project_type, transformed_df, metadata) for _, project_type, transformed_df, metadata in sheets],
+                            os.path.basename(file_path),
+                            content_hashes[i]
+                        )
+                        
+                        if changes is None:
+                            result["message"] = f"Failed to save costs for {', '.join(map(str, project_types))} to database"
+                        else:
+                            for (sheet_name, project_type, transformed_df, metadata), sheet_changes in zip(sheets, changes):
+                                results.append(self._sheet_result(
+                                    file_path, sheet_name, project_type, transformed_df, metadata, sheet_changes
+                                ))
+                            continue
+                        
+                except BrokenProcessPool:
+                    self.logger.error(f"Import process terminated while reading {file_path}")
+                    result["message"] = "Failed to import costs: the import process terminated"
+                    
+                except Exception as e:
+                    self.logger.error(f"Failed to import costs: {str(e)}")
+                    result["message"] = f"Failed to import costs: {str(e)}"
+                
+                results.append(result)
+            
+        finally:
+            if executor is not None:
+                # Files not started are dropped; running workers finish in the background
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        if job is not None:
+            job.report_progress(len(file_paths), len(file_paths), "Import completed")
+        
+        return results
+    
+    def _sheet_result(self, file_path, sheet_name, project_type, transformed_df, metadata, changes):
+        """Result dict of an imported sheet, see import_files."""
+        status = "new" if changes["new"] else "updated"
+        if status == "new":
+            detail = "new project type"
+        else:
+            detail = (
+                f"{changes['inserted']} inserted, {changes['updated']} updated, "
+                f"{changes['deleted']} deleted rows"
+            )
+        
+        message = f"{self._import_message(project_type, metadata)} ({detail})"
+        if sheet_name is not None:
+            message = f"Sheet {sheet_name}: {message}"
+        
+        self.logger.info(message)
+        return {
+            "file_path": file_path,
+            "sheet": sheet_name,
+            "success": True,
+            "status": status,
+            "message": message,
+            "project_type": project_type,
+            "data": transformed_df,
+            "metadata": metadata
+        }
+    
+    def _content_hash(self, file_path):
+        """SHA-256 of a file's content, or None if it cannot be read."""
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                    digest.update(block)
+        except OSError as e:
+            self.logger.warning(f"Could not hash {file_path}: {str(e)}")
+            return None
+        return digest.hexdigest()
+    
+    def _parsed_file(self, future, job=None):
+        """
+        Wait for a file parsed by a worker process.
+        
+        Returns:
+            tuple: The read_csv result, or None if the job was cancelled meanwhile
+        """
+        while job is not None and not future.done():
+            if job.is_cancelled():
+                return None
+            wait([future], timeout=CANCEL_POLL_INTERVAL)
+        
+        return future.result()
+    
+    def _row_progress(self, job, file_index, file_count, file_path):
+        """Progress callback of read_csv reporting the rows read of a file to a job."""
+        if job is None:
+            return None
+        
+        file_name = os.path.basename(file_path)
+        
+        def progress(rows_done, rows_total):
+            job.report_progress(file_index, file_count, f"Importing {file_name}... {rows_done:,} of {rows_total:,} rows")
+        
+        return progress
+    
     def import_directory(self, directory_path, element_costs_model):
         """
-        Import all CSV files from a directory.
+        Import all CSV files and Excel workbooks from a directory.
         
         Args:
             directory_path (str): Path to the directory containing CSV files
@@ -86,24 +725,15 @@ class ElementCostsImporter:
         """
         if not os.path.isdir(directory_path):
             return 0, 0, ["Directory does not exist"]
-            
-        success_count = 0
-        failure_count = 0
-        messages = []
         
-        for filename in os.listdir(directory_path):
-            if filename.endswith(".csv"):
-                file_path = os.path.join(directory_path, filename)
-                success, message = self.import_csv(file_path, element_costs_model)
-                
-                if success:
-                    success_count += 1
-                else:
-                    failure_count += 1
-                    
-                messages.append(f"{filename}: {message}")
-                
-        return success_count, failure_count, messages
+        file_paths = [
+            os.path.join(directory_path, filename)
+            for filename in sorted(os.listdir(directory_path))
+            if is_cost_sheet_file(filename)
+        ]
+        
+        results = self.import_files(file_paths, element_costs_model.db_manager)
+        return element_costs_model.apply_import_results(results)
     
     def _transform_csv_data(self, df):
         """
@@ -124,43 +754,9 @@ class ElementCostsImporter:
         length_ranges = {}
         column_mapping = {}
         
-        # First pass: identify level columns from the header row (row 0)
+        # Identify level columns from the header row (row 0) and the time ranges below it
         if len(df) >= 2:  # We need at least header and time range rows
-            headers = df.columns
-            
-            for col_idx, col_name in enumerate(headers):
-                col_str = str(col_name).strip()
-                
-                # Check if this is a level column (L1, L2, L3, etc.)
-                if col_str.startswith('L') and len(col_str) > 1 and col_str[1:].isdigit():
-                    level = col_str
-                    if level not in level_columns:
-                        level_columns[level] = []
-                    
-                    # Look at row 1 (index 0 in the dataframe) for time range
-                    time_range = df.iloc[0][col_name] if pd.notna(df.iloc[0][col_name]) else None
-                    
-                    if time_range and isinstance(time_range, str) and any(keyword in time_range.lower() for keyword in ['phút', 'min']):
-                        # This is a valid time range
-                        level_columns[level].append((col_idx, time_range, col_name))
-                        length_ranges[time_range] = self._parse_length_range(time_range)
-                        
-                # Also check for Unnamed columns that might have time ranges
-                elif 'Unnamed:' in col_str or col_str == '':
-                    # Check if row 1 has a time range value
-                    time_range = df.iloc[0][col_name] if pd.notna(df.iloc[0][col_name]) else None
-                    
-                    if time_range and isinstance(time_range, str) and any(keyword in time_range.lower() for keyword in ['phút', 'min']):
-                        # Find which level this belongs to by looking at previous columns
-                        for prev_idx in range(col_idx - 1, -1, -1):
-                            prev_col = headers[prev_idx]
-                            if str(prev_col).startswith('L') and str(prev_col)[1:].isdigit():
-                                level = str(prev_col)
-                                if level not in level_columns:
-                                    level_columns[level] = []
-                                level_columns[level].append((col_idx, time_range, col_name))
-                                length_ranges[time_range] = self._parse_length_range(time_range)
-                                break
+            level_columns, length_ranges = self._resolve_level_columns(list(df.columns), df.iloc[0])
         
         # Create column mapping
         for level, ranges in level_columns.items():
@@ -181,11 +777,7 @@ class ElementCostsImporter:
         if "Subtitle Code" in renamed_df.columns and "Project Type" in renamed_df.columns:
             # Keep rows that have either a valid subtitle code OR a valid project type
             # This allows rows with empty subtitle codes (common in CLT) but still have meaningful data
-            valid_rows = renamed_df.apply(
-                lambda row: (pd.notna(row["Subtitle Code"]) and str(row["Subtitle Code"]).strip() != '') or 
-                        (pd.notna(row["Project Type"]) and str(row["Project Type"]).strip() != ''),
-                axis=1
-            )
+            valid_rows = self._has_text(renamed_df["Subtitle Code"]) | self._has_text(renamed_df["Project Type"])
             filtered_df = renamed_df[valid_rows].reset_index(drop=True)
         else:
             filtered_df = renamed_df
@@ -0,0 +1,239 @@
+# utils/profiler.py
+# -*- coding: utf-8 -*-
+"""
+Optional hot-path instrumentation.
+
+The quantity and cost rules, the DatabaseManager methods and the phases of the
+results dialog report their call counts and durations to PROFILER. Profiling is
+off by default and toggled at runtime (Help > Performance); while it is off the
+instrumented code only pays for a flag check, and the compiled cost plans bind
+the raw rule functions so the per-row rule calls pay nothing at all.
+
+Calls are recorded from the GUI thread and the database worker threads at once,
+so the statistics are only read and updated under the profiler's lock.
+"""
+
+import json
+import time
+import inspect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+
+class ProfileStat:
+    """Call count, cumulative and maximum time of one instrumented name."""
+
+    __slots__ = ("name", "calls", "total", "max")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.calls if self.calls else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+class Profiler:
+    """Collects timings of instrumented calls while enabled."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def set_enabled(self, enabled):
+        """
+        Turn profiling on or off.
+
+        Args:
+            enabled (bool): New state; listeners are notified when it changes
+        """
+        enabled = bool(enabled)
+
+        if enabled == self.enabled:
+            return
+
+        self.enabled = enabled
+        self.logger.info(f"Profiling {'enabled' if enabled else 'disabled'}")
+
+        for listener in list(self._listeners):
+            listener(enabled)
+
+    def add_listener(self, listener):
+        """Register listener(enabled), called whenever profiling is toggled."""
+        self._listeners.append(listener)
+
+    def reset(self):
+        """Forget all recorded timings."""
+        with self._lock:
+            self._stats.clear()
+
+    def record(self, name, elapsed):
+        """
+        Record one call.
+
+        Args:
+            name (str): Instrumented name, e.g. "db.get_element_costs"
+            elapsed (float): Duration in seconds
+        """
+        with self._lock:
+            stat = self._stats.get(name)
+
+            if stat is None:
+                stat = self._stats[name] = ProfileStat(name)
+            stat.add(elapsed)
+
+    @contextmanager
+    def _timed_section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def section(self, name):
+        """
+        Context manager timing a block of code while profiling is enabled.
+
+        Args:
+            name (str): Instrumented name of the block
+
+        Returns:
+            A context manager; a shared no-op one while profiling is disabled
+        """
+        if not self.enabled:
+            return _NULL_SECTION
+        return self._timed_section(name)
+
+    def timed(self, name, func):
+        """
+        Wrap a function so that every call is recorded.
+
+        Unlike instrument(), the wrapper always records; callers bind it only
+        while profiling is enabled.
+
+        Args:
+            name (str): Instrumented name
+            func (callable): Function to wrap
+
+        Returns:
+            callable: The timing wrapper
+        """
+        record = self.record
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def instrument(self, name, func):
+        """
+        Wrap a function so that its calls are recorded while profiling is enabled.
+
+        Args:
+            name (str): Instrumented name
+            func (callable): Function to wrap
+
+        Returns:
+            callable: Wrapper checking the enabled flag on each call
+        """
+        profiler = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def snapshot(self):
+        """
+        Get the recorded timings.
+
+        Returns:
+            list: ProfileStat.to_dict() per name, slowest cumulative time first
+        """
+        with self._lock:
+            stats = [stat.to_dict() for stat in self._stats.values()]
+        stats.sort(key=lambda stat: stat["total_ms"], reverse=True)
+        return stats
+
+    def to_json(self, file_path):
+        """
+        Dump the recorded timings to a JSON file.
+
+        Args:
+            file_path (str): Output path
+
+        Returns:
+            bool: True if the file was written
+        """
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump({"enabled": self.enabled, "stats": self.snapshot()}, f, indent=2, ensure_ascii=False)
+            return True
+        except OSError as e:
+            self.logger.error(f"Failed to write profile to {file_path}: {str(e)}")
+            return False
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SECTION = _NullSection()
+
+PROFILER = Profiler()
+
+def profile_methods(prefix):
+    """
+    Class decorator instrumenting the public methods defined on the class.
+
+    Private helpers (e.g. connection handling) are left unwrapped, so each
+    recorded call is one operation of the class's API and nested helper calls
+    are neither counted twice nor slowed down by the wrapper.
+
+    Args:
+        prefix (str): Name prefix, methods are recorded as "<prefix>.<method>"
+
+    Returns:
+        callable: Decorator returning the class with its methods wrapped
+    """
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if inspect.isfunction(member) and not name.startswith("_"):
+                setattr(cls, name, PROFILER.instrument(f"{prefix}.{name}", member))
+        return cls
+
+    return decorator